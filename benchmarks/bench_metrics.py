@@ -0,0 +1,40 @@
+"""Benchmark the overhead of stage instrumentation.
+
+Usage:
+    python benchmarks/bench_metrics.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chat_with_doc.core.metrics import track_stage  # noqa: E402
+
+ITERATIONS = 200_000
+
+
+def bare():
+    pass
+
+
+def instrumented():
+    with track_stage("bench", "bench"):
+        pass
+
+
+def main():
+    bare_seconds = min(timeit.repeat(bare, number=ITERATIONS, repeat=5))
+    tracked_seconds = min(timeit.repeat(instrumented, number=ITERATIONS, repeat=5))
+    overhead_us = (tracked_seconds - bare_seconds) / ITERATIONS * 1e6
+    print(f"bare:         {bare_seconds / ITERATIONS * 1e6:8.3f} us/call")
+    print(f"track_stage:  {tracked_seconds / ITERATIONS * 1e6:8.3f} us/call")
+    print(f"overhead:     {overhead_us:8.3f} us/stage")
+    # An LLM call takes ~1s and a Pinecone query ~50ms; report the share
+    # of the cheapest instrumented stage that the overhead represents.
+    print(f"share of a 1 ms stage: {overhead_us / 1000:.4%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark recall and memory of the local index's quantized storage.
+
+Vectors are drawn around shared cluster centres so that neighbours are
+close together, as real chunk embeddings are.
+
+Usage:
+    GOOGLE_API_KEY=any python benchmarks/bench_quantization.py [--rows 50000] [--dim 768] [--queries 200] [--k 10]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chat_with_doc.core.local_index import LocalVectorIndex, normalize  # noqa: E402
+
+
+def make_vectors(rows, dim, clusters, rng):
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    noise = rng.standard_normal((rows, dim)).astype(np.float32)
+    return centres[labels] + 0.6 * noise
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = make_vectors(args.rows, args.dim, 256, rng)
+    queries = make_vectors(args.queries, args.dim, 256, rng)
+    exact = normalize(vectors) @ normalize(queries).T
+    truth = [set(np.argsort(-exact[:, q])[:args.k]) for q in range(args.queries)]
+    ids = [str(i) for i in range(args.rows)]
+    texts = [""] * args.rows
+    metadatas = [{"source": "bench"}] * args.rows
+    baseline = None
+
+    print(f"{args.rows} vectors x {args.dim} dims, {args.queries} queries, recall@{args.k}")
+    print(f"{'storage':<18}{'resident MB':>12}{'vs float32':>12}{'recall':>10}{'ms/query':>10}")
+    rescore_dir = tempfile.TemporaryDirectory()
+    for quantization, rescore in (
+        ("float32", False),
+        ("float16", False),
+        ("int8", False),
+        ("int8", True),
+    ):
+        # The float32 rescoring copy is memory-mapped, as with LOCAL_INDEX_DIR set
+        index = LocalVectorIndex(
+            args.dim, quantization=quantization, rescore=rescore, rescore_dir=rescore_dir.name
+        )
+        index.add(ids, vectors, texts, metadatas)
+
+        start = perf_counter()
+        found = [{row for row, _ in index.search(query, args.k)} for query in queries]
+        elapsed = (perf_counter() - start) * 1000 / args.queries
+        recall = np.mean([len(f & t) / args.k for f, t in zip(found, truth)])
+
+        usage = index.memory_usage()
+        resident = usage["codes"] + usage["scales"]
+        baseline = baseline or resident
+        label = quantization + (" + rescore" if rescore else "")
+        print(
+            f"{label:<18}{resident / 1e6:>12.1f}{baseline / resident:>11.1f}x"
+            f"{recall:>10.3f}{elapsed:>10.2f}"
+        )
+    rescore_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark JSON serialization and compressed transfer of a large API payload.
+
+The payload mimics a batch chat response with long answers. Transfer time
+is serialization plus compression plus the compressed bytes on a link of
+the given bandwidth; decompression on the client is not counted.
+
+Usage:
+    python benchmarks/bench_responses.py [--questions 200] [--answer-words 250] [--mbps 10 100]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import timeit
+
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chat_with_doc.api.responses import FastJSONResponse, brotli  # noqa: E402
+
+WORDS = (
+    "the document retrieval answer section page summary policy contract revenue quarter "
+    "customer model embedding chunk source report clause figure table result"
+).split()
+
+
+def make_payload(questions: int, answer_words: int) -> dict:
+    rng = random.Random(0)
+    results = [
+        {
+            "question": f"Question {i}: what does section {i} say about {rng.choice(WORDS)}?",
+            "status": "success",
+            "answer": " ".join(rng.choice(WORDS) for _ in range(answer_words)),
+            "error": None,
+            "retrieve_ms": round(rng.uniform(20, 200), 3),
+        }
+        for i in range(questions)
+    ]
+    timings = {"embed_ms": 41.2, "generate_ms": {str(i): round(rng.uniform(300, 1500), 3) for i in range(questions)}}
+    return {"results": results, "timings": timings, "total_ms": 1234.5}
+
+
+def best_seconds(fn, number: int = 20) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--answer-words", type=int, default=250)
+    parser.add_argument("--mbps", type=float, nargs="+", default=[10.0, 100.0], help="Link bandwidths in Mbit/s")
+    args = parser.parse_args()
+
+    payload = make_payload(args.questions, args.answer_words)
+    body = FastJSONResponse(payload).body
+    assert json.loads(body) == json.loads(JSONResponse(payload).body)
+
+    stdlib_s = best_seconds(lambda: JSONResponse(payload))
+    orjson_s = best_seconds(lambda: FastJSONResponse(payload))
+    print(f"payload: {len(body) / 1024:.1f} KiB, {args.questions} answers")
+    print(f"serialize  json:   {stdlib_s * 1000:8.3f} ms")
+    print(f"serialize  orjson: {orjson_s * 1000:8.3f} ms  ({stdlib_s / orjson_s:.1f}x faster)")
+
+    encoders = [("identity", lambda data: data)]
+    for level in (1, 6, 9):
+        encoders.append((f"gzip-{level}", lambda data, level=level: gzip.compress(data, compresslevel=level)))
+    if brotli is not None:
+        for quality in (4, 11):
+            encoders.append((f"br-{quality}", lambda data, quality=quality: brotli.compress(data, quality=quality)))
+    else:
+        print("brotli is not installed; skipping br")
+
+    header = f"{'encoding':<10} {'KiB':>8} {'ratio':>6} {'compress ms':>12}"
+    header += "".join(f" {f'total@{mbps:g}Mbps ms':>18}" for mbps in args.mbps)
+    print()
+    print(header)
+    for name, encode in encoders:
+        compressed = encode(body)
+        compress_s = best_seconds(lambda: encode(body), number=5) if name != "identity" else 0.0
+        row = f"{name:<10} {len(compressed) / 1024:8.1f} {len(body) / len(compressed):6.1f} {compress_s * 1000:12.3f}"
+        for mbps in args.mbps:
+            wire_s = len(compressed) * 8 / (mbps * 1e6)
+            row += f" {(orjson_s + compress_s + wire_s) * 1000:18.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
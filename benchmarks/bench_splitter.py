@@ -0,0 +1,82 @@
+"""Benchmark the offset splitter against LangChain's RecursiveCharacterTextSplitter.
+
+Usage:
+    python benchmarks/bench_splitter.py [--docs 64] [--paragraphs 400] [--workers 4]
+"""
+
+import argparse
+import os
+import random
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_text_splitters import RecursiveCharacterTextSplitter  # noqa: E402
+
+from src.chat_with_doc.handlers.splitter import (  # noqa: E402
+    OffsetTextSplitter,
+    split_documents_parallel,
+)
+
+
+def make_documents(count, paragraphs, seed=0):
+    rng = random.Random(seed)
+    vocabulary = [f"token{i}" for i in range(5000)]
+    docs = []
+    for n in range(count):
+        text = "\n\n".join(
+            "\n".join(
+                " ".join(rng.choices(vocabulary, k=rng.randint(5, 60)))
+                for _ in range(rng.randint(1, 6))
+            )
+            for _ in range(paragraphs)
+        )
+        docs.append(Document(page_content=text, metadata={"source": f"doc{n}.txt"}))
+    return docs
+
+
+def timed(label, fn, total_chars):
+    start = perf_counter()
+    result = fn()
+    elapsed = perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f} s  {total_chars / elapsed / 1e6:8.2f} MB/s  {len(result)} chunks")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=64)
+    parser.add_argument("--paragraphs", type=int, default=400)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    docs = make_documents(args.docs, args.paragraphs)
+    total_chars = sum(len(d.page_content) for d in docs)
+    print(f"{len(docs)} documents, {total_chars / 1e6:.1f} M characters\n")
+
+    baseline = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, add_start_index=True
+    )
+    splitter = OffsetTextSplitter(args.chunk_size, args.chunk_overlap)
+
+    expected = timed("RecursiveCharacterTextSplitter", lambda: baseline.split_documents(docs), total_chars)
+    serial = timed("OffsetTextSplitter", lambda: splitter.split_documents(docs), total_chars)
+    # Warm the pool so worker start-up is not counted against steady-state throughput
+    split_documents_parallel(docs[:2], splitter, max_workers=args.workers)
+    parallel = timed(
+        f"OffsetTextSplitter x{args.workers}",
+        lambda: split_documents_parallel(docs, splitter, max_workers=args.workers),
+        total_chars,
+    )
+
+    for label, result in (("serial", serial), ("parallel", parallel)):
+        same = [d.page_content for d in result] == [d.page_content for d in expected]
+        print(f"{label} output identical to baseline: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark two-stage truncated-dimension search in the local index.
+
+Vectors are clustered and, like Matryoshka-trained embeddings, put most of
+their variance in the leading dimensions. Recall on real embeddings depends
+on the model; rerun with exported vectors before choosing a prefix size.
+
+Usage:
+    GOOGLE_API_KEY=any python benchmarks/bench_truncated_search.py [--rows 100000] [--dim 768] [--queries 100]
+"""
+
+import argparse
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chat_with_doc.core.local_index import LocalVectorIndex, normalize  # noqa: E402
+
+
+def make_vectors(rows, dim, centres, rng):
+    decay = np.linspace(2.0, 0.25, dim).astype(np.float32)
+    labels = rng.integers(0, len(centres), rows)
+    noise = rng.standard_normal((rows, dim)).astype(np.float32)
+    return (centres[labels] + 1.5 * noise) * decay
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--quantization", default="int8")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((512, args.dim)).astype(np.float32)
+    vectors = make_vectors(args.rows, args.dim, centres, rng)
+    queries = make_vectors(args.queries, args.dim, centres, rng)
+    exact = normalize(vectors) @ normalize(queries).T
+    truth = [set(np.argsort(-exact[:, q])[:args.k]) for q in range(args.queries)]
+    del exact
+
+    ids = [str(i) for i in range(args.rows)]
+    texts = [""] * args.rows
+    metadatas = [{"source": "bench"}] * args.rows
+
+    print(
+        f"{args.rows} vectors x {args.dim} dims ({args.quantization}), "
+        f"{args.queries} queries, recall@{args.k}"
+    )
+    print(f"{'search':<24}{'ms/query':>10}{'speedup':>10}{'recall':>10}{'extra MB':>10}")
+    baseline = None
+    for coarse_dim, coarse_factor in ((0, 0), (256, 10), (128, 10), (128, 30), (64, 30)):
+        index = LocalVectorIndex(
+            args.dim,
+            quantization=args.quantization,
+            coarse_dim=coarse_dim,
+            coarse_factor=coarse_factor or 10,
+        )
+        index.add(ids, vectors, texts, metadatas)
+        index.search(queries[0], args.k)
+
+        start = perf_counter()
+        found = [{row for row, _ in index.search(query, args.k)} for query in queries]
+        elapsed = (perf_counter() - start) * 1000 / args.queries
+        recall = np.mean([len(f & t) / args.k for f, t in zip(found, truth)])
+        baseline = baseline or elapsed
+
+        label = f"prefix {coarse_dim} x{coarse_factor}" if coarse_dim else "full dimension"
+        extra = index.memory_usage()["coarse"] / 1e6
+        print(f"{label:<24}{elapsed:>10.2f}{baseline / elapsed:>9.1f}x{recall:>10.3f}{extra:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,16 @@ const sendButton = document.getElementById('sendButton');
 // API Base URL
 const API_BASE = '/api/';
 
+// Chat session, so follow-up questions can refer to earlier answers
+let sessionId = newSessionId();
+
+function newSessionId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+
 console.log('JavaScript loaded successfully');
 
 // Event Listeners
@@ -34,11 +44,8 @@ fileInput.addEventListener('change', (e) => {
         const fileArray = Array.from(files);
         console.log('Files stored in array:', fileArray.length);
         
-        // Now process each file
-        fileArray.forEach((file, index) => {
-            console.log(`Processing file ${index + 1}:`, file.name, 'Type:', file.type);
-            uploadFile(file);
-        });
+        // Upload several files at once
+        uploadFiles(fileArray);
     } else {
         console.log('No files detected in change event');
     }
@@ -71,7 +78,8 @@ function clearPreviousDocuments() {
     // Clear URL input
     urlInput.value = '';
     
-    // Clear chat messages and restore initial state
+    // Clear chat messages and start a new conversation
+    sessionId = newSessionId();
     chatMessages.innerHTML = `
         <div class="message bot-message">
             <div class="message-header">
@@ -113,43 +121,115 @@ function clearAllFilesSync() {
     clearPreviousDocuments();
 }
 
-function uploadFile(file) {
-    console.log('Starting file upload for:', file.name);
-    
-    const formData = new FormData();
-    formData.append('file', file);
+// Chunked upload settings
+const UPLOAD_PARALLEL_FILES = 3;
+const UPLOAD_CHUNK_RETRIES = 5;
+
+function uploadFiles(files) {
+    console.log('Uploading', files.length, 'files,', UPLOAD_PARALLEL_FILES, 'at a time');
     
-    // Show file in UI immediately
-    addFileToList(file.name, formatFileSize(file.size), 'uploading');
+    // Show every file in the UI immediately
+    files.forEach(file => addFileToList(file.name, formatFileSize(file.size), 'uploading'));
     
-    console.log('Making fetch request to:', `${API_BASE}upload`);
+    const queue = files.slice();
+    const workers = [];
+    for (let i = 0; i < Math.min(UPLOAD_PARALLEL_FILES, queue.length); i++) {
+        workers.push((async () => {
+            while (queue.length > 0) {
+                await uploadFile(queue.shift());
+            }
+        })());
+    }
+    return Promise.all(workers);
+}
+
+// Remember upload IDs so an interrupted upload resumes instead of restarting
+function uploadKey(file) {
+    return `upload:${file.name}:${file.size}:${file.lastModified}`;
+}
+
+async function startOrResumeUpload(file) {
+    const savedId = localStorage.getItem(uploadKey(file));
+    if (savedId) {
+        const response = await fetch(`${API_BASE}uploads/${savedId}`);
+        if (response.ok) {
+            const upload = await response.json();
+            if (!upload.complete) {
+                console.log('Resuming upload', savedId, 'at byte', upload.offset);
+                return upload;
+            }
+        }
+        localStorage.removeItem(uploadKey(file));
+    }
     
-    fetch(`${API_BASE}upload`, {
+    const response = await fetch(`${API_BASE}uploads`, {
         method: 'POST',
-        body: formData
-    })
-    .then(response => {
-        console.log('Upload response status:', response.status);
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ filename: file.name, size: file.size, content_type: file.type || null })
+    });
+    const upload = await response.json();
+    if (!response.ok) {
+        throw new Error(upload.error || `HTTP error! status: ${response.status}`);
+    }
+    localStorage.setItem(uploadKey(file), upload.upload_id);
+    return upload;
+}
+
+async function sendChunk(upload, file, offset) {
+    const end = Math.min(offset + upload.chunk_size, file.size);
+    for (let attempt = 0; ; attempt++) {
+        try {
+            const response = await fetch(`${API_BASE}uploads/${upload.upload_id}`, {
+                method: 'PUT',
+                headers: {
+                    'Content-Range': `bytes ${offset}-${end - 1}/${file.size}`
+                },
+                body: file.slice(offset, end)
+            });
+            const data = await response.json();
+            if (response.ok) {
+                return data;
+            }
+            if (response.status === 409 && data.offset != null) {
+                // The server holds a different offset; continue from there
+                return { ...upload, offset: data.offset, complete: false };
+            }
+            if (response.status < 500 && response.status !== 429) {
+                throw Object.assign(new Error(data.error || `HTTP error! status: ${response.status}`), { fatal: true });
+            }
+            throw new Error(data.error || `HTTP error! status: ${response.status}`);
+        } catch (error) {
+            if (error.fatal || attempt >= UPLOAD_CHUNK_RETRIES) {
+                throw error;
+            }
+            const delay = Math.min(1000 * 2 ** attempt, 15000) * (0.5 + Math.random() / 2);
+            console.warn(`Chunk at byte ${offset} of ${file.name} failed (${error.message}); retrying in ${Math.round(delay)}ms`);
+            await new Promise(resolve => setTimeout(resolve, delay));
         }
-        return response.json();
-    })
-    .then(data => {
-        console.log('Upload response data:', data);
-        if (data.error) {
-            updateFileStatus(file.name, 'error');
-            alert('Error uploading file: ' + data.error);
-        } else {
-            updateFileStatus(file.name, 'uploaded');
-            console.log('File uploaded successfully:', file.name);
+    }
+}
+
+async function uploadFile(file) {
+    console.log('Starting chunked upload for:', file.name);
+    
+    try {
+        let upload = await startOrResumeUpload(file);
+        updateFileProgress(file.name, upload.offset, file.size);
+        while (!upload.complete) {
+            upload = await sendChunk(upload, file, upload.offset);
+            updateFileProgress(file.name, upload.offset, file.size);
         }
-    })
-    .catch(error => {
+        localStorage.removeItem(uploadKey(file));
+        updateFileStatus(file.name, 'uploaded');
+        updateFileProgress(file.name, null, file.size);
+        console.log('File uploaded successfully:', file.name, 'sha256:', upload.sha256);
+    } catch (error) {
         console.error('Upload error:', error);
         updateFileStatus(file.name, 'error');
         alert('Error uploading file: ' + error.message);
-    });
+    }
 }
 
 function processAllDocuments() {
@@ -263,7 +343,7 @@ function sendMessage() {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ message: message })
+            body: JSON.stringify({ message: message, session_id: sessionId })
         })
         .then(response => {
             console.log('Chat response status:', response.status);
@@ -358,6 +438,24 @@ function updateFileStatus(name, status) {
     });
 }
 
+function updateFileProgress(name, received, total) {
+    const fileItems = document.querySelectorAll('.file-item');
+    fileItems.forEach(item => {
+        if (item.dataset.filename === name) {
+            const sizeElement = item.querySelector('.file-size');
+            if (!sizeElement) {
+                return;
+            }
+            if (received === null) {
+                sizeElement.textContent = formatFileSize(total);
+            } else {
+                const percent = total ? Math.floor(received * 100 / total) : 100;
+                sizeElement.textContent = `${formatFileSize(received)} of ${formatFileSize(total)} (${percent}%)`;
+            }
+        }
+    });
+}
+
 function formatFileSize(bytes) {
     if (bytes === 0) return '0 Bytes';
     const k = 1024;
@@ -446,7 +544,8 @@ function hideProcessing() {
         processingIndicator.remove();
     }
     
-    // Restore initial message
+    // Restore initial message; the cleared chat starts a new conversation
+    sessionId = newSessionId();
     chatMessages.innerHTML = `
         <div class="message bot-message">
             <div class="message-header">
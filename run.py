@@ -1,10 +1,19 @@
-"""Application entry point."""
+"""Application entry point.
 
-import uvicorn
+``python run.py`` starts the web server; ``python run.py ingest DIR``
+bulk-ingests a directory tree.
+"""
+
+import sys
 
-from src.chat_with_doc.api.main import app
+import uvicorn
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        from src.chat_with_doc.cli import main
+
+        sys.exit(main())
+
     uvicorn.run(
         "src.chat_with_doc.api.main:app",
         host="0.0.0.0",
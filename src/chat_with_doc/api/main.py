@@ -2,12 +2,17 @@
 
 import os
 import logging
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from ..core.config import settings
-from .routes import router
+from ..core.errors import ServiceUnavailable
+from ..core.metrics import mark_worker_dead, render_latest
+from ..services.warmup import warmup
+from .responses import CachedStaticFiles, CompressionMiddleware, FastJSONResponse
+from .routes import doc_engine, router
 
 # Configure logging before importing application modules
 logging.basicConfig(
@@ -18,13 +23,34 @@ logging.basicConfig(
 os.environ["LANGCHAIN_USER_AGENT"] = "ChatWithDoc/1.0"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start warming up clients and the pipeline without blocking startup."""
+    if settings.WARMUP_ENABLED:
+        warmup.start(doc_engine)
+    else:
+        warmup.disable()
+    yield
+    mark_worker_dead()
+
+
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
 
     app = FastAPI(
         title=settings.API_TITLE,
         version=settings.API_VERSION,
-        description="Chat with your documents using Retrieval Augmented Generation (RAG)"
+        description="Chat with your documents using Retrieval Augmented Generation (RAG)",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
+    )
+
+    # Compress large JSON payloads and frontend assets
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        compresslevel=settings.GZIP_LEVEL,
+        brotli_quality=settings.BROTLI_QUALITY,
     )
 
     # Add CORS middleware
@@ -36,19 +62,45 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Overload (429) and expired request deadlines (504) abort the whole request
+    @app.exception_handler(ServiceUnavailable)
+    async def service_unavailable(request: Request, exc: ServiceUnavailable):
+        return FastJSONResponse(
+            status_code=exc.status_code,
+            content={"error": str(exc)},
+            headers=exc.headers(),
+        )
+
     # Include routes
     app.include_router(router, prefix="/api", tags=["documents"])
 
-    # Serve static files (frontend)
-    frontend_path = os.path.join(os.path.dirname(__file__), "../../../frontend")
-    if os.path.exists(frontend_path):
-        app.mount("/", StaticFiles(directory=frontend_path, html=True), name="frontend")
+    # Registered before the static mount, which would otherwise match "/metrics"
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics endpoint."""
+        payload, content_type = render_latest()
+        return Response(content=payload, media_type=content_type)
 
     @app.get("/health")
     async def health_check():
-        """Health check endpoint."""
+        """Liveness check: the process is up, even while warming up."""
         return {"status": "healthy"}
 
+    @app.get("/ready")
+    async def readiness_check():
+        """Readiness check: 200 once warm-up finished, 503 before, with per-component timings."""
+        report = warmup.report()
+        return FastJSONResponse(status_code=200 if report["status"] == "ready" else 503, content=report)
+
+    # Serve static files (frontend)
+    frontend_path = os.path.join(os.path.dirname(__file__), "../../../frontend")
+    if os.path.exists(frontend_path):
+        app.mount(
+            "/",
+            CachedStaticFiles(directory=frontend_path, html=True, max_age=settings.STATIC_MAX_AGE),
+            name="frontend",
+        )
+
     return app
 
 
@@ -0,0 +1,174 @@
+"""Response serialization, compression and static asset caching."""
+
+import hashlib
+import os
+import re
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+import anyio.to_thread
+import orjson
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, IdentityResponder
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies this large are compressed in a worker thread, as GZipMiddleware does
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+# Local href/src references in HTML pages, e.g. href="css/styles.css"
+ASSET_REFERENCE = re.compile(r'(?P<attr>\b(?:href|src)=")(?P<path>(?![a-z]+:|//|#)[^"?#]+)"')
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response serialized with orjson.
+
+    Endpoints with a ``response_model`` are already serialized to bytes by
+    Pydantic; this class covers plain dict responses and explicit JSON
+    responses, which the stdlib encoder would otherwise render.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def accepts_encoding(headers: Headers, coding: str) -> bool:
+    """Whether Accept-Encoding lists ``coding`` with a non-zero q-value."""
+    for part in headers.get("Accept-Encoding", "").split(","):
+        name, _, params = part.partition(";")
+        if name.strip().lower() == coding:
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class BrotliResponder(IdentityResponder):
+    """Compress a response with Brotli, streaming bodies chunk by chunk."""
+
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int, **kwargs: Any):
+        super().__init__(app, minimum_size, **kwargs)
+        self.quality = quality
+        self._compressor: Any = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        compressed = self._compressor.process(body)
+        return compressed + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses of at least ``minimum_size`` bytes.
+
+    Clients that accept Brotli get ``br`` when the ``brotli`` package is
+    installed, others get gzip. Small bodies, event streams and already
+    compressed media are sent as-is.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, compresslevel: int = 6, brotli_quality: int = 4):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and brotli is not None and accepts_encoding(Headers(scope=scope), "br"):
+            responder = BrotliResponder(
+                self.app,
+                self.minimum_size,
+                self.brotli_quality,
+                exclude_content_types=self.exclude_content_types,
+            )
+            await responder(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    Static files with content-hashed asset URLs.
+
+    HTML pages are served with their local ``href``/``src`` references
+    rewritten to ``path?v=<content hash>``. A request carrying the current
+    hash is cached as immutable for ``max_age`` seconds; pages and
+    unversioned requests are revalidated with their ETag on every use, so
+    a deploy is picked up without stale assets.
+    """
+
+    def __init__(self, *, max_age: int = 31536000, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.max_age = max_age
+        self._versions: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+    def asset_version(self, full_path: str) -> Optional[str]:
+        """Short content hash of a file, cached until its mtime or size changes."""
+        try:
+            stat_result = os.stat(full_path)
+        except OSError:
+            return None
+        key = (stat_result.st_mtime_ns, stat_result.st_size)
+        cached = self._versions.get(full_path)
+        if cached and cached[0] == key:
+            return cached[1]
+        with open(full_path, "rb") as f:
+            version = hashlib.sha256(f.read()).hexdigest()[:12]
+        self._versions[full_path] = (key, version)
+        return version
+
+    def file_response(
+        self,
+        full_path: Any,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        if full_path.endswith(".html"):
+            response: Response = self._page_response(full_path, status_code)
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            if query.get("v") == [self.asset_version(full_path)]:
+                response.headers["Cache-Control"] = f"public, max-age={self.max_age}, immutable"
+            else:
+                response.headers["Cache-Control"] = "no-cache"
+        if status_code == 200 and self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def _page_response(self, full_path: str, status_code: int) -> Response:
+        with open(full_path, encoding="utf-8") as f:
+            page = ASSET_REFERENCE.sub(lambda m: self._versioned(full_path, m), f.read())
+        body = page.encode("utf-8")
+        headers = {
+            "Cache-Control": "no-cache",
+            "ETag": f'"{hashlib.sha256(body).hexdigest()[:16]}"',
+        }
+        return Response(body, status_code=status_code, media_type="text/html", headers=headers)
+
+    def _versioned(self, page_path: str, match: "re.Match[str]") -> str:
+        reference = match.group("path")
+        if reference.startswith("/"):
+            asset = os.path.join(str(self.directory), reference.lstrip("/"))
+        else:
+            asset = os.path.join(os.path.dirname(page_path), reference)
+        asset = os.path.realpath(asset)
+        root = os.path.realpath(str(self.directory))
+        version = self.asset_version(asset) if asset.startswith(root + os.sep) and os.path.isfile(asset) else None
+        if version is None:
+            return match.group(0)
+        return f'{match.group("attr")}{reference}?v={version}"'
@@ -3,23 +3,41 @@
 import logging
 import os
 import shutil
-from typing import Any, Dict, List
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from fastapi.responses import JSONResponse
-from fastapi import APIRouter, File, UploadFile
+from fastapi import APIRouter, File, Header, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 
-from ..services.engine import DocumentEngine
+from ..core.coalesce import SingleFlight
+from ..core.config import settings
+from ..core.errors import ServiceUnavailable
+from ..core.metrics import track_stage
+from ..core.profiling import profile_request, resolve_mode
+from ..core.resilience import request_deadline
+from ..handlers import RetrievalOptions
+from ..services.engine import CONTENT_TYPE_HANDLERS, EXTENSION_CONTENT_TYPES, DocumentEngine
+from ..services.uploads import ChunkedUploads, UploadError
 
 logger = logging.getLogger(__name__)
 
 
 router = APIRouter()
 doc_engine = DocumentEngine()
-uploaded_files = []
+# Identical concurrent chat queries share one retrieval and LLM call
+chat_flight = SingleFlight("chat_coalesce")
 
 # Configure upload directory
-UPLOAD_DIR = "uploaded_files"
+UPLOAD_DIR = settings.UPLOAD_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+uploads = ChunkedUploads(
+    doc_engine.state,
+    UPLOAD_DIR,
+    chunk_size=settings.UPLOAD_CHUNK_SIZE,
+    max_size=settings.MAX_CHUNKED_UPLOAD_SIZE,
+    ttl=settings.UPLOAD_TTL,
+)
 
 
 # Pydantic models
@@ -28,14 +46,99 @@ class URLRequest(BaseModel):
     url: str = Field(..., description="URL of the document to process")
 
 
-class ChatRequest(BaseModel):
+class RetrievalControls(BaseModel):
+    """Optional retrieval controls shared by the chat request models."""
+    top_k: Optional[int] = Field(default=None, ge=1, le=50, description="Chunks to retrieve")
+    min_score: Optional[float] = Field(
+        default=None, description="Minimum similarity score for retrieved chunks"
+    )
+    mmr: Optional[bool] = Field(default=None, description="Use MMR for diverse retrieval")
+    documents: Optional[List[str]] = Field(
+        default=None, description="Only search these filenames"
+    )
+    document_types: Optional[List[str]] = Field(
+        default=None, description="Only search these types (pdf, docx, txt, web)"
+    )
+
+    def retrieval_options(self) -> RetrievalOptions:
+        """Build retrieval options, falling back to settings for unset fields."""
+        overrides = {"k": self.top_k, "min_score": self.min_score, "mmr": self.mmr}
+        return RetrievalOptions(**{k: v for k, v in overrides.items() if v is not None})
+
+
+class ChatRequest(RetrievalControls):
     """Request model for chat queries."""
     message: str = Field(..., description="User's question")
+    session_id: Optional[str] = Field(
+        default=None,
+        min_length=1,
+        max_length=128,
+        description="Chat session to continue; omit for a stateless question",
+    )
+
+
+class BatchChatRequest(RetrievalControls):
+    """Request model for batch chat queries."""
+    questions: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.BATCH_MAX_QUESTIONS,
+        description="Questions to answer",
+    )
+    max_concurrency: Optional[int] = Field(
+        default=None, ge=1, le=64, description="Concurrent retrievals and LLM calls"
+    )
+
+
+class BatchChatResult(BaseModel):
+    """Answer to one question of a batch."""
+    question: str
+    status: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    retrieve_ms: float = 0.0
+
+
+class BatchChatResponse(BaseModel):
+    """Response model for batch chat queries."""
+    results: List[BatchChatResult]
+    timings: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Shared embed time (embed_ms) and retrieve and generate time per document",
+    )
+    total_ms: float
 
 
 class ChatResponse(BaseModel):
     """Response model for chat queries."""
     response: str = Field(..., description="Answer to the user's question")
+    session_id: Optional[str] = Field(default=None, description="Chat session the turn was added to")
+    timings: Optional[Dict[str, Any]] = Field(
+        default=None, description="Stage-timing breakdown, only when profiling"
+    )
+
+
+class CreateUploadRequest(BaseModel):
+    """Request model for starting a chunked upload."""
+    filename: str = Field(..., min_length=1, description="Name of the file")
+    size: int = Field(..., ge=0, description="Total file size in bytes")
+    content_type: Optional[str] = Field(default=None, description="MIME type of the file")
+    sha256: Optional[str] = Field(
+        default=None,
+        pattern="^[0-9a-fA-F]{64}$",
+        description="Expected SHA-256 of the file, checked on completion",
+    )
+
+
+class UploadStatus(BaseModel):
+    """State of a chunked upload."""
+    upload_id: str
+    filename: str
+    size: int
+    offset: int = Field(..., description="Bytes received; the next chunk starts here")
+    chunk_size: int = Field(..., description="Suggested chunk size in bytes")
+    complete: bool
+    sha256: Optional[str] = Field(default=None, description="SHA-256 of the assembled file")
 
 
 class UploadResponse(BaseModel):
@@ -49,6 +152,125 @@ class ProcessResponse(BaseModel):
     message: str
     processed_count: int
     errors: List[str] = []
+    timings: Optional[Dict[str, Any]] = None
+
+
+def _profile_mode(request: Request) -> Optional[str]:
+    """Read the profiling mode from the X-Profile header or ?profile= flag."""
+    requested = request.headers.get("x-profile") or request.query_params.get("profile")
+    return resolve_mode(requested, settings.PROFILE_SAMPLE_RATE)
+
+
+def _content_type_for(filename: str, content_type: Optional[str]) -> Optional[str]:
+    """Resolve a supported MIME type from the declared type or the file extension."""
+    if content_type and content_type in CONTENT_TYPE_HANDLERS:
+        return content_type
+    extension = filename.lower().split('.')[-1] if '.' in filename else ''
+    return EXTENSION_CONTENT_TYPES.get(extension)
+
+
+def _upload_error(error: UploadError) -> JSONResponse:
+    content: Dict[str, Any] = {"error": str(error)}
+    if error.offset is not None:
+        content["offset"] = error.offset
+    return JSONResponse(status_code=error.status_code, content=content)
+
+
+def _parse_content_range(header: Optional[str]) -> Optional[Tuple[int, int, Optional[int]]]:
+    """
+    Parse ``bytes start-end/total`` into ``(start, end, total)``, or None if malformed.
+
+    ``total`` is None when the header gives it as ``*``.
+    """
+    if not header or not header.startswith("bytes "):
+        return None
+    try:
+        span, _, total = header[len("bytes "):].partition("/")
+        start, end = (int(part) for part in span.split("-"))
+        size = None if total == "*" else int(total)
+    except ValueError:
+        return None
+    if start < 0 or end < start or (size is not None and end >= size):
+        return None
+    return start, end, size
+
+
+async def _read_body(request: Request, limit: int) -> Optional[bytes]:
+    """Read the request body, or return None as soon as it exceeds ``limit`` bytes."""
+    data = bytearray()
+    async for chunk in request.stream():
+        data.extend(chunk)
+        if len(data) > limit:
+            return None
+    return bytes(data)
+
+
+def _request_timeout(request: Request, default: Optional[float]) -> Optional[float]:
+    """Deadline for the request; X-Request-Timeout can only shorten the default."""
+    header = request.headers.get("x-request-timeout")
+    try:
+        requested = float(header) if header else None
+    except ValueError:
+        requested = None
+    if requested is None or requested <= 0:
+        return default
+    return min(requested, default) if default else requested
+
+
+def _run_request(
+    mode: Optional[str],
+    timeout: Optional[float],
+    fn: Callable[..., Dict[str, Any]],
+    *args: Any,
+    **kwargs: Any,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Run engine work under a request profile and deadline.
+
+    Called in a worker thread, where the work runs: pyinstrument only
+    samples the thread it was started in. cProfile records the starting
+    thread on Python 3.11 and every thread from 3.12, so only one request
+    is cProfiled at a time and overlapping ones get timings only.
+
+    Returns:
+        The engine result and the timing breakdown, if profiled
+    """
+    with profile_request(mode, settings.PROFILE_DIR) as profile, request_deadline(timeout):
+        result = fn(*args, **kwargs)
+    return result, profile.breakdown() if profile else None
+
+
+def _process_uploads(uploaded_files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Process taken uploads in turn; runs in a worker thread."""
+    processed_count = 0
+    errors = []
+    logger.info(f"Received {len(uploaded_files)} files for processing")
+    # Process each uploaded file
+    for position, file_info in enumerate(uploaded_files):
+        try:
+            result = doc_engine.process_document(
+                file_info["file_location"],
+                file_info["content_type"]
+            )
+
+            if result["status"] == "success":
+                processed_count += 1
+                print(f"Successfully processed: {file_info['filename']}")
+            else:
+                error_msg = f"{file_info['filename']}: {result['message']}"
+                errors.append(error_msg)
+                print(f"Failed to process {file_info['filename']}: {result['message']}")
+
+        except ServiceUnavailable:
+            # Put unprocessed files back so a retry picks them up
+            for pending in uploaded_files[position:]:
+                doc_engine.state.add_upload(pending)
+            raise
+        except Exception as e:
+            error_msg = f"{file_info['filename']}: {str(e)}"
+            errors.append(error_msg)
+            print(f"Exception processing {file_info['filename']}: {e}")
+    return {"processed_count": processed_count, "errors": errors}
 
 
 @router.post("/upload", response_model=UploadResponse)
@@ -65,26 +287,9 @@ async def upload_file(file: UploadFile = File(...)):
     # Get file extension
     file_extension = file.filename.lower().split('.')[-1] if '.' in file.filename else ''
 
-    # Map file extensions to content types
-    extension_to_type = {
-        'pdf': 'application/pdf',
-        'txt': 'text/plain',
-        'doc': 'application/msword',
-        'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-    }
-
     # Determine content type
-    if file.content_type and file.content_type in [
-        "application/pdf",
-        "text/plain",
-        "application/msword",
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-    ]:
-        content_type = file.content_type
-    elif file_extension in extension_to_type:
-        content_type = extension_to_type[file_extension]
-    else:
-        from fastapi.responses import JSONResponse
+    content_type = _content_type_for(file.filename, file.content_type)
+    if content_type is None:
         return JSONResponse(
             status_code=400,
             content={"error": f"Unsupported file type: {file_extension}"}
@@ -92,11 +297,19 @@ async def upload_file(file: UploadFile = File(...)):
 
     print(f"Using content type: {content_type}")
 
+    # Larger files go through the chunked upload API
+    if settings.MAX_FILE_SIZE and file.size is not None and file.size > settings.MAX_FILE_SIZE:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"File is larger than {settings.MAX_FILE_SIZE} bytes; use /api/uploads"}
+        )
+
     file_location = os.path.join(UPLOAD_DIR, file.filename)
 
     # Save the file
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    with track_stage("upload_write", "api"):
+        with open(file_location, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
 
     # Store file info for later processing
     file_info = {
@@ -104,7 +317,7 @@ async def upload_file(file: UploadFile = File(...)):
         "file_location": file_location,
         "content_type": content_type
     }
-    uploaded_files.append(file_info)
+    doc_engine.state.add_upload(file_info)
 
     print("File uploaded successfully, ready for processing")
     return UploadResponse(
@@ -118,48 +331,142 @@ async def upload_file(file: UploadFile = File(...)):
     )
 
 
-@router.post("/process-documents", response_model=ProcessResponse)
-async def process_documents():
+@router.post("/uploads", response_model=UploadStatus, status_code=201)
+async def create_upload(upload_request: CreateUploadRequest):
+    """
+    Start a resumable chunked upload.
+
+    Send the file's bytes with ``PUT /uploads/{upload_id}`` in order, each
+    chunk carrying a ``Content-Range: bytes start-end/total`` header. After
+    an interruption, ``GET /uploads/{upload_id}`` returns the offset to
+    resume from. The completed file is queued for processing like
+    ``/upload``.
+    """
+    content_type = _content_type_for(upload_request.filename, upload_request.content_type)
+    if content_type is None:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Unsupported file type: {upload_request.filename}"}
+        )
+    try:
+        record = await run_in_threadpool(
+            uploads.create,
+            upload_request.filename,
+            upload_request.size,
+            content_type,
+            upload_request.sha256,
+        )
+    except UploadError as e:
+        return _upload_error(e)
+    logger.info(f"Started upload {record['upload_id']} for {record['filename']} ({record['size']} bytes)")
+    return UploadStatus(**record)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadStatus)
+async def get_upload(upload_id: str):
+    """Report how many bytes of a chunked upload were received."""
+    try:
+        return UploadStatus(**await run_in_threadpool(uploads.status, upload_id))
+    except UploadError as e:
+        return _upload_error(e)
+
+
+@router.put("/uploads/{upload_id}", response_model=UploadStatus)
+async def put_upload_chunk(
+    upload_id: str,
+    request: Request,
+    content_range: Optional[str] = Header(default=None),
+):
+    """
+    Append one chunk to a chunked upload.
+
+    A chunk that starts past the received offset is rejected with 409 and
+    the offset to resume from; one that overlaps received bytes only adds
+    the new ones. Chunks are limited to the session's ``chunk_size``, and
+    their size is checked before the body is read.
+    """
+    span = _parse_content_range(content_range)
+    if span is None:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Expected a 'Content-Range: bytes start-end/total' header"}
+        )
+    length = span[1] - span[0] + 1
+    declared = request.headers.get("content-length")
+    if length > uploads.chunk_size or (declared and declared.isdigit() and int(declared) > uploads.chunk_size):
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"Chunks are limited to {uploads.chunk_size} bytes"}
+        )
+    try:
+        upload = await run_in_threadpool(uploads.status, upload_id)
+    except UploadError as e:
+        return _upload_error(e)
+    if span[2] is not None and span[2] != upload["size"]:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Content-Range total does not match the upload size of {upload['size']} bytes"}
+        )
+    data = await _read_body(request, uploads.chunk_size)
+    if data is None:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"Chunks are limited to {uploads.chunk_size} bytes"}
+        )
+    if len(data) != length:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Chunk length does not match Content-Range"}
+        )
+    try:
+        record = await run_in_threadpool(uploads.append, upload_id, span[0], data)
+    except UploadError as e:
+        return _upload_error(e)
+    if record["complete"]:
+        logger.info(f"Upload {upload_id} complete: {record['filename']} sha256={record['sha256']}")
+    return UploadStatus(**record)
+
+
+@router.delete("/uploads/{upload_id}")
+async def cancel_upload(upload_id: str):
+    """Abandon a chunked upload and delete the bytes received so far."""
+    try:
+        await run_in_threadpool(uploads.cancel, upload_id)
+    except UploadError as e:
+        return _upload_error(e)
+    return {"status": "success", "message": "Upload cancelled"}
+
+
+@router.post(
+    "/process-documents",
+    response_model=ProcessResponse,
+    response_model_exclude_none=True,
+)
+async def process_documents(request: Request):
     """
     Process all uploaded files.
     
-    This endpoint processes files that were previously uploaded.
+    This endpoint processes files that were previously uploaded. Send
+    ``X-Profile: timings|cprofile|sample`` to get a stage-timing breakdown.
     """
-    from fastapi.responses import JSONResponse
-
     try:
+        # Taking the queue is atomic, so concurrent workers never process a file twice
+        uploaded_files = await run_in_threadpool(doc_engine.state.take_uploads)
         if not uploaded_files:
             return JSONResponse(
                 status_code=400,
                 content={"error": "No files uploaded"}
             )
 
-        processed_count = 0
-        errors = []
-        logger.info(f"Received files : {uploaded_files} ")
-        # Process each uploaded file
-        for file_info in uploaded_files:
-            try:
-                result = doc_engine.process_document(
-                    file_info["file_location"],
-                    file_info["content_type"]
-                )
-
-                if result["status"] == "success":
-                    processed_count += 1
-                    print(f"Successfully processed: {file_info['filename']}")
-                else:
-                    error_msg = f"{file_info['filename']}: {result['message']}"
-                    errors.append(error_msg)
-                    print(f"Failed to process {file_info['filename']}: {result['message']}")
-
-            except Exception as e:
-                error_msg = f"{file_info['filename']}: {str(e)}"
-                errors.append(error_msg)
-                print(f"Exception processing {file_info['filename']}: {e}")
-
-        # Clear uploaded files list
-        uploaded_files.clear()
+        # Ingestion waits for admission for up to INGEST_ADMISSION_TIMEOUT; keep it off the event loop
+        outcome, timings = await run_in_threadpool(
+            _run_request,
+            _profile_mode(request),
+            _request_timeout(request, None),
+            _process_uploads,
+            uploaded_files,
+        )
+        processed_count, errors = outcome["processed_count"], outcome["errors"]
 
         if processed_count == 0:
             return JSONResponse(
@@ -174,9 +481,12 @@ async def process_documents():
         return ProcessResponse(
             message=response_message,
             processed_count=processed_count,
-            errors=errors
+            errors=errors,
+            timings=timings,
         )
 
+    except ServiceUnavailable:
+        raise
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
@@ -216,12 +526,13 @@ async def process_url(url_request: URLRequest):
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat_with_documents(chat_request: ChatRequest):
+@router.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
+async def chat_with_documents(chat_request: ChatRequest, request: Request):
     """
     Chat with the processed documents.
     
-    Answers questions based on the uploaded and processed documents.
+    Answers questions based on the uploaded and processed documents. Send
+    ``X-Profile: timings|cprofile|sample`` to get a stage-timing breakdown.
     """
     
     logger.info(f"Received message : {chat_request.message} from user")
@@ -229,13 +540,96 @@ async def chat_with_documents(chat_request: ChatRequest):
 
     try:
         logger.info("waiting for query response...")
-        result = doc_engine.query_documents(query)
+        retrieval = chat_request.retrieval_options()
+        mode = _profile_mode(request)
+
+        def call():
+            return run_in_threadpool(
+                _run_request,
+                mode,
+                _request_timeout(request, settings.REQUEST_TIMEOUT),
+                doc_engine.query_documents,
+                query,
+                retrieval=retrieval,
+                documents=chat_request.documents,
+                document_types=chat_request.document_types,
+                session_id=chat_request.session_id,
+            )
+
+        if mode or request.headers.get("x-request-timeout"):
+            # A joined request would inherit this one's profile and deadline
+            result, timings = await call()
+        else:
+            # The key includes the corpus version, a state backend read
+            key = await run_in_threadpool(
+                doc_engine.coalescing_key,
+                query,
+                retrieval,
+                chat_request.documents,
+                chat_request.document_types,
+                chat_request.session_id,
+            )
+            result, timings = await chat_flight.run(key, call)
         logger.info(f"i should get  query response...")
         if result["status"] == "error":
             return JSONResponse(status_code=400, content={"error": result["message"]})
 
-        return ChatResponse(response=result["answer"])
+        return ChatResponse(
+            response=result["answer"],
+            session_id=chat_request.session_id,
+            timings=timings,
+        )
+
+    except ServiceUnavailable:
+        raise
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@router.post("/chat/batch", response_model=BatchChatResponse, response_model_exclude_none=True)
+async def chat_batch(batch_request: BatchChatRequest, request: Request):
+    """
+    Answer many questions in one request.
+
+    Questions are embedded in a single batched call, retrievals run
+    concurrently and answers are generated through the LLM batch interface.
+    """
+    logger.info(f"Received batch of {len(batch_request.questions)} questions")
+    start = perf_counter()
+
+    try:
+        # Admission waits and provider calls block; keep them off the event loop
+        result, _ = await run_in_threadpool(
+            _run_request,
+            None,
+            _request_timeout(request, settings.BATCH_REQUEST_TIMEOUT),
+            doc_engine.query_batch,
+            batch_request.questions,
+            retrieval=batch_request.retrieval_options(),
+            documents=batch_request.documents,
+            document_types=batch_request.document_types,
+            max_concurrency=batch_request.max_concurrency or settings.BATCH_MAX_CONCURRENCY,
+        )
+        if result["status"] == "error":
+            return JSONResponse(status_code=400, content={"error": result["message"]})
+
+        return BatchChatResponse(
+            results=[
+                BatchChatResult(
+                    question=item["question"],
+                    status=item["status"],
+                    answer=item.get("answer"),
+                    error=item.get("message"),
+                    retrieve_ms=item["retrieve_ms"],
+                )
+                for item in result["results"]
+            ],
+            timings=result["timings"],
+            total_ms=round((perf_counter() - start) * 1000, 3),
+        )
 
+    except ServiceUnavailable:
+        raise
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
@@ -0,0 +1,105 @@
+"""Command-line tools."""
+
+import argparse
+import logging
+import sys
+from typing import List, Optional
+
+from .core.config import settings
+
+
+def _ephemeral_backends() -> List[str]:
+    """Backends that keep ingested data only inside this process."""
+    ephemeral = []
+    if settings.STATE_BACKEND == "memory":
+        ephemeral.append("STATE_BACKEND=memory (the document registry)")
+    if settings.VECTOR_BACKEND == "local":
+        ephemeral.append("VECTOR_BACKEND=local (the vector index)")
+    return ephemeral
+
+
+def ingest(argv: Optional[List[str]] = None) -> int:
+    """
+    Bulk-ingest a directory tree into the configured index.
+
+    Args:
+        argv: Command-line arguments, without the command name
+
+    Returns:
+        Process exit code: 0 when every file was ingested or unchanged, 2 when
+        the configured backends would discard the results on exit
+    """
+    parser = argparse.ArgumentParser(
+        prog="run.py ingest",
+        description="Parse, embed and index every PDF, DOCX and TXT file under a directory.",
+    )
+    parser.add_argument("directory", help="Directory to walk")
+    parser.add_argument(
+        "--manifest",
+        default=settings.INGEST_MANIFEST_PATH,
+        help="JSON-lines manifest of ingested files, used to resume (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=settings.INGEST_PARSE_WORKERS,
+        help="Processes loading and splitting files (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--index-concurrency",
+        type=int,
+        default=settings.INGEST_INDEX_CONCURRENCY,
+        help="Files embedded and indexed at once (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-ingest files the manifest lists as unchanged",
+    )
+    parser.add_argument(
+        "--allow-ephemeral",
+        action="store_true",
+        help="Run even if the state or vector backend does not outlive the process, e.g. to measure throughput",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    ephemeral = _ephemeral_backends()
+    if ephemeral and not args.allow_ephemeral:
+        print(
+            f"Refusing to ingest: {', '.join(ephemeral)} would be lost when this command exits, "
+            "and the manifest would still mark the files as done. Use STATE_BACKEND=sqlite and "
+            "VECTOR_BACKEND=pinecone, or pass --allow-ephemeral.",
+            file=sys.stderr,
+        )
+        return 2
+    if ephemeral:
+        logging.warning(f"Ingested data is discarded on exit: {', '.join(ephemeral)}")
+
+    from .services.engine import DocumentEngine
+    from .services.ingest import BulkIngester, IngestManifest
+
+    ingester = BulkIngester(
+        DocumentEngine(),
+        IngestManifest(args.manifest),
+        parse_workers=args.parse_workers,
+        index_concurrency=args.index_concurrency,
+    )
+    stats = ingester.run(args.directory, force=args.force)
+    print(stats.summary())
+    for error in stats.errors:
+        print(f"  failed: {error}", file=sys.stderr)
+    return 1 if stats.failed else 0
+
+
+COMMANDS = {"ingest": ingest}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Dispatch ``argv[0]`` to a command."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(f"usage: run.py [{' | '.join(COMMANDS)}] ...", file=sys.stderr)
+        return 2
+    return COMMANDS[argv[0]](argv[1:])
@@ -0,0 +1,178 @@
+"""Admission control and backpressure for provider calls."""
+
+import logging
+import math
+import threading
+from contextlib import contextmanager
+from time import monotonic
+from typing import Dict, Iterator, Optional
+
+from .config import settings
+from .errors import ServiceUnavailable
+from .metrics import observe_admission_wait, record_admission_rejected, set_admission_state
+from .resilience import admission_scope, time_remaining
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(ServiceUnavailable):
+    """Raised when a pool's wait queue is full or the wait times out."""
+
+    status_code = 429
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"Server busy: {pool} capacity exhausted, retry in {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(self.retry_after)}
+
+
+class AdmissionPool:
+    """
+    Bounded concurrency with a bounded wait queue.
+
+    At most ``max_concurrent`` weighted slots are held at once and at most
+    ``max_queue`` callers wait for one. Callers beyond that, or callers that
+    wait longer than ``max_wait`` seconds, are rejected immediately with a
+    Retry-After estimate instead of piling onto the provider.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, max_wait: Optional[float]):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        # Smoothed seconds a slot is held, for Retry-After estimates
+        self._hold_seconds = 1.0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    @contextmanager
+    def admit(self, weight: int = 1) -> Iterator[None]:
+        """
+        Hold ``weight`` slots for the duration of the block.
+
+        Args:
+            weight: Slots to hold, e.g. the fan-out of a batched LLM call
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        weight = max(1, min(weight, self.max_concurrent))
+        max_wait = self.max_wait
+        remaining = time_remaining()
+        if remaining is not None:
+            # Never queue past the request deadline
+            max_wait = max(0.0, remaining if max_wait is None else min(max_wait, remaining))
+        start = monotonic()
+        with self._cond:
+            if self._active + weight > self.max_concurrent:
+                if self._waiting >= self.max_queue:
+                    raise self._reject()
+                self._waiting += 1
+                self._publish()
+                try:
+                    admitted = self._cond.wait_for(
+                        lambda: self._active + weight <= self.max_concurrent,
+                        timeout=max_wait,
+                    )
+                finally:
+                    self._waiting -= 1
+                if not admitted:
+                    self._publish()
+                    raise self._reject()
+            self._active += weight
+            self._publish()
+        observe_admission_wait(self.name, monotonic() - start)
+
+        acquired = monotonic()
+        try:
+            with admission_scope(self):
+                yield
+        finally:
+            with self._cond:
+                self._active -= weight
+                self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * (monotonic() - acquired)
+                self._publish()
+                self._cond.notify_all()
+
+    def try_hold(self) -> bool:
+        """Take one extra slot if one is free, without waiting; see ``release``."""
+        with self._cond:
+            if self._active >= self.max_concurrent:
+                return False
+            self._active += 1
+            self._publish()
+            return True
+
+    def hold(self) -> None:
+        """
+        Take one extra slot even if the pool is full; see ``release``.
+
+        Used for provider calls abandoned while still running, so new
+        callers wait until they really finish.
+        """
+        with self._cond:
+            self._active += 1
+            self._publish()
+
+    def release(self) -> None:
+        """Give back a slot taken with ``try_hold`` or ``hold``."""
+        with self._cond:
+            self._active -= 1
+            self._publish()
+            self._cond.notify_all()
+
+    def _reject(self) -> AdmissionRejected:
+        record_admission_rejected(self.name)
+        # Time for the queue ahead of a new caller to drain through the slots
+        retry_after = math.ceil(self._hold_seconds * (self._waiting + 1) / self.max_concurrent)
+        logger.warning(f"Admission rejected for {self.name} pool ({self._waiting} waiting)")
+        return AdmissionRejected(self.name, max(1, retry_after))
+
+    def _publish(self) -> None:
+        set_admission_state(self.name, self._active, self._waiting)
+
+
+class AdmissionGovernor:
+    """Separate admission pools for interactive chat, batch generation and bulk ingestion."""
+
+    def __init__(self):
+        self.pools: Dict[str, AdmissionPool] = {
+            "chat": AdmissionPool(
+                "chat",
+                settings.CHAT_MAX_CONCURRENCY,
+                settings.CHAT_MAX_QUEUE,
+                settings.CHAT_ADMISSION_TIMEOUT,
+            ),
+            "batch": AdmissionPool(
+                "batch",
+                settings.BATCH_POOL_SIZE,
+                settings.BATCH_MAX_QUEUE,
+                settings.BATCH_ADMISSION_TIMEOUT,
+            ),
+            "ingest": AdmissionPool(
+                "ingest",
+                settings.INGEST_MAX_CONCURRENCY,
+                settings.INGEST_MAX_QUEUE,
+                settings.INGEST_ADMISSION_TIMEOUT,
+            ),
+        }
+
+    def admit(self, pool: str, weight: int = 1):
+        """Hold slots in the named pool; see ``AdmissionPool.admit``."""
+        return self.pools[pool].admit(weight)
+
+
+governor = AdmissionGovernor()
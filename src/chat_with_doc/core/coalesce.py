@@ -0,0 +1,80 @@
+"""Request coalescing for identical concurrent work."""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Share one in-flight call between concurrent callers with the same key.
+
+    The first caller for a key starts the call as a task. Later callers
+    with the same key await that task instead of starting their own. Every
+    waiter gets the result or the exception. A waiter that is cancelled
+    leaves without cancelling the shared call, unless it was the last one
+    waiting. The key is released as soon as the call finishes, so results
+    are never served after the fact.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize the coalescer.
+
+        Args:
+            name: Label used for the coalescing hit/miss metrics
+        """
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def in_flight(self) -> int:
+        """Return the number of distinct calls currently running."""
+        return len(self._flights)
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``call`` or join an identical call already in flight.
+
+        Args:
+            key: Identity of the work; equal keys share one call
+            call: Zero-argument coroutine factory performing the work
+
+        Returns:
+            The shared call's result
+
+        Raises:
+            Exception: Whatever the shared call raised
+        """
+        flight = self._flights.get(key)
+        record_cache("engine", self.name, hit=flight is not None)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._release(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Nobody else is waiting; stop the shared work too
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _release(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            logger.debug(f"Coalesced call for {key!r} failed: {flight.task.exception()}")
@@ -22,21 +22,117 @@ class Settings:
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "gemini-embedding-001")
     EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "768"))  # Gemini recommended default
 
-    # Vector database 
+    # Vector database: "pinecone", or "local" for the in-process index (single worker only)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+    LOCAL_INDEX_QUANTIZATION = os.getenv("LOCAL_INDEX_QUANTIZATION", "int8")  # float32 | float16 | int8
+    LOCAL_INDEX_RESCORE = os.getenv("LOCAL_INDEX_RESCORE", "false").lower() == "true"
+    LOCAL_INDEX_RESCORE_FACTOR = int(os.getenv("LOCAL_INDEX_RESCORE_FACTOR", "4"))
+    LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "")  # memory-map rescoring vectors here
+    LOCAL_INDEX_COARSE_DIM = int(os.getenv("LOCAL_INDEX_COARSE_DIM", "0"))  # e.g. 128 or 256; 0 disables
+    LOCAL_INDEX_COARSE_FACTOR = int(os.getenv("LOCAL_INDEX_COARSE_FACTOR", "10"))
     PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
     PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
     PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
     PINECONE_NAMESPACE = os.getenv("PINECONE_NAMESPACE")
+    PINECONE_POOL_THREADS = int(os.getenv("PINECONE_POOL_THREADS", "8"))  # parallel upsert requests
+    PINECONE_UPSERT_BATCH_SIZE = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", "100"))  # vectors per request
     # Text Processing
     CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
     CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+    CHUNK_LENGTH_UNIT = os.getenv("CHUNK_LENGTH_UNIT", "chars")  # chars | tokens
+    SPLIT_WORKERS = int(os.getenv("SPLIT_WORKERS", "1"))  # >1 splits in a process pool
+    SPLIT_PARALLEL_MIN_CHARS = int(os.getenv("SPLIT_PARALLEL_MIN_CHARS", "2000000"))
+
+    # Large-file ingestion
+    TXT_STREAMING_THRESHOLD = int(os.getenv("TXT_STREAMING_THRESHOLD", "33554432"))  # 32MB
+    TXT_STREAM_WINDOW_BYTES = int(os.getenv("TXT_STREAM_WINDOW_BYTES", "4194304"))  # 4MB
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))  # chunks per upsert batch
+
+    # Bulk ingestion CLI (python run.py ingest DIR)
+    INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", str(os.cpu_count() or 1)))
+    INGEST_INDEX_CONCURRENCY = int(os.getenv("INGEST_INDEX_CONCURRENCY", "4"))
+    INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", "state/ingest_manifest.jsonl")
+
+    # Retrieval and context packing
+    RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "4"))
+    RETRIEVAL_MMR = os.getenv("RETRIEVAL_MMR", "false").lower() == "true"
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+    CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.9"))  # 0 disables
+
+    # Document routing: query only the ROUTING_TOP_M documents whose centroids are
+    # closest to the question, once more than ROUTING_MIN_DOCUMENTS are loaded
+    ROUTING_TOP_M = int(os.getenv("ROUTING_TOP_M", "0"))  # 0 disables
+    ROUTING_MIN_DOCUMENTS = int(os.getenv("ROUTING_MIN_DOCUMENTS", "10"))
+
+    # Conversation memory: recent turns are kept verbatim (each clipped to
+    # CONVERSATION_TURN_TOKENS), older ones are folded into a rolling summary
+    CONVERSATION_RECENT_TURNS = int(os.getenv("CONVERSATION_RECENT_TURNS", "4"))
+    CONVERSATION_TURN_TOKENS = int(os.getenv("CONVERSATION_TURN_TOKENS", "300"))
+    CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "400"))
+    CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", "86400"))  # seconds
+
+    # Shared engine state (use "sqlite" when running more than one worker)
+    STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+    STATE_DB_PATH = os.getenv("STATE_DB_PATH", "state/chatwithdoc.db")
 
     # Application Settings
     UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploaded_files")
-    MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "26214400"))  # 25MB
+    MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "26214400"))  # 25MB, single-request uploads
+    # Chunked uploads: size limit, suggested chunk size and how long unfinished uploads can resume
+    MAX_CHUNKED_UPLOAD_SIZE = int(os.getenv("MAX_CHUNKED_UPLOAD_SIZE", "1073741824"))  # 1GB
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", "4194304"))  # 4MB
+    UPLOAD_TTL = int(os.getenv("UPLOAD_TTL", "86400"))  # seconds
+
+    # Batch chat
+    BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+    # Admission control for provider calls (full queue or timeout -> HTTP 429)
+    CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "16"))
+    CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "64"))
+    CHAT_ADMISSION_TIMEOUT = float(os.getenv("CHAT_ADMISSION_TIMEOUT", "5"))  # seconds
+    INGEST_MAX_CONCURRENCY = int(os.getenv("INGEST_MAX_CONCURRENCY", "4"))
+    INGEST_MAX_QUEUE = int(os.getenv("INGEST_MAX_QUEUE", "256"))
+    INGEST_ADMISSION_TIMEOUT = float(os.getenv("INGEST_ADMISSION_TIMEOUT", "300"))  # seconds
+    # Batch generation has its own slots so batches cannot starve interactive chat
+    BATCH_POOL_SIZE = int(os.getenv("BATCH_POOL_SIZE", "8"))
+    BATCH_MAX_QUEUE = int(os.getenv("BATCH_MAX_QUEUE", "16"))
+    BATCH_ADMISSION_TIMEOUT = float(os.getenv("BATCH_ADMISSION_TIMEOUT", "60"))  # seconds
+
+    # Provider call resilience (timeouts in seconds; HEDGE_PERCENTILE=0 disables hedging)
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+    EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "20"))
+    SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "10"))
+    UPSERT_TIMEOUT = float(os.getenv("UPSERT_TIMEOUT", "120"))
+    PROVIDER_RETRIES = int(os.getenv("PROVIDER_RETRIES", "2"))
+    PROVIDER_BACKOFF_BASE = float(os.getenv("PROVIDER_BACKOFF_BASE", "0.2"))
+    PROVIDER_BACKOFF_MAX = float(os.getenv("PROVIDER_BACKOFF_MAX", "5"))
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0"))
+    HEDGE_OPERATIONS = os.getenv("HEDGE_OPERATIONS", "embed,search")
+    PROVIDER_THREADS = int(os.getenv("PROVIDER_THREADS", "64"))
+
+    # Request deadlines (clients may shorten them with X-Request-Timeout)
+    REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "90"))
+    BATCH_REQUEST_TIMEOUT = float(os.getenv("BATCH_REQUEST_TIMEOUT", "600"))
+
+    # Profiling (opt-in per request via X-Profile header or ?profile= flag)
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
 
     # API Settings
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
+
+    # Response compression (Brotli when the brotli package is installed) and static asset caching
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+    GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+    BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+    STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "31536000"))  # seconds, for content-hashed assets
+
+    # Startup warm-up; /ready reports ready once it finishes
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_LLM = os.getenv("WARMUP_LLM", "false").lower() == "true"  # one tiny generation per client
+    WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "30"))  # seconds per component
+    WARMUP_RETRY_INTERVAL = float(os.getenv("WARMUP_RETRY_INTERVAL", "10"))  # seconds
     API_TITLE = "ChatWithDoc API"
     API_VERSION = "1.0.0"
 
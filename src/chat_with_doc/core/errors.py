@@ -0,0 +1,19 @@
+"""Exceptions that abort a whole request rather than one document."""
+
+from typing import Dict
+
+
+class ServiceUnavailable(Exception):
+    """
+    Base for failures the client should see as an HTTP error.
+
+    Handlers and the engine turn ordinary exceptions into per-document
+    ``{"status": "error"}`` results. Subclasses of this class are re-raised
+    instead, so the API can answer with ``status_code`` and ``headers()``.
+    """
+
+    status_code = 503
+
+    def headers(self) -> Dict[str, str]:
+        """Extra response headers, e.g. Retry-After."""
+        return {}
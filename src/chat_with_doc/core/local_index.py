@@ -0,0 +1,544 @@
+"""In-process vector index with quantized embedding storage."""
+
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATIONS = ("float32", "float16", "int8")
+
+_CODE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Largest int8 code; symmetric so that -v quantizes to -code(v)
+INT8_MAX = 127
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so dot products are cosine similarities."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors: np.ndarray, quantization: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Encode float32 rows for storage.
+
+    Args:
+        vectors: Unit-length float32 rows
+        quantization: One of ``QUANTIZATIONS``
+
+    Returns:
+        Codes, and for int8 the per-row scales that map codes back to floats
+    """
+    if quantization == "int8":
+        scales = np.abs(vectors).max(axis=1) / INT8_MAX
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).clip(-INT8_MAX, INT8_MAX).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return vectors.astype(_CODE_DTYPES[quantization]), None
+
+
+class LocalVectorIndex:
+    """
+    Cosine-similarity index held in contiguous NumPy arrays.
+
+    Vectors are normalized and stored as float32, float16 (2 bytes per
+    dimension) or int8 with a float32 scale per vector (1 byte per
+    dimension). Search scores the quantized codes block by block, so no
+    full-size float32 copy is ever materialized. With ``rescore`` enabled
+    the original float32 vectors are also kept, memory-mapped from
+    ``rescore_dir`` when given, and the best ``k * rescore_factor``
+    candidates are re-ranked exactly. Chunk text and metadata live in plain
+    lists; ``Document`` objects are only built for results.
+
+    With ``coarse_dim`` set, a renormalized prefix of each vector is stored
+    in a second, smaller array. Search scans only the prefixes and scores
+    the best ``k * coarse_factor`` at full dimension. This suits
+    Matryoshka-trained embeddings such as Gemini's, whose leading
+    dimensions carry most of the signal.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        quantization: str = "int8",
+        rescore: bool = False,
+        rescore_factor: int = 4,
+        rescore_dir: Optional[str] = None,
+        coarse_dim: int = 0,
+        coarse_factor: int = 10,
+        block_rows: int = 8192,
+    ):
+        """
+        Initialize an empty index.
+
+        Args:
+            dim: Embedding dimension
+            quantization: Storage type, one of ``QUANTIZATIONS``
+            rescore: Keep float32 vectors and re-rank candidates with them
+            rescore_factor: Candidates scored exactly per requested result
+            rescore_dir: Directory for the memory-mapped float32 vectors;
+                None keeps them in memory
+            coarse_dim: Prefix dimensions for the coarse pass; 0 disables it
+            coarse_factor: Coarse candidates scored at full dimension per result
+            block_rows: Rows dequantized at a time while scoring
+        """
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantization!r}; use one of {QUANTIZATIONS}")
+        if not 0 <= coarse_dim < dim:
+            raise ValueError(f"coarse_dim must be below the embedding dimension ({dim})")
+        self.dim = dim
+        self.quantization = quantization
+        self.rescore = rescore
+        self.rescore_factor = max(1, rescore_factor)
+        self.rescore_dir = rescore_dir
+        self.coarse_dim = coarse_dim
+        self.coarse_factor = max(1, coarse_factor)
+        self.block_rows = block_rows
+
+        self._lock = threading.RLock()
+        self._size = 0
+        self._codes = np.empty((0, dim), dtype=_CODE_DTYPES[quantization])
+        self._scales = np.empty(0, dtype=np.float32)
+        self._prefix_codes = np.empty((0, coarse_dim), dtype=_CODE_DTYPES[quantization])
+        self._prefix_scales = np.empty(0, dtype=np.float32)
+        self._full: Optional[np.ndarray] = None
+        self._full_path: Optional[str] = None
+        self._source_codes = np.empty(0, dtype=np.int32)
+        self._sources: Dict[Any, int] = {}
+        self._row_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Bytes held by the vector arrays.
+
+        Returns:
+            ``codes`` and ``scales`` bytes, ``coarse`` bytes for the prefix
+            array, and ``rescore`` bytes for the float32 copy, which are on
+            disk when memory-mapped
+        """
+        rows = self._size
+        scale_bytes = self._scales.itemsize if self.quantization == "int8" else 0
+        return {
+            "codes": rows * self._codes.itemsize * self.dim,
+            "scales": rows * scale_bytes,
+            "coarse": rows * (self._prefix_codes.itemsize * self.coarse_dim + scale_bytes)
+            if self.coarse_dim else 0,
+            "rescore": rows * 4 * self.dim if self._full is not None else 0,
+        }
+
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        texts: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+    ) -> None:
+        """
+        Insert or overwrite vectors.
+
+        Args:
+            ids: Vector IDs; an existing ID is overwritten in place
+            vectors: Embeddings, one per ID
+            texts: Chunk texts
+            metadatas: Chunk metadata dicts
+        """
+        if not ids:
+            return
+        matrix = normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim))
+        codes, scales = quantize(matrix, self.quantization)
+        with self._lock:
+            rows = []
+            for vector_id, text, metadata in zip(ids, texts, metadatas):
+                row = self._rows.get(vector_id)
+                if row is None:
+                    row = self._rows[vector_id] = len(self._row_ids)
+                    self._row_ids.append(vector_id)
+                    self._texts.append(text)
+                    self._metadatas.append(dict(metadata))
+                else:
+                    self._texts[row] = text
+                    self._metadatas[row] = dict(metadata)
+                rows.append(row)
+
+            self._reserve(len(self._row_ids))
+            index = np.asarray(rows)
+            self._codes[index] = codes
+            if scales is not None:
+                self._scales[index] = scales
+            if self.coarse_dim:
+                prefix_codes, prefix_scales = quantize(
+                    normalize(matrix[:, :self.coarse_dim]), self.quantization
+                )
+                self._prefix_codes[index] = prefix_codes
+                if prefix_scales is not None:
+                    self._prefix_scales[index] = prefix_scales
+            if self._full is not None:
+                self._full[index] = matrix
+            self._source_codes[index] = [
+                self._source_code(metadata.get("source")) for metadata in metadatas
+            ]
+            self._size = len(self._row_ids)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """
+        Remove vectors and compact the arrays.
+
+        Rows are renumbered, so row numbers from an earlier ``search`` are
+        only valid while the lock is held.
+
+        Args:
+            ids: Vector IDs; unknown IDs are ignored
+
+        Returns:
+            Number of vectors removed
+        """
+        with self._lock:
+            dropped = [self._rows[vector_id] for vector_id in set(ids) if vector_id in self._rows]
+            if not dropped:
+                return 0
+            keep = np.ones(self._size, dtype=bool)
+            keep[dropped] = False
+            kept = np.flatnonzero(keep)
+            size = len(kept)
+            arrays = (
+                self._codes, self._scales, self._prefix_codes, self._prefix_scales,
+                self._source_codes,
+            )
+            for array in arrays:
+                array[:size] = array[kept]
+            if self._full is not None:
+                self._full[:size] = self._full[kept]
+            self._row_ids = [self._row_ids[row] for row in kept]
+            self._texts = [self._texts[row] for row in kept]
+            self._metadatas = [self._metadatas[row] for row in kept]
+            self._rows = {vector_id: row for row, vector_id in enumerate(self._row_ids)}
+            self._size = size
+            return len(dropped)
+
+    def ids(self, prefix: str = "") -> List[str]:
+        """Return the vector IDs starting with ``prefix``."""
+        with self._lock:
+            return [vector_id for vector_id in self._row_ids if vector_id.startswith(prefix)]
+
+    def search(
+        self,
+        vector: Sequence[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the rows most similar to a query vector.
+
+        Args:
+            vector: Query embedding
+            k: Number of results
+            filter: Metadata filter, e.g. ``{"source": {"$in": [...]}}``
+
+        Returns:
+            ``(row, cosine similarity)`` pairs, best first
+        """
+        query = normalize(np.asarray(vector, dtype=np.float32).reshape(1, self.dim))[0]
+        with self._lock:
+            if self._size == 0:
+                return []
+            # Filtered searches only touch the rows that pass the filter
+            rows = np.flatnonzero(self._filter_mask(filter)) if filter else None
+            if self.coarse_dim:
+                # Coarse pass over prefixes, then full dimension on the shortlist
+                prefix = normalize(query[None, :self.coarse_dim])[0]
+                coarse = self._score(prefix, self._prefix_codes, self._prefix_scales, rows)
+                shortlist = self._top(coarse, k * self.coarse_factor)
+                scores = self._score(query, self._codes, self._scales, shortlist)
+            else:
+                scores = self._score(query, self._codes, self._scales, rows)
+            candidates = self._top(scores, k * self.rescore_factor if self._full is not None else k)
+            if self._full is not None and len(candidates):
+                scores = np.full(self._size, -np.inf, dtype=np.float32)
+                scores[candidates] = self._full[candidates] @ query
+                candidates = self._top(scores, k)
+            return [(int(row), float(scores[row])) for row in candidates]
+
+    def vectors(self, rows: Sequence[int]) -> np.ndarray:
+        """Return float32 vectors for rows, exact when rescoring is enabled."""
+        index = np.asarray(rows, dtype=np.int64)
+        with self._lock:
+            if self._full is not None:
+                return np.array(self._full[index])
+            return self._decode(index)
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        decoded = self._codes[rows].astype(np.float32)
+        if self.quantization == "int8":
+            decoded *= self._scales[rows][:, None]
+        return decoded
+
+    def document(self, row: int) -> Document:
+        """Build the Document for a row."""
+        return Document(
+            id=self._row_ids[row],
+            page_content=self._texts[row],
+            metadata=dict(self._metadatas[row]),
+        )
+
+    def _score(
+        self,
+        query: np.ndarray,
+        codes: np.ndarray,
+        scales: np.ndarray,
+        rows: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Score rows of a code array, dequantizing block by block.
+
+        Args:
+            query: Unit-length query matching the code width
+            codes: Full-dimension or prefix codes
+            scales: Per-row int8 scales for ``codes``
+            rows: Rows to score; None scores every row
+
+        Returns:
+            Scores for all rows, ``-inf`` for rows not scored
+        """
+        if rows is None:
+            scores = np.empty(self._size, dtype=np.float32)
+            for start in range(0, self._size, self.block_rows):
+                end = min(start + self.block_rows, self._size)
+                scores[start:end] = codes[start:end].astype(np.float32) @ query
+            if self.quantization == "int8":
+                scores *= scales[:self._size]
+            return scores
+
+        scores = np.full(self._size, -np.inf, dtype=np.float32)
+        for start in range(0, len(rows), self.block_rows):
+            block = rows[start:start + self.block_rows]
+            block_scores = codes[block].astype(np.float32) @ query
+            if self.quantization == "int8":
+                block_scores *= scales[block]
+            scores[block] = block_scores
+        return scores
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the ``k`` highest finite scores, best first."""
+        valid = int(np.isfinite(scores).sum())
+        k = min(k, valid)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def _filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        """Evaluate an ``$eq``/``$in`` metadata filter over all rows."""
+        mask = np.ones(self._size, dtype=bool)
+        for field, condition in filter.items():
+            if isinstance(condition, dict):
+                if "$in" in condition:
+                    allowed = list(condition["$in"])
+                elif "$eq" in condition:
+                    allowed = [condition["$eq"]]
+                else:
+                    raise ValueError(f"Unsupported filter operator in {condition!r}")
+            else:
+                allowed = [condition]
+
+            if field == "source":
+                codes = [self._sources[value] for value in allowed if value in self._sources]
+                mask &= np.isin(self._source_codes[:self._size], codes)
+            else:
+                mask &= np.fromiter(
+                    (metadata.get(field) in allowed for metadata in self._metadatas),
+                    dtype=bool,
+                    count=self._size,
+                )
+        return mask
+
+    def _source_code(self, source: Any) -> int:
+        code = self._sources.get(source)
+        if code is None:
+            code = self._sources[source] = len(self._sources)
+        return code
+
+    def _reserve(self, rows: int) -> None:
+        """Grow the arrays geometrically so appends stay amortized O(1)."""
+        capacity = len(self._codes)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 1024)
+        self._codes = _grown(self._codes, capacity)
+        self._scales = _grown(self._scales, capacity)
+        self._prefix_codes = _grown(self._prefix_codes, capacity)
+        self._prefix_scales = _grown(self._prefix_scales, capacity)
+        self._source_codes = _grown(self._source_codes, capacity)
+        if self.rescore:
+            self._full = self._grown_full(capacity)
+
+    def _grown_full(self, capacity: int) -> np.ndarray:
+        if self.rescore_dir is None:
+            current = self._full if self._full is not None else np.empty((0, self.dim), np.float32)
+            return _grown(current, capacity)
+        if self._full_path is None:
+            os.makedirs(self.rescore_dir, exist_ok=True)
+            self._full_path = os.path.join(self.rescore_dir, f"vectors-{uuid.uuid4().hex}.f32")
+            open(self._full_path, "wb").close()
+        if self._full is not None:
+            self._full.flush()
+            self._full = None
+        with open(self._full_path, "r+b") as f:
+            f.truncate(capacity * self.dim * 4)
+        return np.memmap(self._full_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+
+def _grown(array: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain vector store over a ``LocalVectorIndex``."""
+
+    def __init__(self, index: LocalVectorIndex, embedding: Embeddings):
+        self.index = index
+        self._embedding = embedding
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        self.index.add(ids, self._embedding.embed_documents(texts), texts, metadatas)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        self.index.delete(ids or [])
+        return True
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(
+            self._embedding.embed_query(query), k, filter
+        )
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        # Held across search and lookup so a concurrent delete cannot renumber rows
+        with self.index._lock:
+            return [
+                (self.index.document(row), score)
+                for row, score in self.index.search(embedding, k, filter)
+            ]
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        with self.index._lock:
+            rows = [row for row, _ in self.index.search(embedding, fetch_k, filter)]
+            if not rows:
+                return []
+            selected = maximal_marginal_relevance(
+                np.asarray(embedding, dtype=np.float32),
+                self.index.vectors(rows),
+                lambda_mult=lambda_mult,
+                k=k,
+            )
+            return [self.index.document(rows[i]) for i in selected]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(create_local_index(), embedding)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+
+def create_local_index() -> LocalVectorIndex:
+    """Create an empty index configured from settings."""
+    return LocalVectorIndex(
+        settings.EMBEDDING_DIM,
+        quantization=settings.LOCAL_INDEX_QUANTIZATION,
+        rescore=settings.LOCAL_INDEX_RESCORE,
+        rescore_factor=settings.LOCAL_INDEX_RESCORE_FACTOR,
+        rescore_dir=settings.LOCAL_INDEX_DIR or None,
+        coarse_dim=settings.LOCAL_INDEX_COARSE_DIM,
+        coarse_factor=settings.LOCAL_INDEX_COARSE_FACTOR,
+    )
+
+
+_local_index: Optional[LocalVectorIndex] = None
+_local_index_lock = threading.Lock()
+
+
+def get_local_index() -> LocalVectorIndex:
+    """Return the process-wide local index, shared by every handler."""
+    global _local_index
+    with _local_index_lock:
+        if _local_index is None:
+            _local_index = create_local_index()
+            logger.info(
+                f"Created local vector index ({_local_index.quantization}, "
+                f"rescore={_local_index.rescore})"
+            )
+        return _local_index
@@ -0,0 +1,230 @@
+"""Prometheus metrics for the ingestion and RAG pipelines."""
+
+import os
+from contextlib import contextmanager
+from functools import lru_cache
+from time import perf_counter
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from .profiling import current_profile
+
+# Each worker records into this registry. With several workers, setting
+# PROMETHEUS_MULTIPROC_DIR makes every worker write its values to files there,
+# and /metrics aggregates the files instead of reporting one worker.
+REGISTRY = CollectorRegistry()
+
+# Buckets span sub-millisecond prompt formatting up to multi-second LLM calls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+STAGE_LATENCY = Histogram(
+    "chatwithdoc_stage_duration_seconds",
+    "Time spent in each pipeline stage",
+    ["stage", "handler"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+CHUNKS_TOTAL = Counter(
+    "chatwithdoc_chunks_total",
+    "Document chunks produced by splitting",
+    ["handler"],
+    registry=REGISTRY,
+)
+TOKENS_TOTAL = Counter(
+    "chatwithdoc_llm_tokens_total",
+    "LLM tokens consumed, by direction (in/out)",
+    ["handler", "direction"],
+    registry=REGISTRY,
+)
+CACHE_HITS_TOTAL = Counter(
+    "chatwithdoc_cache_hits_total",
+    "Cache hits, by cache name",
+    ["handler", "cache"],
+    registry=REGISTRY,
+)
+CACHE_MISSES_TOTAL = Counter(
+    "chatwithdoc_cache_misses_total",
+    "Cache misses, by cache name",
+    ["handler", "cache"],
+    registry=REGISTRY,
+)
+ERRORS_TOTAL = Counter(
+    "chatwithdoc_errors_total",
+    "Errors raised inside a pipeline stage",
+    ["handler", "stage"],
+    registry=REGISTRY,
+)
+ROUTED_DOCUMENTS = Histogram(
+    "chatwithdoc_routed_documents",
+    "Documents considered and selected by query routing",
+    ["kind"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000),
+    registry=REGISTRY,
+)
+CONVERSATION_TOKENS = Histogram(
+    "chatwithdoc_conversation_history_tokens",
+    "Estimated tokens of conversation memory sent with a question",
+    buckets=(0, 100, 250, 500, 1000, 2000, 4000, 8000),
+    registry=REGISTRY,
+)
+PROVIDER_EVENTS_TOTAL = Counter(
+    "chatwithdoc_provider_events_total",
+    "Provider call retries, hedges and timeouts",
+    ["operation", "event"],
+    registry=REGISTRY,
+)
+ADMISSION_IN_USE = Gauge(
+    "chatwithdoc_admission_in_use",
+    "Provider call slots currently held, by admission pool",
+    ["pool"],
+    registry=REGISTRY,
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "chatwithdoc_admission_queue_depth",
+    "Callers waiting for a provider call slot, by admission pool",
+    ["pool"],
+    registry=REGISTRY,
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT = Histogram(
+    "chatwithdoc_admission_wait_seconds",
+    "Time spent waiting for a provider call slot",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+ADMISSION_REJECTED_TOTAL = Counter(
+    "chatwithdoc_admission_rejected_total",
+    "Calls rejected because the admission queue was full or timed out",
+    ["pool"],
+    registry=REGISTRY,
+)
+
+
+# Resolving label children takes a lock and a dict lookup; the label sets are
+# small and fixed, so caching the children keeps the hot path to one observe().
+@lru_cache(maxsize=None)
+def _stage_histogram(stage: str, handler: str):
+    return STAGE_LATENCY.labels(stage=stage, handler=handler)
+
+
+@lru_cache(maxsize=None)
+def _error_counter(handler: str, stage: str):
+    return ERRORS_TOTAL.labels(handler=handler, stage=stage)
+
+
+def observe_stage(stage: str, handler: str, seconds: float) -> None:
+    """Record a duration for a pipeline stage."""
+    _stage_histogram(stage, handler).observe(seconds)
+    profile = current_profile()
+    if profile is not None:
+        profile.add(stage, handler, seconds)
+
+
+@contextmanager
+def track_stage(stage: str, handler: str = "engine") -> Iterator[None]:
+    """
+    Time a block of code as a pipeline stage.
+
+    Exceptions raised inside the block are counted against the stage and
+    re-raised unchanged.
+
+    Args:
+        stage: Stage name, e.g. ``"load"`` or ``"generate"``
+        handler: Handler type the stage runs under
+    """
+    start = perf_counter()
+    try:
+        yield
+    except Exception:
+        _error_counter(handler, stage).inc()
+        raise
+    finally:
+        observe_stage(stage, handler, perf_counter() - start)
+
+
+def record_error(handler: str, stage: str) -> None:
+    """Count an error that was handled without raising."""
+    _error_counter(handler, stage).inc()
+
+
+def record_chunks(handler: str, count: int) -> None:
+    """Count chunks produced by a handler."""
+    CHUNKS_TOTAL.labels(handler=handler).inc(count)
+
+
+def record_tokens(handler: str, input_tokens: int, output_tokens: int) -> None:
+    """Count LLM input and output tokens."""
+    TOKENS_TOTAL.labels(handler=handler, direction="in").inc(input_tokens)
+    TOKENS_TOTAL.labels(handler=handler, direction="out").inc(output_tokens)
+
+
+def record_cache(handler: str, cache: str, hit: bool) -> None:
+    """Count a cache lookup as a hit or a miss."""
+    counter = CACHE_HITS_TOTAL if hit else CACHE_MISSES_TOTAL
+    counter.labels(handler=handler, cache=cache).inc()
+
+
+def record_routing(candidates: int, selected: int) -> None:
+    """Record how many documents a query was routed to, out of how many."""
+    ROUTED_DOCUMENTS.labels(kind="candidates").observe(candidates)
+    ROUTED_DOCUMENTS.labels(kind="selected").observe(selected)
+
+
+def observe_conversation_tokens(tokens: int) -> None:
+    """Record the size of the conversation memory sent with a question."""
+    CONVERSATION_TOKENS.observe(tokens)
+
+
+def record_provider_event(operation: str, event: str) -> None:
+    """Count a provider call retry, hedge or timeout."""
+    PROVIDER_EVENTS_TOTAL.labels(operation=operation, event=event).inc()
+
+
+def set_admission_state(pool: str, in_use: int, waiting: int) -> None:
+    """Publish an admission pool's held slots and queue depth."""
+    ADMISSION_IN_USE.labels(pool=pool).set(in_use)
+    ADMISSION_QUEUE_DEPTH.labels(pool=pool).set(waiting)
+
+
+def observe_admission_wait(pool: str, seconds: float) -> None:
+    """Record how long a caller waited to be admitted."""
+    ADMISSION_WAIT.labels(pool=pool).observe(seconds)
+
+
+def record_admission_rejected(pool: str) -> None:
+    """Count a call rejected by admission control."""
+    ADMISSION_REJECTED_TOTAL.labels(pool=pool).inc()
+
+
+def render_latest() -> tuple:
+    """
+    Return the exposition payload and its content type.
+
+    In multiprocess mode the payload sums every worker's files, so it is
+    the same whichever worker serves the scrape.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    """Drop this worker's live gauges from the multiprocess files on shutdown."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
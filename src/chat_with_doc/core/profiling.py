@@ -0,0 +1,169 @@
+"""Opt-in per-request profiling and stage-timing breakdowns."""
+
+import cProfile
+import logging
+import os
+import random
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Profiling modes accepted from the header / query flag
+MODE_TIMINGS = "timings"
+MODE_CPROFILE = "cprofile"
+MODE_SAMPLE = "sample"
+MODES = (MODE_TIMINGS, MODE_CPROFILE, MODE_SAMPLE)
+
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar(
+    "chatwithdoc_request_profile", default=None
+)
+
+# On Python 3.12+ cProfile is a process-wide sys.monitoring tool, and a
+# second profiler cannot be enabled while one is active
+_cprofile_lock = threading.Lock()
+
+
+class RequestProfile:
+    """Stage timings collected while a single request is handled."""
+
+    def __init__(self, mode: str = MODE_TIMINGS):
+        self.mode = mode
+        self.request_id = uuid.uuid4().hex[:12]
+        self.stages: List[Tuple[str, str, float]] = []
+        self.profile_path: Optional[str] = None
+        self._start = perf_counter()
+        self._total: Optional[float] = None
+
+    def add(self, stage: str, handler: str, seconds: float) -> None:
+        """Record one stage execution."""
+        self.stages.append((stage, handler, seconds))
+
+    def finish(self) -> None:
+        """Freeze the total request time."""
+        self._total = perf_counter() - self._start
+
+    def breakdown(self) -> Dict[str, Any]:
+        """Return the timing breakdown in milliseconds."""
+        total = self._total if self._total is not None else perf_counter() - self._start
+        by_stage: Dict[str, float] = {}
+        for stage, _, seconds in self.stages:
+            by_stage[stage] = by_stage.get(stage, 0.0) + seconds * 1000
+        result: Dict[str, Any] = {
+            "request_id": self.request_id,
+            "total_ms": round(total * 1000, 3),
+            "by_stage_ms": {stage: round(ms, 3) for stage, ms in by_stage.items()},
+            "stages": [
+                {"stage": stage, "handler": handler, "ms": round(seconds * 1000, 3)}
+                for stage, handler, seconds in self.stages
+            ],
+        }
+        if self.profile_path:
+            result["profile_path"] = self.profile_path
+        return result
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """Return the profile for the current request, if profiling is active."""
+    return _active_profile.get()
+
+
+def resolve_mode(requested: Optional[str], sample_rate: float) -> Optional[str]:
+    """
+    Decide the profiling mode for a request.
+
+    Args:
+        requested: Value of the profiling header or query flag, if any
+        sample_rate: Fraction of unflagged requests to profile (timings only)
+
+    Returns:
+        One of ``MODES``, or None when the request is not profiled
+    """
+    if requested:
+        requested = requested.strip().lower()
+        if requested in MODES:
+            return requested
+        if requested in ("1", "true", "yes", "on"):
+            return MODE_TIMINGS
+        return None
+    if sample_rate > 0 and random.random() < sample_rate:
+        return MODE_TIMINGS
+    return None
+
+
+@contextmanager
+def profile_request(mode: Optional[str], profile_dir: str) -> Iterator[Optional[RequestProfile]]:
+    """
+    Collect stage timings, and optionally a profiler dump, for one request.
+
+    Yields None without touching any state when ``mode`` is None.
+
+    Args:
+        mode: Profiling mode from ``resolve_mode``
+        profile_dir: Directory profiler dumps are written to
+    """
+    if mode is None:
+        yield None
+        return
+
+    profile = RequestProfile(mode)
+    token = _active_profile.set(profile)
+    profiler = _start_profiler(mode)
+    try:
+        yield profile
+    finally:
+        profile.finish()
+        _active_profile.reset(token)
+        if profiler is not None:
+            profile.profile_path = _dump_profiler(profiler, mode, profile.request_id, profile_dir)
+
+
+def _start_profiler(mode: str):
+    if mode == MODE_CPROFILE:
+        if not _cprofile_lock.acquire(blocking=False):
+            logger.warning("Another request is being cProfiled; returning stage timings only")
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except Exception as e:
+            _cprofile_lock.release()
+            logger.warning(f"Could not start cProfile ({e}); returning stage timings only")
+            return None
+        return profiler
+    if mode == MODE_SAMPLE:
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed; returning stage timings only")
+            return None
+        profiler = Profiler(async_mode="disabled")
+        profiler.start()
+        return profiler
+    return None
+
+
+def _dump_profiler(profiler, mode: str, request_id: str, profile_dir: str) -> Optional[str]:
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        if mode == MODE_CPROFILE:
+            try:
+                profiler.disable()
+            finally:
+                _cprofile_lock.release()
+            path = os.path.join(profile_dir, f"{request_id}.prof")
+            profiler.dump_stats(path)
+        else:
+            profiler.stop()
+            path = os.path.join(profile_dir, f"{request_id}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        logger.info(f"Request profile written to {path}")
+        return path
+    except Exception as e:
+        logger.error(f"Failed to write request profile: {e}", exc_info=True)
+        return None
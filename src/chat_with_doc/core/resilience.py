@@ -0,0 +1,344 @@
+"""Deadlines, retries and hedged requests for provider calls."""
+
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Iterator, List, Optional, Set
+
+from .config import settings
+from .errors import ServiceUnavailable
+from .metrics import record_provider_event
+
+if TYPE_CHECKING:
+    from .admission import AdmissionPool
+
+logger = logging.getLogger(__name__)
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+# Admission pool the caller holds a slot in; hedges and abandoned calls take extra slots from it
+_admission: contextvars.ContextVar[Optional["AdmissionPool"]] = contextvars.ContextVar(
+    "admission_pool", default=None
+)
+
+# HTTP statuses worth retrying: rate limiting and server-side failures
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class DeadlineExceeded(ServiceUnavailable, TimeoutError):
+    """Raised when the request-level deadline has passed."""
+
+    status_code = 504
+
+
+class ProviderTimeout(TimeoutError):
+    """Raised when a single provider call exceeds its per-call timeout."""
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    """
+    How one kind of provider call is timed out, retried and hedged.
+
+    Attributes:
+        timeout: Per-attempt timeout in seconds
+        retries: Extra attempts after a failure; only used when idempotent
+        backoff_base: First backoff ceiling in seconds, doubled per attempt
+        backoff_max: Largest backoff ceiling in seconds
+        idempotent: Whether repeating the call is safe
+        hedge_percentile: Send a duplicate call when the first one is slower
+            than this latency percentile (e.g. 95); None disables hedging
+        hedge_min_samples: Latencies to observe before hedging starts
+    """
+
+    timeout: float
+    retries: int = 0
+    backoff_base: float = 0.2
+    backoff_max: float = 5.0
+    idempotent: bool = True
+    hedge_percentile: Optional[float] = None
+    hedge_min_samples: int = 20
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies."""
+
+    def __init__(self, size: int = 256):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 1) -> Optional[float]:
+        """Return the ``pct`` latency percentile, or None with too few samples."""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Bound every provider call made inside the block by a shared deadline.
+
+    Nested deadlines can only shorten the outer one. The deadline is a
+    context variable, so it follows the request into worker threads that
+    copy the context.
+
+    Args:
+        seconds: Time budget for the block; None or 0 leaves it unbounded
+    """
+    if not seconds:
+        yield
+        return
+    deadline = monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def admission_scope(pool: "AdmissionPool") -> Iterator[None]:
+    """
+    Charge provider calls made inside the block to an admission pool.
+
+    The caller's own slot covers one running call. A hedge only starts if
+    the pool has a free slot, and a call abandoned after a timeout or a
+    lost hedge race keeps a slot until it actually finishes, since a
+    running thread cannot be cancelled and still uses provider quota.
+    """
+    token = _admission.set(pool)
+    try:
+        yield
+    finally:
+        _admission.reset(token)
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether a failed provider call is worth retrying.
+
+    Timeouts, connection errors, rate limiting (429) and server errors
+    (5xx) are transient. Anything else, such as a bad request, an
+    authentication failure or a bug, fails the same way on every attempt.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # Provider SDKs expose the HTTP status under different names
+    response = getattr(error, "response", None)
+    for status in (
+        getattr(error, "status_code", None),
+        getattr(error, "status", None),
+        getattr(error, "code", None),
+        getattr(response, "status_code", None),
+    ):
+        if isinstance(status, int) and not isinstance(status, bool):
+            return status in TRANSIENT_STATUS_CODES
+    return False
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left before the request deadline, or None if there is none."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - monotonic()
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_trackers: Dict[str, LatencyTracker] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PROVIDER_THREADS, thread_name_prefix="provider"
+            )
+        return _executor
+
+
+def _tracker(operation: str) -> LatencyTracker:
+    tracker = _trackers.get(operation)
+    if tracker is None:
+        tracker = _trackers.setdefault(operation, LatencyTracker())
+    return tracker
+
+
+def _submit(fn: Callable[..., Any], args: tuple, kwargs: dict) -> Future:
+    # Copy the caller's context so profiling and deadlines follow the call
+    return _get_executor().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _release_when_done(pool: "AdmissionPool", future: Future) -> None:
+    future.add_done_callback(lambda _: pool.release())
+
+
+def _abandon(futures: List[Future], charged: Set[Future]) -> None:
+    """Cancel calls that have not started; running ones keep a slot until they finish."""
+    pool = _admission.get()
+    for future in futures:
+        if future.cancel() or future in charged or pool is None:
+            continue
+        pool.hold()
+        _release_when_done(pool, future)
+
+
+def _attempt(
+    operation: str,
+    fn: Callable[..., Any],
+    args: tuple,
+    kwargs: dict,
+    policy: CallPolicy,
+    timeout: float,
+) -> Any:
+    """Run one attempt, hedging it once if it is slower than usual."""
+    start = monotonic()
+    pending: List[Future] = [_submit(fn, args, kwargs)]
+    # Calls holding an admission slot of their own
+    charged: Set[Future] = set()
+
+    hedge_after = None
+    if policy.hedge_percentile is not None:
+        hedge_after = _tracker(operation).percentile(
+            policy.hedge_percentile, policy.hedge_min_samples
+        )
+    if hedge_after is not None and hedge_after < timeout:
+        done, _ = wait(pending, timeout=hedge_after)
+        pool = _admission.get()
+        if not done and (pool is None or pool.try_hold()):
+            record_provider_event(operation, "hedge")
+            hedge = _submit(fn, args, kwargs)
+            if pool is not None:
+                _release_when_done(pool, hedge)
+                charged.add(hedge)
+            pending.append(hedge)
+
+    error: Optional[BaseException] = None
+    while pending:
+        left = timeout - (monotonic() - start)
+        done, not_done = wait(pending, timeout=max(0.0, left), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                _abandon(list(not_done), charged)
+                _tracker(operation).add(monotonic() - start)
+                return future.result()
+            error = future.exception()
+        pending = list(not_done)
+
+    _abandon(pending, charged)
+    if error is not None:
+        raise error
+    record_provider_event(operation, "timeout")
+    raise ProviderTimeout(f"{operation} call timed out after {timeout:.1f}s")
+
+
+def call_with_policy(
+    operation: str,
+    policy: CallPolicy,
+    fn: Callable[..., Any],
+    *args: Any,
+    **kwargs: Any,
+) -> Any:
+    """
+    Call a provider function under a timeout, retry and hedging policy.
+
+    Each attempt runs in a shared worker pool so it can be abandoned when
+    it overruns. Attempts of idempotent calls that fail with a transient
+    error (see ``is_transient``) are retried after a full-jitter
+    exponential backoff; other errors are raised at once. No attempt or
+    backoff outlives the request deadline.
+
+    Args:
+        operation: Operation name used for latency tracking and metrics
+        policy: Timeout, retry and hedging settings
+        fn: Provider function to call
+        *args: Positional arguments for ``fn``
+        **kwargs: Keyword arguments for ``fn``
+
+    Returns:
+        The provider function's result
+
+    Raises:
+        DeadlineExceeded: If the request deadline passes
+        ProviderTimeout: If the last attempt timed out
+        Exception: Whatever the last failed attempt raised
+    """
+    attempts = 1 + (policy.retries if policy.idempotent else 0)
+    for attempt in range(attempts):
+        timeout = policy.timeout
+        remaining = time_remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Request deadline exceeded before {operation}")
+            timeout = min(timeout, remaining)
+        try:
+            return _attempt(operation, fn, args, kwargs, policy, timeout)
+        except ServiceUnavailable:
+            raise
+        except Exception as e:
+            remaining = time_remaining()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded(f"Request deadline exceeded during {operation}") from e
+            if attempt == attempts - 1 or not is_transient(e):
+                raise
+            backoff = random.uniform(0, min(policy.backoff_max, policy.backoff_base * 2 ** attempt))
+            if remaining is not None and backoff >= remaining:
+                raise
+            record_provider_event(operation, "retry")
+            logger.warning(f"{operation} attempt {attempt + 1} failed ({e}); retrying in {backoff:.2f}s")
+            time.sleep(backoff)
+
+
+def _policies() -> Dict[str, CallPolicy]:
+    hedge = settings.HEDGE_PERCENTILE or None
+    hedged = {op.strip() for op in settings.HEDGE_OPERATIONS.split(",") if op.strip()}
+    common = {
+        "retries": settings.PROVIDER_RETRIES,
+        "backoff_base": settings.PROVIDER_BACKOFF_BASE,
+        "backoff_max": settings.PROVIDER_BACKOFF_MAX,
+    }
+    return {
+        operation: CallPolicy(
+            timeout=timeout,
+            hedge_percentile=hedge if operation in hedged else None,
+            **common,
+        )
+        for operation, timeout in (
+            ("embed", settings.EMBED_TIMEOUT),
+            ("search", settings.SEARCH_TIMEOUT),
+            ("generate", settings.LLM_TIMEOUT),
+            # Upserts use deterministic chunk IDs, so repeating one is safe
+            ("upsert", settings.UPSERT_TIMEOUT),
+        )
+    }
+
+
+POLICIES = _policies()
+
+
+def call_provider(operation: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Call ``fn`` under the configured policy for ``operation``."""
+    return call_with_policy(operation, POLICIES[operation], fn, *args, **kwargs)
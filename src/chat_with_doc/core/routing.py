@@ -0,0 +1,125 @@
+"""Document-level routing over per-document centroid vectors."""
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+_accumulator: contextvars.ContextVar[Optional["CentroidAccumulator"]] = contextvars.ContextVar(
+    "centroid_accumulator", default=None
+)
+
+
+class CentroidAccumulator:
+    """Running sum of the unit-length chunk embeddings of one document."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sum: Optional[np.ndarray] = None
+        self.count = 0
+
+    def add(self, vectors: Sequence[Sequence[float]]) -> None:
+        if not len(vectors):
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        total = (matrix / norms).sum(axis=0)
+        with self._lock:
+            self._sum = total if self._sum is None else self._sum + total
+            self.count += len(matrix)
+
+    def vector(self) -> Optional[List[float]]:
+        """Return the normalized centroid, or None if nothing was embedded."""
+        if self._sum is None:
+            return None
+        norm = float(np.linalg.norm(self._sum)) or 1.0
+        return (self._sum / norm).tolist()
+
+
+@contextmanager
+def collect_centroid() -> Iterator[CentroidAccumulator]:
+    """
+    Accumulate every document embedding computed inside the block.
+
+    Embeddings report to the accumulator through a context variable, so
+    worker threads that copy the context contribute too.
+    """
+    accumulator = CentroidAccumulator()
+    token = _accumulator.set(accumulator)
+    try:
+        yield accumulator
+    finally:
+        _accumulator.reset(token)
+
+
+def record_embeddings(vectors: Sequence[Sequence[float]]) -> None:
+    """Add document embeddings to the active accumulator, if any."""
+    accumulator = _accumulator.get()
+    if accumulator is not None:
+        accumulator.add(vectors)
+
+
+class DocumentRouter:
+    """
+    Pick the documents most likely to answer a query.
+
+    Holds one centroid per document in a contiguous matrix, rebuilt only
+    when the corpus version changes. Routing costs one matrix-vector
+    product over documents instead of a search over every chunk.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._routable: List[Dict[str, Any]] = []
+
+    def refresh(self, documents: Sequence[Dict[str, Any]], version: int) -> None:
+        """Rebuild the centroid matrix if the corpus changed since the last call."""
+        with self._lock:
+            if version == self._version:
+                return
+            self._routable = [doc for doc in documents if doc.get("centroid")]
+            self._matrix = (
+                np.asarray([doc["centroid"] for doc in self._routable], dtype=np.float32)
+                if self._routable
+                else np.empty((0, 0), dtype=np.float32)
+            )
+            self._version = version
+
+    def route(
+        self,
+        query_vector: Sequence[float],
+        documents: Sequence[Dict[str, Any]],
+        top_m: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Keep the ``top_m`` documents closest to the query.
+
+        Documents without a centroid (e.g. web pages) are always kept.
+        Candidate records are matched to centroids by ``file_path``.
+
+        Args:
+            query_vector: Query embedding
+            documents: Candidate document records
+            top_m: Routable documents to keep
+
+        Returns:
+            The kept records, routed documents first in score order
+        """
+        with self._lock:
+            matrix, routable = self._matrix, self._routable
+        candidates = {doc["file_path"]: doc for doc in documents}
+        rows = [i for i, doc in enumerate(routable) if doc["file_path"] in candidates]
+        kept = [candidates.pop(routable[i]["file_path"]) for i in rows]
+        unroutable = list(candidates.values())
+        if len(rows) <= top_m:
+            return kept + unroutable
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        scores = matrix[rows] @ (query / (np.linalg.norm(query) or 1.0))
+        best = np.argsort(-scores, kind="stable")[:top_m]
+        return [kept[i] for i in best] + unroutable
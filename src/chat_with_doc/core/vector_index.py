@@ -0,0 +1,148 @@
+"""Process-wide Pinecone client and index handle."""
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_pinecone import PineconeVectorStore
+from pinecone import Pinecone
+
+from .config import settings
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+# Index descriptions rarely change; re-check now and then in case the index is recreated
+VALIDATION_TTL = 3600
+
+
+class PineconeConnection:
+    """
+    One Pinecone client and index handle shared by every handler.
+
+    Creating a client and checking the index costs a control-plane round
+    trip each time, so both are done once per process. The index
+    description is also cached in the shared state backend, when one is
+    attached, so other workers skip the check entirely. The index handle
+    upserts through a thread pool, so concurrent and batched upserts from
+    different handlers share its connection pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._client: Optional[Pinecone] = None
+        self._index = None
+        self._description: Optional[Dict[str, Any]] = None
+        self._cache = None
+
+    def use_cache(self, cache) -> None:
+        """
+        Share validation results through a state backend.
+
+        Args:
+            cache: Object with ``cache_get``/``cache_set``, e.g. a StateBackend
+        """
+        self._cache = cache
+
+    @property
+    def client(self) -> Pinecone:
+        with self._lock:
+            if self._client is None:
+                self._client = Pinecone(
+                    api_key=settings.PINECONE_API_KEY,
+                    pool_threads=settings.PINECONE_POOL_THREADS,
+                )
+            return self._client
+
+    def validate(self) -> Dict[str, Any]:
+        """
+        Check that the configured index exists, once per process.
+
+        Returns:
+            Index description with ``host``, ``dimension`` and ``metric``
+
+        Raises:
+            ValueError: If the index does not exist or its dimension is wrong
+        """
+        if self._description is not None:
+            record_cache("engine", "pinecone_index", hit=True)
+            return self._description
+
+        name = settings.PINECONE_INDEX_NAME
+        cache_key = f"pinecone:index:{name}"
+        description = self._cache.cache_get(cache_key) if self._cache is not None else None
+        record_cache("engine", "pinecone_index", hit=description is not None)
+        if description is None:
+            if not self.client.has_index(name):
+                raise ValueError(f"Index '{name}' does not exist in Pinecone.")
+            model = self.client.describe_index(name)
+            description = {
+                "host": model.host,
+                "dimension": model.dimension,
+                "metric": model.metric,
+            }
+            if self._cache is not None:
+                self._cache.cache_set(cache_key, description, ttl=VALIDATION_TTL)
+
+        dimension = description.get("dimension")
+        if dimension is not None and dimension != settings.EMBEDDING_DIM:
+            raise ValueError(
+                f"Index '{name}' has dimension {dimension}, "
+                f"but EMBEDDING_DIM is {settings.EMBEDDING_DIM}"
+            )
+        self._description = description
+        logger.info(f"Validated Pinecone index '{name}' at {description['host']}")
+        return description
+
+    @property
+    def index(self):
+        """Return the shared index handle, validating the index on first use."""
+        description = self.validate()
+        with self._lock:
+            if self._index is None:
+                # Passing the host skips the describe call Index(name=...) would make
+                self._index = self.client.Index(
+                    host=description["host"],
+                    pool_threads=settings.PINECONE_POOL_THREADS,
+                )
+            return self._index
+
+    def vector_store(self, embedding: Embeddings, namespace: str) -> PineconeVectorStore:
+        """
+        Build a LangChain vector store on the shared index handle.
+
+        Args:
+            embedding: Embedding model for queries and upserts
+            namespace: Pinecone namespace
+
+        Returns:
+            PineconeVectorStore that creates no client of its own
+        """
+        return PineconeVectorStore(index=self.index, embedding=embedding, namespace=namespace)
+
+    def list_ids(self, prefix: str, namespace: str) -> List[str]:
+        """
+        Return the vector IDs starting with ``prefix``.
+
+        Listing by prefix is only supported on serverless indexes.
+
+        Args:
+            prefix: ID prefix
+            namespace: Pinecone namespace
+        """
+        return [
+            vector_id
+            for page in self.index.list(prefix=prefix, namespace=namespace)
+            for vector_id in page
+        ]
+
+    def reset(self) -> None:
+        """Forget the client, handle and validation, e.g. after the index is recreated."""
+        with self._lock:
+            self._client = None
+            self._index = None
+            self._description = None
+
+
+pinecone_connection = PineconeConnection()
@@ -1,15 +1,18 @@
 """Document handlers for processing different file types."""
 
-from .base import BaseHandler
+from .base import BaseHandler, RetrievalOptions
 from .doc import DOCHandler
 from .pdf import PDFHandler
+from .splitter import OffsetTextSplitter
 from .txt import TXTHandler
 from .web import WebHandler
 
 __all__ = [
     "BaseHandler",
+    "RetrievalOptions",
     "PDFHandler",
     "DOCHandler",
     "TXTHandler",
     "WebHandler",
+    "OffsetTextSplitter",
 ]
@@ -1,24 +1,84 @@
 """Base handler class for document processing."""
 
+import contextvars
+import hashlib
 import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional, Set
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain_core.documents import Document
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone
-from langgraph.graph import StateGraph
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.vectorstores import VectorStore
+from langgraph.graph import END, StateGraph
 from pydantic import BaseModel, Field
 
+from ..core.admission import governor
 from ..core.config import settings
+from ..core.errors import ServiceUnavailable
+from ..core.local_index import LocalVectorStore, get_local_index
+from ..core.metrics import (
+    observe_stage,
+    record_cache,
+    record_chunks,
+    record_error,
+    record_tokens,
+    track_stage,
+)
+from ..core.resilience import call_provider
+from ..core.routing import record_embeddings
+from ..core.vector_index import pinecone_connection
+from .context import build_context, estimate_tokens, format_context
+from .conversation import Conversation, rewrite_question
+from .splitter import get_splitter, split_documents_parallel
 
 logger = logging.getLogger(__name__)
 
 
+class RetrievalOptions(BaseModel):
+    """Per-request retrieval controls pushed down into the vector store query."""
+
+    k: int = Field(default_factory=lambda: settings.RETRIEVAL_K, ge=1, description="Chunks to retrieve")
+    min_score: Optional[float] = Field(
+        default=None,
+        description="Minimum similarity score; ignored when MMR is used",
+    )
+    mmr: bool = Field(
+        default_factory=lambda: settings.RETRIEVAL_MMR,
+        description="Use maximal marginal relevance for diversity",
+    )
+    fetch_k: int = Field(default=20, ge=1, description="MMR candidate pool size")
+    sources: Optional[List[str]] = Field(
+        default=None,
+        description="Restrict the search to chunks from these source paths",
+    )
+
+    def metadata_filter(self) -> Optional[Dict[str, Any]]:
+        """Return the vector store metadata filter for these options."""
+        if not self.sources:
+            return None
+        return {"source": {"$in": list(self.sources)}}
+
+
 class State(BaseModel):
     """State model for RAG pipeline."""
 
     question: str = Field(..., description="Type your question here")
+    retrieval: RetrievalOptions = Field(default_factory=RetrievalOptions)
+    conversation: Conversation = Field(
+        default_factory=Conversation,
+        description="Earlier turns of the chat session",
+    )
+    search_query: str = Field(
+        default="",
+        description="Standalone form of the question used for retrieval",
+    )
     context: List[Document] = Field(
         default_factory=list,
         description="A list of Document objects",
@@ -26,18 +86,143 @@ class State(BaseModel):
     answer: str = Field(default="", description="Answer will be here")
 
 
+# Query embeddings shared by every handler, so a question routed by the engine
+# and then answered by a handler is only embedded once
+QUERY_CACHE_SIZE = 256
+_query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+# Seconds spent embedding inside the current upsert call. A per-call
+# accumulator, so concurrent ingests do not see each other's embedding time;
+# provider worker threads copy the context and report into it too.
+_upsert_embed_seconds: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar(
+    "upsert_embed_seconds", default=None
+)
+
+
+class InstrumentedEmbeddings(Embeddings):
+    """Embeddings wrapper that records embedding latency per handler."""
+
+    def __init__(self, embeddings: Embeddings, handler_type: str):
+        self.embeddings = embeddings
+        self.handler_type = handler_type
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = perf_counter()
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+        finally:
+            self._observe(perf_counter() - start)
+        record_embeddings(vectors)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        with _query_cache_lock:
+            vector = _query_cache.get(text)
+            if vector is not None:
+                _query_cache.move_to_end(text)
+        record_cache(self.handler_type, "query_embedding", hit=vector is not None)
+        if vector is not None:
+            return vector
+
+        start = perf_counter()
+        try:
+            vector = self.embeddings.embed_query(text)
+        finally:
+            self._observe(perf_counter() - start)
+        with _query_cache_lock:
+            _query_cache[text] = vector
+            if len(_query_cache) > QUERY_CACHE_SIZE:
+                _query_cache.popitem(last=False)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in one batched call."""
+        start = perf_counter()
+        try:
+            if isinstance(self.embeddings, GoogleGenerativeAIEmbeddings):
+                # Same task type embed_query uses, but one request for all texts
+                return self.embeddings.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+            return self.embeddings.embed_documents(texts)
+        finally:
+            self._observe(perf_counter() - start)
+
+    def _observe(self, seconds: float) -> None:
+        spent = _upsert_embed_seconds.get()
+        if spent is not None:
+            spent[0] += seconds
+        observe_stage("embed", self.handler_type, seconds)
+
+
+def _source_prefix(source: Any) -> str:
+    """Vector ID prefix shared by every chunk of one source."""
+    return hashlib.sha1(str(source).encode("utf-8")).hexdigest()[:16] + "#"
+
+
+def _chunk_id(doc: Document) -> str:
+    """
+    Deterministic vector ID, so re-sending a chunk overwrites rather than duplicates it.
+
+    The source prefix lets a re-ingest find and delete chunks the new
+    version no longer has.
+    """
+    key = "\x1f".join([
+        str(doc.metadata.get("source", "")),
+        str(doc.metadata.get("page", "")),
+        str(doc.metadata.get("start_index", "")),
+        doc.page_content,
+    ])
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return _source_prefix(doc.metadata.get("source", "")) + digest
+
+
+RAG_PROMPT = ChatPromptTemplate.from_messages([
+    (
+        "system",
+        "You are a helpful assistant. Answer the user's question using only "
+        "the provided context. If the answer is not in the context, say that "
+        "you do not know."
+    ),
+    (
+        "human",
+        "Context:\n{context}\n\nQuestion:\n{question}"
+    ),
+])
+
+# Follow-up questions also see the bounded conversation memory
+CHAT_PROMPT = ChatPromptTemplate.from_messages([
+    RAG_PROMPT.messages[0],
+    (
+        "human",
+        "Conversation so far:\n{history}\n\nContext:\n{context}\n\nQuestion:\n{question}"
+    ),
+])
+
+
 class BaseHandler(ABC):
     """Abstract base class for document handlers."""
 
+    # Label used for this handler in metrics
+    handler_type = "base"
+
     def __init__(self):
         """Initialize the base handler."""
         self.llm = settings.get_llm()
-        self.embedding_model = settings.get_embedding_model()
+        self.embedding_model = InstrumentedEmbeddings(
+            settings.get_embedding_model(), self.handler_type
+        )
         self.embedding_dim = settings.EMBEDDING_DIM
         # Fixed: use PineconeVectorStore, not FAISS
-        self.vector_store: Optional[PineconeVectorStore] = None
+        self.vector_store: Optional[VectorStore] = None
         self.chunk_size = settings.CHUNK_SIZE
         self.chunk_overlap = settings.CHUNK_OVERLAP
+        self.context_token_budget = settings.CONTEXT_TOKEN_BUDGET
+        self.text_splitter = get_splitter(
+            self.chunk_size,
+            self.chunk_overlap,
+            estimate_tokens if settings.CHUNK_LENGTH_UNIT == "tokens" else None,
+        )
+        self._graph = None
 
     @abstractmethod
     def process(self, file_path: str) -> Dict[str, Any]:
@@ -52,12 +237,45 @@ class BaseHandler(ABC):
         """
         pass
 
-    def query(self, query: str) -> Dict[str, Any]:
+    def index_binding(self) -> Dict[str, Any]:
+        """Describe where this handler's chunks are indexed, for the shared registry."""
+        if settings.VECTOR_BACKEND == "local":
+            return {"index_name": "local", "namespace": "default"}
+        return {
+            "index_name": settings.PINECONE_INDEX_NAME,
+            "namespace": settings.PINECONE_NAMESPACE or "default",
+        }
+
+    def bind(self, doc_info: Dict[str, Any]) -> None:
+        """
+        Attach to the index a document was written to, possibly by another worker.
+
+        Args:
+            doc_info: Document record from the state backend
+        """
+        if self.vector_store is None:
+            self.vector_store = self._open_vector_store()
+
+    def query(
+        self,
+        query: str,
+        retrieval: Optional[RetrievalOptions] = None,
+        conversation: Optional[Conversation] = None,
+        search_query: Optional[str] = None,
+        document: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         """
         Query the processed document.
         
         Args:
             query: The question to ask about the document
+            retrieval: Retrieval controls; defaults come from settings
+            conversation: Earlier turns of the chat session, if any
+            search_query: Standalone question for retrieval; rewritten from
+                the conversation when omitted
+            document: Registry record of the queried document; handlers are
+                shared between concurrent requests, so per-document data
+                travels with the query rather than being stored on them
             
         Returns:
             Dictionary with answer and status
@@ -69,61 +287,306 @@ class BaseHandler(ABC):
             }
 
         try:
+            graph = self._get_graph()
+
+            # Execute the query
+            response = graph.invoke({
+                "question": query,
+                "retrieval": retrieval or RetrievalOptions(),
+                "conversation": conversation or Conversation(),
+                "search_query": search_query or "",
+            })
+            if not response.get("context"):
+                return {
+                    "status": "empty",
+                    "message": "No relevant content found for the query"
+                }
+
+            return {
+                "status": "success",
+                "answer": response["answer"],
+                "query": query
+            }
+        except ServiceUnavailable:
+            raise
+        except Exception as e:
+            logger.error(f"Query failed: {e}", exc_info=True)
+            return {
+                "status": "error",
+                "message": f"Error querying document: {str(e)}"
+            }
+
+    def _get_graph(self):
+        """Return the compiled RAG graph, compiling it on first use."""
+        if self._graph is not None:
+            record_cache(self.handler_type, "graph", hit=True)
+            return self._graph
+        record_cache(self.handler_type, "graph", hit=False)
+
+        with track_stage("graph_compile", self.handler_type):
             # Fixed: correct StateGraph construction
             graph_builder = StateGraph(State)
 
+            # Rewrite follow-up questions so retrieval does not depend on earlier turns
+            def condense(state: State):
+                if state.search_query or state.conversation.is_empty():
+                    return {}
+                return {"search_query": rewrite_question(self.llm, state.conversation, state.question)}
+
             # Define retrieval step
             def retrieve(state: State):
-                retrieved_docs = self.vector_store.similarity_search(state.question)
+                with track_stage("retrieve", self.handler_type):
+                    retrieved_docs = self._retrieve(
+                        state.search_query or state.question, state.retrieval
+                    )
                 return {"context": retrieved_docs}
 
+            # Skip the LLM call entirely when nothing passed the retrieval filters
+            def route_after_retrieve(state: State):
+                return "generate" if state.context else END
+
             # Define generation step
             def generate(state: State):
-                
-                prompt = ChatPromptTemplate.from_messages([
-                (
-                    "system",
-                    "You are a helpful assistant. Answer the user's question using only "
-                    "the provided context. If the answer is not in the context, say that "
-                    "you do not know."
-                ),
-                (
-                    "human",
-                    "Context:\n{context}\n\nQuestion:\n{question}"
-                ),
-                    ])
-                logger.info(f"Prompt pulled: {prompt}")
-                docs_content = "\n\n".join(doc.page_content for doc in state.context)
-                messages = prompt.invoke({
-                    "question": state.question,
-                    "context": docs_content
-                })
-                response = self.llm.invoke(messages)
+                with track_stage("prompt_build", self.handler_type):
+                    messages = self._build_messages(
+                        state.question, state.context, state.conversation
+                    )
+                with governor.admit("chat"):
+                    with track_stage("generate", self.handler_type):
+                        response = call_provider("generate", self.llm.invoke, messages)
+                self._record_usage(response)
                 return {"answer": response.content}
 
             # Build graph with explicit nodes and edges
+            graph_builder.add_node("condense", condense)
             graph_builder.add_node("retrieve", retrieve)
             graph_builder.add_node("generate", generate)
-            graph_builder.add_edge("retrieve", "generate")
-            graph_builder.set_entry_point("retrieve")
-            graph = graph_builder.compile()
+            graph_builder.add_edge("condense", "retrieve")
+            graph_builder.add_conditional_edges("retrieve", route_after_retrieve)
+            graph_builder.set_entry_point("condense")
+            self._graph = graph_builder.compile()
+        return self._graph
 
-            # Execute the query
-            response = graph.invoke({"question": query})
+    def query_batch(
+        self,
+        questions: List[str],
+        retrieval: Optional[RetrievalOptions] = None,
+        max_concurrency: int = 8,
+        vectors: Optional[List[List[float]]] = None,
+        document: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Answer many questions with batched embedding and generation.
 
+        All questions are embedded in one call, and retrievals and LLM calls
+        run concurrently, each under its own timeout and retry policy. All of
+        it is admitted through the ``batch`` pool, so batches cannot starve
+        interactive chat.
+
+        Args:
+            questions: Questions to answer
+            retrieval: Retrieval controls applied to every question
+            max_concurrency: Maximum concurrent retrievals and LLM calls
+            vectors: Question embeddings computed by the caller, e.g. once
+                for every document of a batch; embedded here when omitted
+            document: Registry record of the queried document
+
+        Returns:
+            Dictionary with per-question results and batch timings
+        """
+        if not self.vector_store:
             return {
-                "status": "success",
-                "answer": response["answer"],
-                "query": query
+                "status": "error",
+                "message": "No document has been processed yet"
             }
+
+        options = retrieval or RetrievalOptions()
+        timings: Dict[str, float] = {}
+        try:
+            if vectors is None:
+                start = perf_counter()
+                with governor.admit("batch"):
+                    vectors = call_provider("embed", self.embedding_model.embed_queries, questions)
+                timings["embed_ms"] = (perf_counter() - start) * 1000
+
+            start = perf_counter()
+            # Searches hold batch slots too, so fan out no wider than the pool admits
+            workers = max(1, min(max_concurrency, len(vectors), governor.pools["batch"].max_concurrent))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # Each task gets its own context copy so profiling spans threads
+                futures = [
+                    pool.submit(
+                        contextvars.copy_context().run, self._timed_retrieve, vector, options, "batch"
+                    )
+                    for vector in vectors
+                ]
+                retrieved = [future.result() for future in futures]
+            timings["retrieve_ms"] = (perf_counter() - start) * 1000
+
+            pending = [i for i, (docs, _) in enumerate(retrieved) if docs]
+            with track_stage("prompt_build", self.handler_type):
+                messages = [self._build_messages(questions[i], retrieved[i][0]) for i in pending]
+
+            start = perf_counter()
+            # Batches generate in their own pool, holding one slot per concurrent call
+            concurrency = max(1, min(max_concurrency, len(messages), governor.pools["batch"].max_concurrent))
+            with governor.admit("batch", weight=concurrency):
+                with track_stage("generate", self.handler_type):
+                    # Batched through a lambda so every call gets its own policy
+                    responses = RunnableLambda(self._generate).batch(
+                        messages,
+                        config={"max_concurrency": concurrency},
+                        return_exceptions=True,
+                    )
+            timings["generate_ms"] = (perf_counter() - start) * 1000
+
+            results: List[Dict[str, Any]] = [
+                {
+                    "status": "empty",
+                    "message": "No relevant content found for the query",
+                    "retrieve_ms": retrieve_ms,
+                }
+                for _, retrieve_ms in retrieved
+            ]
+            for i, response in zip(pending, responses):
+                if isinstance(response, Exception):
+                    record_error(self.handler_type, "generate")
+                    results[i] = {
+                        "status": "error",
+                        "message": f"Error querying document: {str(response)}",
+                        "retrieve_ms": retrieved[i][1],
+                    }
+                    continue
+                self._record_usage(response)
+                results[i] = {
+                    "status": "success",
+                    "answer": response.content,
+                    "retrieve_ms": retrieved[i][1],
+                }
+
+            return {"status": "success", "results": results, "timings": timings}
+        except ServiceUnavailable:
+            raise
         except Exception as e:
-            logger.error(f"Query failed: {e}", exc_info=True)
+            logger.error(f"Batch query failed: {e}", exc_info=True)
             return {
                 "status": "error",
                 "message": f"Error querying document: {str(e)}"
             }
 
-    def _create_vector_store(self, documents: List[Document]) -> PineconeVectorStore:
+    def _generate(self, messages):
+        return call_provider("generate", self.llm.invoke, messages)
+
+    def _timed_retrieve(self, vector: List[float], options: RetrievalOptions, pool: str = "chat"):
+        start = perf_counter()
+        with track_stage("retrieve", self.handler_type):
+            docs = self._retrieve_by_vector(vector, options, pool)
+        return docs, (perf_counter() - start) * 1000
+
+    def _build_messages(
+        self,
+        question: str,
+        context: List[Document],
+        conversation: Optional[Conversation] = None,
+    ):
+        """Pack retrieved chunks, and any conversation memory, into the prompt for one question."""
+        context_docs = build_context(
+            context,
+            token_budget=self.context_token_budget,
+            max_overlap=self.chunk_overlap,
+            dedup_threshold=settings.CONTEXT_DEDUP_THRESHOLD or None,
+        )
+        if conversation is not None and not conversation.is_empty():
+            return CHAT_PROMPT.invoke({
+                "history": conversation.format(),
+                "question": question,
+                "context": format_context(context_docs),
+            })
+        return RAG_PROMPT.invoke({
+            "question": question,
+            "context": format_context(context_docs)
+        })
+
+    def _record_usage(self, response) -> None:
+        usage = getattr(response, "usage_metadata", None) or {}
+        record_tokens(
+            self.handler_type,
+            usage.get("input_tokens", 0),
+            usage.get("output_tokens", 0),
+        )
+
+    def _split_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Split loaded documents into chunks with the shared splitter.
+
+        Args:
+            documents: Loaded pages or documents
+
+        Returns:
+            Chunk documents carrying ``start_index`` metadata
+        """
+        with track_stage("split", self.handler_type):
+            chunks = split_documents_parallel(
+                documents,
+                self.text_splitter,
+                max_workers=settings.SPLIT_WORKERS,
+                min_chars=settings.SPLIT_PARALLEL_MIN_CHARS,
+            )
+        record_chunks(self.handler_type, len(chunks))
+        return chunks
+
+    def _retrieve(self, question: str, options: RetrievalOptions) -> List[Document]:
+        """
+        Run the vector store query described by the retrieval options.
+
+        Args:
+            question: The user's question
+            options: Retrieval controls
+
+        Returns:
+            Retrieved chunks in rank order
+        """
+        with governor.admit("chat"):
+            vector = call_provider("embed", self.embedding_model.embed_query, question)
+        return self._retrieve_by_vector(vector, options)
+
+    def _retrieve_by_vector(
+        self, vector: List[float], options: RetrievalOptions, pool: str = "chat"
+    ) -> List[Document]:
+        """
+        Run the vector store query for an already-embedded question.
+
+        Args:
+            vector: Query embedding
+            options: Retrieval controls
+            pool: Admission pool the search is charged to
+
+        Returns:
+            Retrieved chunks in rank order
+        """
+        search_filter = options.metadata_filter()
+        with governor.admit(pool):
+            if options.mmr:
+                return call_provider(
+                    "search",
+                    self.vector_store.max_marginal_relevance_search_by_vector,
+                    vector,
+                    k=options.k,
+                    fetch_k=max(options.fetch_k, options.k),
+                    filter=search_filter,
+                )
+            scored = call_provider(
+                "search",
+                self.vector_store.similarity_search_by_vector_with_score,
+                vector,
+                k=options.k,
+                filter=search_filter,
+            )
+        if options.min_score is not None:
+            scored = [(doc, score) for doc, score in scored if score >= options.min_score]
+        return [doc for doc, _ in scored]
+
+    def _create_vector_store(self, documents: List[Document]) -> VectorStore:
         """
         Create a Pinecone vector store from documents.
         
@@ -131,32 +594,154 @@ class BaseHandler(ABC):
             documents: List of LangChain Document objects
             
         Returns:
-            PineconeVectorStore instance
+            Vector store holding the documents
             
         Raises:
             Exception: If Pinecone initialization or indexing fails
         """
-        logger.info("Creating Pinecone vector store")
+        vector_store = self._open_vector_store()
+        ids = self._add_to_vector_store(vector_store, documents)
+        self._delete_stale_vectors(
+            vector_store, {doc.metadata.get("source", "") for doc in documents}, set(ids)
+        )
+        logger.info("Pinecone vector store created successfully")
+        return vector_store
+
+    def index_chunks(self, chunks: Iterable[Document]) -> int:
+        """
+        Embed and upsert already-split chunks in ``INGEST_BATCH_SIZE`` batches.
+
+        Used when loading and splitting happened elsewhere, e.g. in a bulk
+        ingestion process pool. A lazy iterable, such as a streamed text
+        file, is consumed one batch at a time.
+
+        Chunks a previous version of the same source had, but this one
+        does not, are deleted once the new chunks are in.
+
+        Args:
+            chunks: Chunks carrying ``source`` and ``start_index`` metadata
+
+        Returns:
+            Number of chunks indexed
+        """
+        vector_store = self._open_vector_store()
+        chunks = iter(chunks)
+        sources: Set[Any] = set()
+        ids: Set[str] = set()
+        num_chunks = 0
+        while True:
+            batch = list(islice(chunks, settings.INGEST_BATCH_SIZE))
+            if not batch:
+                break
+            ids.update(self._add_to_vector_store(vector_store, batch))
+            sources.update(doc.metadata.get("source", "") for doc in batch)
+            num_chunks += len(batch)
+        self._delete_stale_vectors(vector_store, sources, ids)
+        self.vector_store = vector_store
+        return num_chunks
+
+    def _open_vector_store(self) -> VectorStore:
+        """
+        Connect to the vector index without adding documents.
+
+        Returns:
+            PineconeVectorStore, or LocalVectorStore when VECTOR_BACKEND is local
+
+        Raises:
+            RuntimeError: If the index is missing or the connection fails
+        """
+        if settings.VECTOR_BACKEND == "local":
+            return LocalVectorStore(get_local_index(), self.embedding_model)
         try:
-            # Optional: verify connection (you can remove this if not needed)
-            pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-            # Just a sanity check to ensure the index exists
-            if settings.PINECONE_INDEX_NAME not in pc.list_indexes().names():
-                raise ValueError(f"Index '{settings.PINECONE_INDEX_NAME}' does not exist in Pinecone.")
-            vector_store = PineconeVectorStore.from_documents(
-                documents,
-                embedding=self.embedding_model,
-                index_name=settings.PINECONE_INDEX_NAME,
+            # Shared client and index handle; the index is only validated once
+            return pinecone_connection.vector_store(
+                self.embedding_model,
                 namespace=settings.PINECONE_NAMESPACE or "default",
-                pinecone_api_key=settings.PINECONE_API_KEY,
             )
-            logger.info("Pinecone vector store created successfully")
-            return vector_store
         except Exception as e:
+            record_error(self.handler_type, "upsert")
             logger.error(f"Pinecone initialization failed: {e}", exc_info=True)
             # Re-raise so the caller knows it failed (no silent None)
             raise RuntimeError(f"Failed to create Pinecone vector store: {e}")
 
+    def _add_to_vector_store(
+        self, vector_store: VectorStore, documents: List[Document]
+    ) -> List[str]:
+        """
+        Embed and upsert a batch of documents.
+
+        Args:
+            vector_store: Store returned by ``_open_vector_store``
+            documents: Chunks to index
+
+        Returns:
+            IDs the chunks were upserted under
+
+        Raises:
+            AdmissionRejected: If the ingest pool stays saturated
+            RuntimeError: If embedding or upserting fails
+        """
+        with governor.admit("ingest"):
+            try:
+                # add_documents interleaves embedding and upserting; the embed
+                # share is recorded by InstrumentedEmbeddings, the rest is upsert
+                spent = [0.0]
+                ids = [_chunk_id(doc) for doc in documents]
+                token = _upsert_embed_seconds.set(spent)
+                start = perf_counter()
+                try:
+                    call_provider(
+                        "upsert",
+                        vector_store.add_documents,
+                        documents,
+                        ids=ids,
+                        batch_size=settings.PINECONE_UPSERT_BATCH_SIZE,
+                    )
+                finally:
+                    _upsert_embed_seconds.reset(token)
+                observe_stage("upsert", self.handler_type, max(0.0, perf_counter() - start - spent[0]))
+                return ids
+            except ServiceUnavailable:
+                raise
+            except Exception as e:
+                record_error(self.handler_type, "upsert")
+                logger.error(f"Pinecone indexing failed: {e}", exc_info=True)
+                raise RuntimeError(f"Failed to index documents in Pinecone: {e}")
+
+    def _delete_stale_vectors(
+        self, vector_store: VectorStore, sources: Set[Any], keep: Set[str]
+    ) -> None:
+        """
+        Delete chunks of re-indexed sources that the new version did not upsert.
+
+        Deletion runs after the upsert, so queries keep seeing the old
+        version until the new one is in. A failure is logged rather than
+        raised: the new chunks are indexed, only leftovers remain.
+
+        Args:
+            vector_store: Store the chunks were upserted to
+            sources: Sources that were just indexed
+            keep: IDs the new chunks were upserted under
+        """
+        try:
+            for source in sources:
+                prefix = _source_prefix(source)
+                if isinstance(vector_store, LocalVectorStore):
+                    existing = vector_store.index.ids(prefix)
+                else:
+                    existing = pinecone_connection.list_ids(
+                        prefix, namespace=settings.PINECONE_NAMESPACE or "default"
+                    )
+                stale = [vector_id for vector_id in existing if vector_id not in keep]
+                for start in range(0, len(stale), settings.PINECONE_UPSERT_BATCH_SIZE):
+                    batch = stale[start:start + settings.PINECONE_UPSERT_BATCH_SIZE]
+                    call_provider("upsert", vector_store.delete, ids=batch)
+                if stale:
+                    logger.info(f"Deleted {len(stale)} stale chunks of {source}")
+        except Exception as e:
+            record_error(self.handler_type, "upsert")
+            logger.warning(f"Could not delete stale chunks: {e}")
+
     # Optional: helper to assign the store (to be used in subclasses)
     def _initialize_store(self, documents: List[Document]) -> None:
         """Convenience method to create and assign the vector store."""
@@ -0,0 +1,207 @@
+"""Token-budgeted context packing for the RAG prompt."""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+# Rough Gemini tokenization ratio; counting exactly would cost an API call
+CHARS_PER_TOKEN = 4
+
+# Blocks smaller than this are dropped rather than truncated to fit the budget
+MIN_TRUNCATED_TOKENS = 64
+
+# Largest gap between offset chunks that is taken to be the whitespace the
+# splitter strips at chunk edges, rather than a chunk that was not retrieved
+MAX_WHITESPACE_GAP = 4
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in a piece of text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _shingles(text: str, size: int = 3) -> frozenset:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def drop_near_duplicates(docs: Sequence[Document], threshold: float) -> List[Document]:
+    """
+    Remove chunks whose word shingles mostly repeat a higher-ranked chunk.
+
+    Args:
+        docs: Chunks in rank order
+        threshold: Jaccard similarity at or above which a chunk is dropped
+
+    Returns:
+        The surviving chunks, still in rank order
+    """
+    kept: List[Document] = []
+    kept_shingles: List[frozenset] = []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(_jaccard(shingles, other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def _suffix_prefix_overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``."""
+    limit = min(len(left), len(right), max_overlap)
+    for size in range(limit, 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _source_key(doc: Document) -> Tuple:
+    return (doc.metadata.get("source"), doc.metadata.get("page"))
+
+
+def merge_adjacent(docs: Sequence[Document], max_overlap: int) -> List[Document]:
+    """
+    Merge overlapping or adjacent chunks that come from the same source.
+
+    Chunks are sorted by source and offset first, so neighbours merge
+    whatever their rank. Chunks carrying a ``start_index`` are merged by
+    offset, including across the whitespace the splitter strips between
+    consecutive chunks (up to ``MAX_WHITESPACE_GAP`` characters); otherwise
+    the splitter overlap is detected by matching text at the chunk edges,
+    in either order. Each merged block keeps the rank of its best-ranked
+    member.
+
+    Args:
+        docs: Chunks in rank order
+        max_overlap: Largest overlap to look for when offsets are missing
+
+    Returns:
+        Merged blocks in rank order
+    """
+    groups: Dict[Tuple, List[Tuple[int, Document]]] = {}
+    for rank, doc in enumerate(docs):
+        groups.setdefault(_source_key(doc), []).append((rank, doc))
+
+    blocks: List[Tuple[int, Document]] = []
+    for members in groups.values():
+        # Chunks with offsets in document order, then the rest in rank order
+        members.sort(key=lambda item: (
+            "start_index" not in item[1].metadata,
+            item[1].metadata.get("start_index", item[0]),
+        ))
+
+        rank, current = members[0]
+        text = current.page_content
+        start = current.metadata.get("start_index")
+        # Offset just past the block in the source; the text may be shorter
+        # when a whitespace gap was joined with a single character
+        end = start + len(text) if start is not None else None
+        for next_rank, doc in members[1:]:
+            next_start = doc.metadata.get("start_index")
+            if end is not None and next_start is not None:
+                gap = next_start - end
+                if gap > MAX_WHITESPACE_GAP:
+                    blocks.append((rank, _with_text(current, text)))
+                    rank, current, text = next_rank, doc, doc.page_content
+                    end = next_start + len(text)
+                    continue
+                if gap > 0:
+                    text += ("\n" if gap > 1 else " ") + doc.page_content
+                else:
+                    text += doc.page_content[-gap:]
+                end = max(end, next_start + len(doc.page_content))
+            else:
+                # Offset chunks sort first, so no offsets follow from here
+                end = None
+                after = _suffix_prefix_overlap(text, doc.page_content, max_overlap)
+                # A lower-ranked chunk may come first in the document
+                before = _suffix_prefix_overlap(doc.page_content, text, max_overlap)
+                if not after and not before:
+                    blocks.append((rank, _with_text(current, text)))
+                    rank, current, text = next_rank, doc, doc.page_content
+                    continue
+                if after >= before:
+                    text += doc.page_content[after:]
+                else:
+                    text = doc.page_content + text[before:]
+            rank = min(rank, next_rank)
+        blocks.append((rank, _with_text(current, text)))
+
+    blocks.sort(key=lambda item: item[0])
+    return [doc for _, doc in blocks]
+
+
+def _with_text(doc: Document, text: str) -> Document:
+    if text == doc.page_content:
+        return doc
+    return Document(page_content=text, metadata=dict(doc.metadata))
+
+
+def pack_to_budget(docs: Sequence[Document], token_budget: int) -> List[Document]:
+    """
+    Take blocks in rank order until the token budget is spent.
+
+    The first block that does not fit is truncated at a word boundary if a
+    useful amount of budget is left; packing stops there.
+
+    Args:
+        docs: Blocks in rank order
+        token_budget: Maximum estimated tokens of context
+
+    Returns:
+        The packed blocks
+    """
+    packed: List[Document] = []
+    remaining = token_budget
+    for doc in docs:
+        tokens = estimate_tokens(doc.page_content)
+        if tokens <= remaining:
+            packed.append(doc)
+            remaining -= tokens
+            continue
+        if remaining >= MIN_TRUNCATED_TOKENS:
+            cut = doc.page_content[:remaining * CHARS_PER_TOKEN]
+            cut = cut[:cut.rfind(" ")] if " " in cut else cut
+            packed.append(_with_text(doc, cut))
+        break
+    return packed
+
+
+def build_context(
+    docs: Sequence[Document],
+    token_budget: int,
+    max_overlap: int,
+    dedup_threshold: Optional[float] = 0.9,
+) -> List[Document]:
+    """
+    Turn retrieved chunks into a deduplicated, token-bounded context.
+
+    Args:
+        docs: Retrieved chunks in rank order
+        token_budget: Maximum estimated tokens of context
+        max_overlap: Splitter chunk overlap, in characters
+        dedup_threshold: Near-duplicate Jaccard threshold, or None to disable
+
+    Returns:
+        Context blocks in rank order
+    """
+    if dedup_threshold is not None:
+        docs = drop_near_duplicates(docs, dedup_threshold)
+    return pack_to_budget(merge_adjacent(docs, max_overlap), token_budget)
+
+
+def format_context(docs: Sequence[Document]) -> str:
+    """Join context blocks into the prompt's context section."""
+    return "\n\n".join(doc.page_content for doc in docs)
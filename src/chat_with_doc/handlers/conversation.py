@@ -0,0 +1,158 @@
+"""Bounded conversation memory: recent turns verbatim, older turns summarized."""
+
+from typing import Any, List
+
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, Field
+
+from ..core.admission import governor
+from ..core.metrics import record_tokens, track_stage
+from ..core.resilience import call_provider
+from .context import CHARS_PER_TOKEN, estimate_tokens
+
+REWRITE_PROMPT = ChatPromptTemplate.from_messages([
+    (
+        "system",
+        "Rewrite the user's follow-up question as a standalone question that can "
+        "be understood without the conversation. Resolve pronouns and references "
+        "using the conversation. Return only the question."
+    ),
+    (
+        "human",
+        "Conversation:\n{history}\n\nFollow-up question:\n{question}"
+    ),
+])
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    (
+        "system",
+        "You maintain a running summary of a conversation about some documents. "
+        "Extend the summary with the new exchanges, keeping names, numbers and "
+        "open questions. Use at most {words} words. Return only the summary."
+    ),
+    (
+        "human",
+        "Current summary:\n{summary}\n\nNew exchanges:\n{turns}"
+    ),
+])
+
+
+def clip_tokens(text: str, tokens: int) -> str:
+    """Cut text to roughly ``tokens`` tokens at a word boundary."""
+    if estimate_tokens(text) <= tokens:
+        return text
+    cut = text[:tokens * CHARS_PER_TOKEN]
+    cut = cut[:cut.rfind(" ")] if " " in cut else cut
+    return cut + " ..."
+
+
+class Turn(BaseModel):
+    """One question and its answer."""
+
+    question: str
+    answer: str
+
+
+class Conversation(BaseModel):
+    """
+    Memory of one chat session.
+
+    Only the most recent turns are kept verbatim; everything older lives in
+    ``summary``, so the history sent with each question stays bounded.
+    """
+
+    summary: str = Field(default="", description="Rolling summary of folded turns")
+    turns: List[Turn] = Field(default_factory=list, description="Recent turns, oldest first")
+
+    def is_empty(self) -> bool:
+        return not self.summary and not self.turns
+
+    def format(self) -> str:
+        """Render the memory as the prompt's conversation section."""
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of earlier conversation:\n{self.summary}")
+        parts.extend(_format_turn(turn) for turn in self.turns)
+        return "\n\n".join(parts)
+
+    def add_turn(self, question: str, answer: str, turn_tokens: int) -> None:
+        """Append a turn, clipping long questions and answers to ``turn_tokens``."""
+        self.turns.append(Turn(
+            question=clip_tokens(question, turn_tokens),
+            answer=clip_tokens(answer, turn_tokens),
+        ))
+
+
+def _format_turn(turn: Turn) -> str:
+    return f"User: {turn.question}\nAssistant: {turn.answer}"
+
+
+def _invoke(llm, prompt_value, stage: str) -> str:
+    with governor.admit("chat"):
+        with track_stage(stage):
+            response = call_provider("generate", llm.invoke, prompt_value)
+    usage = getattr(response, "usage_metadata", None) or {}
+    record_tokens("engine", usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+    return _text(response.content).strip()
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content)
+
+
+def rewrite_question(llm, conversation: Conversation, question: str) -> str:
+    """
+    Turn a follow-up question into a standalone one for retrieval.
+
+    Args:
+        llm: Chat model
+        conversation: Session memory
+        question: The user's latest question
+
+    Returns:
+        The standalone question, or ``question`` when there is no history
+    """
+    if conversation.is_empty():
+        return question
+    rewritten = _invoke(
+        llm,
+        REWRITE_PROMPT.invoke({"history": conversation.format(), "question": question}),
+        "rewrite",
+    )
+    return rewritten or question
+
+
+def fold_turns(llm, conversation: Conversation, recent_turns: int, summary_tokens: int) -> bool:
+    """
+    Fold turns beyond the most recent ``recent_turns`` into the summary.
+
+    Only the previous summary and the folded turns are sent, so the cost
+    of each update does not grow with the length of the conversation.
+
+    Args:
+        llm: Chat model
+        conversation: Session memory, updated in place
+        recent_turns: Turns to keep verbatim
+        summary_tokens: Approximate size limit of the summary
+
+    Returns:
+        Whether any turns were folded
+    """
+    overflow = len(conversation.turns) - recent_turns
+    if overflow <= 0:
+        return False
+    folded = conversation.turns[:overflow]
+    summary = _invoke(
+        llm,
+        SUMMARY_PROMPT.invoke({
+            "words": max(1, summary_tokens * 3 // 4),
+            "summary": conversation.summary or "(none)",
+            "turns": "\n\n".join(_format_turn(turn) for turn in folded),
+        }),
+        "summarize",
+    )
+    conversation.summary = clip_tokens(summary, summary_tokens)
+    conversation.turns = conversation.turns[overflow:]
+    return True
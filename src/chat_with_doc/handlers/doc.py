@@ -1,16 +1,20 @@
 """DOCX document handler."""
 
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from langchain_community.document_loaders import Docx2txtLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 
+from ..core.errors import ServiceUnavailable
+from ..core.metrics import record_error, track_stage
 from .base import BaseHandler
 
 
 class DOCHandler(BaseHandler):
     """Handler for processing DOCX documents."""
 
+    handler_type = "docx"
+
     def process(self, file_path: str) -> Dict[str, Any]:
         """
         Process a DOCX file and prepare it for querying.
@@ -25,15 +29,11 @@ class DOCHandler(BaseHandler):
             print(f"Processing DOCX file: {file_path}")
 
             # Document Loading
-            loader = Docx2txtLoader(file_path)
-            pages = loader.load()
+            with track_stage("load", self.handler_type):
+                pages = self.load(file_path)
 
             # Text Splitting
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.chunk_size,
-                chunk_overlap=self.chunk_overlap
-            )
-            texts = text_splitter.split_documents(pages)
+            texts = self._split_documents(pages)
 
             # Create vector store
             self.vector_store = self._create_vector_store(texts)
@@ -44,8 +44,16 @@ class DOCHandler(BaseHandler):
                 "num_pages": len(pages),
                 "num_chunks": len(texts)
             }
+        except ServiceUnavailable:
+            raise
         except Exception as e:
+            record_error(self.handler_type, "process")
             return {
                 "status": "error",
                 "message": f"Error processing DOCX: {str(e)}"
             }
+
+    @staticmethod
+    def load(file_path: str) -> List[Document]:
+        """Load a DOCX file as a single document."""
+        return Docx2txtLoader(file_path).load()
@@ -1,17 +1,23 @@
 """PDF document handler."""
 
-from typing import Any, Dict
+import logging
+from typing import Any, Dict, List
 
 from langchain_community.document_loaders import PyMuPDFLoader
+from langchain_core.documents import Document
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-
+from ..core.errors import ServiceUnavailable
+from ..core.metrics import record_error, track_stage
 from .base import BaseHandler
 
+logger = logging.getLogger(__name__)
+
 
 class PDFHandler(BaseHandler):
     """Handler for processing PDF documents."""
 
+    handler_type = "pdf"
+
     def process(self, file_path: str) -> Dict[str, Any]:
         """
         Process a PDF file and prepare it for querying.
@@ -23,28 +29,31 @@ class PDFHandler(BaseHandler):
             Dictionary with processing status and metadata
         """
         try:
-            print(f"Processing PDF file: {file_path}")
-
-            loader = PyMuPDFLoader(file_path)
-            pages = loader.load()
-            
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.chunk_size,
-                chunk_overlap=self.chunk_overlap
-            )
-            print("text_splitter : ", text_splitter)
-            texts = text_splitter.split_documents(pages)
-            print("splitted text : ", texts)
+            logger.info(f"Processing PDF file: {file_path}")
+
+            with track_stage("load", self.handler_type):
+                pages = self.load(file_path)
+
+            texts = self._split_documents(pages)
+            logger.debug(f"Split {len(pages)} pages into {len(texts)} chunks")
+
             self.vector_store = self._create_vector_store(texts)
-            print("indexing sone text : ", self.vector_store)
             return {
                 "status": "success",
                 "message": "PDF processed successfully",
                 "num_pages": len(pages),
                 "num_chunks": len(texts)
             }
+        except ServiceUnavailable:
+            raise
         except Exception as e:
+            record_error(self.handler_type, "process")
             return {
                 "status": "error",
                 "message": f"Error processing PDF: {str(e)}"
             }
+
+    @staticmethod
+    def load(file_path: str) -> List[Document]:
+        """Load a PDF as one document per page."""
+        return PyMuPDFLoader(file_path).load()
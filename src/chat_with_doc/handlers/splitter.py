@@ -0,0 +1,308 @@
+"""Offset-based recursive text splitter shared by the file handlers.
+
+Produces the same chunks as LangChain's ``RecursiveCharacterTextSplitter``
+(with its default ``keep_separator=True``), but works on ``(start, end)``
+offsets into the source text. Separators are located with ``str.find``
+over the span being split instead of ``re.split`` copies, and chunk text
+is only materialized once per emitted chunk.
+"""
+
+import codecs
+import copy
+import logging
+import mmap
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+Span = Tuple[int, int]
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ", "")
+
+
+class OffsetTextSplitter:
+    """Recursive character splitter that returns chunk offsets."""
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        separators: Optional[Sequence[str]] = None,
+        length_function: Optional[Callable[[str], int]] = None,
+        add_start_index: bool = True,
+    ):
+        """
+        Initialize the splitter.
+
+        Args:
+            chunk_size: Maximum chunk length, measured by ``length_function``
+            chunk_overlap: Overlap carried between consecutive chunks
+            separators: Separators to try, coarsest first
+            length_function: Length measure; None measures characters from
+                offsets without slicing the text
+            add_start_index: Store each chunk's offset as ``start_index``
+        """
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size})"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators or DEFAULT_SEPARATORS)
+        self.length_function = length_function
+        self.add_start_index = add_start_index
+
+    def split_offsets(self, text: str) -> List[Span]:
+        """Return ``(start, end)`` offsets of the chunks of ``text``."""
+        chunks: List[Span] = []
+        self._split_span(text, 0, len(text), self.separators, chunks)
+        return chunks
+
+    def split_text(self, text: str) -> List[str]:
+        """Split text into chunk strings."""
+        return [text[start:end] for start, end in self.split_offsets(text)]
+
+    def split_documents(self, documents: Sequence[Document]) -> List[Document]:
+        """Split documents into chunk documents, copying their metadata."""
+        return [
+            chunk
+            for doc in documents
+            for chunk in self._to_documents(doc, self.split_offsets(doc.page_content))
+        ]
+
+    def _to_documents(self, doc: Document, offsets: Sequence[Span]) -> List[Document]:
+        text = doc.page_content
+        chunks = []
+        for start, end in offsets:
+            metadata = copy.deepcopy(doc.metadata)
+            if self.add_start_index:
+                metadata["start_index"] = start
+            chunks.append(Document(page_content=text[start:end], metadata=metadata))
+        return chunks
+
+    def _length(self, text: str, start: int, end: int) -> int:
+        if self.length_function is None:
+            return end - start
+        return self.length_function(text[start:end])
+
+    def _split_span(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        separators: Sequence[str],
+        chunks: List[Span],
+    ) -> None:
+        # Pick the first separator present in the span, as LangChain does
+        separator = separators[-1]
+        remaining: Sequence[str] = ()
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator = candidate
+                remaining = separators[i + 1:]
+                break
+
+        good: List[Span] = []
+        for piece in self._pieces(text, start, end, separator):
+            if self._length(text, *piece) < self.chunk_size:
+                good.append(piece)
+                continue
+            if good:
+                self._merge(text, good, chunks)
+                good = []
+            if not remaining:
+                chunks.append(piece)
+            else:
+                self._split_span(text, piece[0], piece[1], remaining, chunks)
+        if good:
+            self._merge(text, good, chunks)
+
+    @staticmethod
+    def _pieces(text: str, start: int, end: int, separator: str) -> List[Span]:
+        """Split a span at each separator, keeping the separator on the following piece."""
+        if separator == "":
+            return [(i, i + 1) for i in range(start, end)]
+        pieces = []
+        piece_start = start
+        step = len(separator)
+        pos = text.find(separator, start, end)
+        while pos != -1:
+            if pos > piece_start:
+                pieces.append((piece_start, pos))
+            piece_start = pos
+            pos = text.find(separator, pos + step, end)
+        if end > piece_start:
+            pieces.append((piece_start, end))
+        return pieces
+
+    def _merge(self, text: str, splits: List[Span], chunks: List[Span]) -> None:
+        """Greedily merge contiguous pieces into chunks with overlap."""
+        window_start = 0
+        total = 0
+        lengths = [self._length(text, *split) for split in splits]
+        for i, length in enumerate(lengths):
+            if total + length > self.chunk_size:
+                if total > self.chunk_size:
+                    logger.warning(
+                        f"Created a chunk of size {total}, which is longer than "
+                        f"the specified {self.chunk_size}"
+                    )
+                if i > window_start:
+                    self._emit(text, splits[window_start][0], splits[i - 1][1], chunks)
+                    while total > self.chunk_overlap or (
+                        total + length > self.chunk_size and total > 0
+                    ):
+                        total -= lengths[window_start]
+                        window_start += 1
+            total += length
+        if len(splits) > window_start:
+            self._emit(text, splits[window_start][0], splits[-1][1], chunks)
+
+    @staticmethod
+    def _emit(text: str, start: int, end: int, chunks: List[Span]) -> None:
+        # Pieces tile the text, so a merged chunk is one contiguous span;
+        # stripping it matches LangChain's strip_whitespace behaviour
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            chunks.append((start, end))
+
+
+@lru_cache(maxsize=None)
+def get_splitter(
+    chunk_size: int,
+    chunk_overlap: int,
+    length_function: Optional[Callable[[str], int]] = None,
+) -> OffsetTextSplitter:
+    """Return a shared splitter for the given configuration."""
+    return OffsetTextSplitter(chunk_size, chunk_overlap, length_function=length_function)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Return the shared split pool, creating it on first use.
+
+    Handlers split from request threads, so creation is locked, and workers
+    are started with forkserver (spawn where unavailable): forking a process
+    that runs threads can copy locks held by other threads into the child.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                # Already submitted splits still finish
+                _pool.shutdown(wait=False)
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+            _pool_workers = max_workers
+        return _pool
+
+
+def _split_offsets_worker(args: Tuple[OffsetTextSplitter, str]) -> List[Span]:
+    splitter, text = args
+    return splitter.split_offsets(text)
+
+
+def split_documents_parallel(
+    documents: Sequence[Document],
+    splitter: OffsetTextSplitter,
+    max_workers: int,
+    min_chars: int = 0,
+) -> List[Document]:
+    """
+    Split documents across a process pool.
+
+    Workers only return offsets, so the result pickled back to this process
+    is a list of integer pairs per document. Small inputs are split in
+    process, where the pool round-trip would cost more than it saves.
+
+    Args:
+        documents: Documents to split
+        splitter: Splitter to use; its length function must be picklable
+        max_workers: Pool size; 1 or less splits in process
+        min_chars: Total characters below which the pool is not used
+
+    Returns:
+        Chunk documents in input order
+    """
+    total_chars = sum(len(doc.page_content) for doc in documents)
+    if max_workers <= 1 or len(documents) < 2 or total_chars < min_chars:
+        return splitter.split_documents(documents)
+
+    pool = _get_pool(max_workers)
+    chunksize = max(1, len(documents) // (max_workers * 4))
+    all_offsets = pool.map(
+        _split_offsets_worker,
+        [(splitter, doc.page_content) for doc in documents],
+        chunksize=chunksize,
+    )
+    return [
+        chunk
+        for doc, offsets in zip(documents, all_offsets)
+        for chunk in splitter._to_documents(doc, offsets)
+    ]
+
+
+def stream_split_file(
+    file_path: str,
+    splitter: OffsetTextSplitter,
+    window_bytes: int = 4 * 1024 * 1024,
+    encoding: str = "utf-8",
+) -> Iterator[Document]:
+    """
+    Split a text file into chunks without reading it into memory.
+
+    The file is memory-mapped and decoded one window at a time with an
+    incremental decoder, so multi-byte characters straddling a window edge
+    are carried into the next window. The last chunk of each window may be
+    cut short by the edge, so splitting resumes from its start in the next
+    window. Memory use is bounded by the window size plus one chunk.
+
+    Args:
+        file_path: Path to the text file
+        splitter: Splitter to apply
+        window_bytes: Bytes decoded per window
+        encoding: Text encoding of the file
+
+    Yields:
+        Chunk documents with ``source`` and absolute ``start_index`` metadata
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    carry = ""
+    # Character offset of ``carry`` within the whole file
+    base = 0
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        size = len(mapped)
+        for position in range(0, size, window_bytes):
+            final = position + window_bytes >= size
+            buffer = carry + decoder.decode(mapped[position:position + window_bytes], final=final)
+            offsets = splitter.split_offsets(buffer)
+            if not final and offsets:
+                # Hold back the chunk touching the window edge
+                resume = offsets.pop()[0]
+            else:
+                resume = len(buffer)
+            for start, end in offsets:
+                metadata = {"source": file_path}
+                if splitter.add_start_index:
+                    metadata["start_index"] = base + start
+                yield Document(page_content=buffer[start:end], metadata=metadata)
+            carry = buffer[resume:]
+            base += resume
@@ -1,16 +1,24 @@
 """Text document handler."""
 
-from typing import Any, Dict
+import os
+from itertools import islice
+from typing import Any, Dict, List
 
 from langchain_community.document_loaders import TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 
+from ..core.config import settings
+from ..core.errors import ServiceUnavailable
+from ..core.metrics import record_chunks, record_error, track_stage
 from .base import BaseHandler
+from .splitter import stream_split_file
 
 
 class TXTHandler(BaseHandler):
     """Handler for processing plain text documents."""
 
+    handler_type = "txt"
+
     def process(self, file_path: str) -> Dict[str, Any]:
         """
         Process a text file and prepare it for querying.
@@ -24,16 +32,15 @@ class TXTHandler(BaseHandler):
         try:
             print(f"Processing text file: {file_path}")
 
+            if os.path.getsize(file_path) >= settings.TXT_STREAMING_THRESHOLD:
+                return self._process_streaming(file_path)
+
             # Document Loading
-            loader = TextLoader(file_path, encoding='utf-8')
-            pages = loader.load()
+            with track_stage("load", self.handler_type):
+                pages = self.load(file_path)
 
             # Text Splitting
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.chunk_size,
-                chunk_overlap=self.chunk_overlap
-            )
-            texts = text_splitter.split_documents(pages)
+            texts = self._split_documents(pages)
 
             # Create vector store
             self.vector_store = self._create_vector_store(texts)
@@ -44,8 +51,53 @@ class TXTHandler(BaseHandler):
                 "num_pages": len(pages),
                 "num_chunks": len(texts)
             }
+        except ServiceUnavailable:
+            raise
         except Exception as e:
+            record_error(self.handler_type, "process")
             return {
                 "status": "error",
                 "message": f"Error processing text file: {str(e)}"
             }
+
+    @staticmethod
+    def load(file_path: str) -> List[Document]:
+        """Load a UTF-8 text file as a single document."""
+        return TextLoader(file_path, encoding='utf-8').load()
+
+    def _process_streaming(self, file_path: str) -> Dict[str, Any]:
+        """
+        Index a large text file in constant memory.
+
+        The file is memory-mapped and split window by window, and each
+        batch of chunks is embedded and upserted before the next is read.
+
+        Args:
+            file_path: Path to the text file
+
+        Returns:
+            Dictionary with processing status and metadata
+        """
+        vector_store = self._open_vector_store()
+        chunks = stream_split_file(
+            file_path,
+            self.text_splitter,
+            window_bytes=settings.TXT_STREAM_WINDOW_BYTES,
+        )
+        num_chunks = 0
+        while True:
+            with track_stage("split", self.handler_type):
+                batch = list(islice(chunks, settings.INGEST_BATCH_SIZE))
+            if not batch:
+                break
+            record_chunks(self.handler_type, len(batch))
+            self._add_to_vector_store(vector_store, batch)
+            num_chunks += len(batch)
+
+        self.vector_store = vector_store
+        return {
+            "status": "success",
+            "message": "Text file processed successfully",
+            "num_pages": 1,
+            "num_chunks": num_chunks
+        }
@@ -1,16 +1,21 @@
 """Web content handler."""
 
-from typing import Any, Dict
+from time import perf_counter
+from typing import Any, Dict, List, Optional
 
 import requests
 from bs4 import BeautifulSoup
 
-from .base import BaseHandler
+from ..core.metrics import record_chunks, record_error, track_stage
+from .base import BaseHandler, RetrievalOptions
+from .conversation import Conversation
 
 
 class WebHandler(BaseHandler):
     """Handler for processing web pages."""
 
+    handler_type = "web"
+
     def __init__(self):
         """Initialize the web handler."""
         super().__init__()
@@ -40,11 +45,12 @@ class WebHandler(BaseHandler):
             }
 
             # Fetch the webpage
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+            with track_stage("load", self.handler_type):
+                response = requests.get(url, headers=headers, timeout=10)
+                response.raise_for_status()
 
-            # Parse with BeautifulSoup
-            soup = BeautifulSoup(response.content, 'html.parser')
+                # Parse with BeautifulSoup
+                soup = BeautifulSoup(response.content, 'html.parser')
 
             # Remove unwanted elements
             for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'advertisement']):
@@ -67,40 +73,101 @@ class WebHandler(BaseHandler):
 
             self.content = text_content.strip()
             self.url = url
+            num_chunks = len(text_content.split()) // 100 + 1
+            record_chunks(self.handler_type, num_chunks)
 
             return {
                 "status": "success",
                 "message": "Web page processed successfully",
                 "title": page_title,
                 "num_pages": 1,
-                "num_chunks": len(text_content.split()) // 100 + 1,
+                "num_chunks": num_chunks,
                 "word_count": len(text_content.split())
             }
 
         except requests.exceptions.RequestException as e:
+            record_error(self.handler_type, "process")
             return {"status": "error", "message": f"Failed to fetch webpage: {str(e)}"}
         except Exception as e:
+            record_error(self.handler_type, "process")
             return {"status": "error", "message": f"Error processing webpage: {str(e)}"}
 
-    def query(self, query: str) -> Dict[str, Any]:
+    def query(
+        self,
+        query: str,
+        retrieval: Optional[RetrievalOptions] = None,
+        conversation: Optional[Conversation] = None,
+        search_query: Optional[str] = None,
+        document: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         """
         Answer a query about the web content.
         
         Args:
             query: The question to ask
+            retrieval: Accepted for interface parity; keyword search ignores it
+            conversation: Accepted for interface parity; keyword search ignores it
+            search_query: Standalone question to search for instead of ``query``
+            document: Registry record carrying the page content; defaults to
+                the page this handler processed last
             
         Returns:
             Dictionary with answer and status
         """
-        if not self.content:
+        content = document.get("content", "") if document is not None else self.content
+        if not content:
             return {"status": "error", "message": "No web content available"}
 
         try:
-            answer = self._search_content(query, self.content)
+            with track_stage("retrieve", self.handler_type):
+                answer = self._search_content(search_query or query, content)
             return {"status": "success", "answer": answer}
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+    def query_batch(
+        self,
+        questions: List[str],
+        retrieval: Optional[RetrievalOptions] = None,
+        max_concurrency: int = 8,
+        vectors: Optional[List[List[float]]] = None,
+        document: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Answer many questions about the web content.
+
+        Keyword search is local and cheap, so questions are answered in turn.
+
+        Args:
+            questions: Questions to answer
+            retrieval: Accepted for interface parity; keyword search ignores it
+            max_concurrency: Accepted for interface parity
+            vectors: Accepted for interface parity; keyword search ignores it
+            document: Registry record carrying the page content
+
+        Returns:
+            Dictionary with per-question results and batch timings
+        """
+        start = perf_counter()
+        results = []
+        for question in questions:
+            question_start = perf_counter()
+            result = self.query(question, retrieval, document=document)
+            result["retrieve_ms"] = (perf_counter() - question_start) * 1000
+            results.append(result)
+        return {
+            "status": "success",
+            "results": results,
+            "timings": {"retrieve_ms": (perf_counter() - start) * 1000},
+        }
+
+    def index_binding(self) -> Dict[str, Any]:
+        """Web content is searched in memory, so the record carries the text itself."""
+        return {"content": self.content}
+
+    def bind(self, doc_info: Dict[str, Any]) -> None:
+        """Nothing to attach: page content is passed to each query with its record."""
+
     def get_content(self) -> str:
         """Get the extracted content."""
         return self.content
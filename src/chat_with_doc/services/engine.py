@@ -1,24 +1,134 @@
 """Document processing engine."""
 
+import json
 import logging
-from typing import Any, Dict, List
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 
-from ..handlers import DOCHandler, PDFHandler, TXTHandler, WebHandler
+from ..core.admission import governor
+from ..core.config import settings
+from ..core.errors import ServiceUnavailable
+from ..core.metrics import (
+    observe_conversation_tokens,
+    record_error,
+    record_routing,
+    track_stage,
+)
+from ..core.resilience import call_provider
+from ..core.routing import DocumentRouter, collect_centroid
+from ..core.vector_index import pinecone_connection
+from ..handlers import (
+    BaseHandler,
+    DOCHandler,
+    PDFHandler,
+    RetrievalOptions,
+    TXTHandler,
+    WebHandler,
+)
+from ..handlers.base import InstrumentedEmbeddings
+from ..handlers.context import estimate_tokens
+from ..handlers.conversation import Conversation, fold_turns, rewrite_question
+from .state import StateBackend, create_state_backend
 
 logger = logging.getLogger(__name__)
+
+# Handler type for each supported upload content type
+CONTENT_TYPE_HANDLERS = {
+    "application/pdf": "pdf",
+    "application/msword": "docx",
+    "text/plain": "txt",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+}
+
+# Content type for each supported file extension
+EXTENSION_CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "txt": "text/plain",
+    "doc": "application/msword",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+# Compare-and-set attempts before a conversation update is given up
+CONVERSATION_WRITE_ATTEMPTS = 5
+
+
 class DocumentEngine:
     """Engine for managing and processing multiple documents."""
 
-    def __init__(self):
-        """Initialize the document engine."""
+    def __init__(self, state: Optional[StateBackend] = None):
+        """
+        Initialize the document engine.
+
+        Args:
+            state: Shared state backend; defaults to the one selected by settings
+        """
         self.pdf_handler = PDFHandler()
         self.doc_handler = DOCHandler()
         self.txt_handler = TXTHandler()
         self.web_handler = WebHandler()
+        self.handlers: Dict[str, BaseHandler] = {
+            handler.handler_type: handler
+            for handler in (self.pdf_handler, self.doc_handler, self.txt_handler, self.web_handler)
+        }
 
-        # Store processed documents
-        self.processed_documents: List[Dict[str, Any]] = []
+        # Processed documents live in the state backend so every worker sees them
+        self.state = state or create_state_backend()
+        # Lets workers share one Pinecone index check
+        pinecone_connection.use_cache(self.state)
         self.all_content = ""
+        self._documents_lock = threading.Lock()
+        self._documents: List[Dict[str, Any]] = []
+        self._documents_version: Optional[int] = None
+
+        # Document-level routing for large corpora
+        self.router = DocumentRouter()
+        self.query_embeddings = InstrumentedEmbeddings(settings.get_embedding_model(), "engine")
+        # Rewrites follow-up questions and summarizes conversations
+        self.llm = settings.get_llm()
+        self._summarizer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarize")
+        self._summarizing: Set[str] = set()
+        self._summarizing_lock = threading.Lock()
+
+    @property
+    def processed_documents(self) -> List[Dict[str, Any]]:
+        """
+        Processed document records, shared across workers.
+
+        Decoding the registry grows with its size, centroids included, so
+        the decoded records are reused until the corpus version changes.
+        """
+        version = self.state.corpus_version()
+        with self._documents_lock:
+            if version == self._documents_version:
+                return list(self._documents)
+        # Read after the version, so a concurrent change can only make the cache newer
+        documents = self.state.list_documents()
+        with self._documents_lock:
+            self._documents, self._documents_version = documents, version
+        return list(documents)
+
+    def _handler_for(self, doc_info: Dict[str, Any]) -> BaseHandler:
+        """Return the shared handler for a document record, bound to its index."""
+        handler = self.handlers[doc_info["handler_type"]]
+        handler.bind(doc_info)
+        return handler
+
+    def _register(self, handler: BaseHandler, doc_info: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """Record a processed document in the shared registry, replacing an earlier version."""
+        doc_info.update({
+            "handler_type": handler.handler_type,
+            "num_chunks": result.get("num_chunks", 0),
+            **handler.index_binding(),
+        })
+        self.state.replace_document(doc_info)
+
+    def handler_for_content_type(self, content_type: str) -> Optional[BaseHandler]:
+        """Return the handler for a MIME type, or None if it is unsupported."""
+        handler_type = CONTENT_TYPE_HANDLERS.get(content_type)
+        return self.handlers[handler_type] if handler_type else None
 
     def process_document(self, file_path: str, content_type: str) -> Dict[str, Any]:
         """
@@ -37,28 +147,15 @@ class DocumentEngine:
 
             logger.info(f"Processing file: {file_path} with content type: {content_type}")
 
-            if content_type == "application/pdf":
-                result = self.pdf_handler.process(file_path)
-                handler = self.pdf_handler
-            elif content_type == "application/msword":
-                result = self.doc_handler.process(file_path)
-                handler = self.doc_handler
-            elif content_type == "text/plain":
-                result = self.txt_handler.process(file_path)
-                handler = self.txt_handler
-            elif content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                result = self.doc_handler.process(file_path)
-                handler = self.doc_handler
+            # Chunk embeddings computed while indexing double as the routing centroid
+            with collect_centroid() as centroid:
+                handler = self.handler_for_content_type(content_type)
+                if handler is not None:
+                    result = handler.process(file_path)
 
             if result["status"] == "success" and handler:
                 # Add to processed documents list
-                doc_info = {
-                    "handler": handler,
-                    "file_path": file_path,
-                    "content_type": content_type,
-                    "filename": file_path.split('/')[-1]
-                }
-                self.processed_documents.append(doc_info)
+                doc_info = self._add_processed(handler, file_path, content_type, result, centroid.vector())
 
                 # Update combined content
                 try:
@@ -71,55 +168,421 @@ class DocumentEngine:
                 print(f"Document added to collection. Total: {len(self.processed_documents)}")
 
             return result
+        except ServiceUnavailable:
+            raise
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
-    def query_documents(self, query: str) -> Dict[str, Any]:
+    def ingest_chunks(
+        self,
+        file_path: str,
+        content_type: str,
+        chunks: Iterable[Any],
+        num_pages: int,
+    ) -> Dict[str, Any]:
+        """
+        Index a document that was loaded and split elsewhere.
+
+        Args:
+            file_path: Path to the document
+            content_type: MIME type of the document
+            chunks: The document's chunks, possibly streamed
+            num_pages: Pages or sections the document was loaded as
+
+        Returns:
+            Dictionary with processing status
+
+        Raises:
+            ServiceUnavailable: If the ingest pool is saturated
+            RuntimeError: If embedding or upserting fails
+        """
+        handler = self.handler_for_content_type(content_type)
+        if handler is None:
+            return {"status": "error", "message": "Unknown file type"}
+        with collect_centroid() as centroid:
+            num_chunks = handler.index_chunks(chunks)
+        result = {"status": "success", "num_pages": num_pages, "num_chunks": num_chunks}
+        self._add_processed(handler, file_path, content_type, result, centroid.vector())
+        return result
+
+    def _add_processed(
+        self,
+        handler: BaseHandler,
+        file_path: str,
+        content_type: str,
+        result: Dict[str, Any],
+        centroid: Optional[List[float]],
+    ) -> Dict[str, Any]:
+        """Build a processed file's record and register it."""
+        doc_info = {
+            "file_path": file_path,
+            "content_type": content_type,
+            "filename": file_path.split('/')[-1]
+        }
+        if centroid is not None:
+            doc_info["centroid"] = centroid
+        self._register(handler, doc_info, result)
+        return doc_info
+
+    def query_documents(
+        self,
+        query: str,
+        retrieval: Optional[RetrievalOptions] = None,
+        documents: Optional[List[str]] = None,
+        document_types: Optional[List[str]] = None,
+        session_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         Query all processed documents.
         
         Args:
             query: The question to ask
+            retrieval: Retrieval controls (k, score threshold, MMR)
+            documents: Only query documents with these filenames
+            document_types: Only query these handler types (pdf, docx, txt, web)
+            session_id: Chat session whose memory the question follows up on
             
         Returns:
             Dictionary with combined answers
         """
-        logger.info(f"Querying {len(self.processed_documents)} documents with: {query}")
-        if not self.processed_documents:
+        processed = self.processed_documents
+        if not processed:
             return {"status": "error", "message": "No documents processed"}
 
-        logger.info(f"Querying {len(self.processed_documents)} documents with: {query}")
+        selected = self._select_documents(processed, documents, document_types)
+        logger.info(f"Querying {len(selected)} of {len(processed)} documents")
+        if not selected:
+            return {"status": "error", "message": "No processed documents match the filters"}
+
+        conversation = self.load_conversation(session_id) if session_id else None
+        search_query = None
+        if conversation is not None and not conversation.is_empty():
+            observe_conversation_tokens(estimate_tokens(conversation.format()))
+            # Rewrite once here rather than once per document in each handler
+            search_query = rewrite_question(self.llm, conversation, query)
+            logger.info(f"Rewrote follow-up question as: {search_query}")
+
+        routed = self._route(search_query or query, processed, selected)
+        if routed is not selected:
+            logger.info(f"Routed query to {len(routed)} of {len(selected)} documents")
+            selected = routed
 
         try:
             all_responses = []
 
-            for doc_info in self.processed_documents:
-                handler = doc_info["handler"]
+            for doc_info in selected:
                 filename = doc_info["filename"].split('\\')[-1]
+                options = self._scoped_options(retrieval, doc_info)
 
                 try:
-                    response = handler.query(query)
+                    handler = self._handler_for(doc_info)
+                    with track_stage("query", handler.handler_type):
+                        response = handler.query(query, options, conversation, search_query, doc_info)
                     if response.get("status") == "success":
                         answer = response.get("answer", "")
-                        logger.info(f"this is the {answer}")
-                        all_responses.append(f"From {filename}:\n{answer[0]['text']}")
+                        logger.debug(f"this is the {answer}")
+                        all_responses.append(f"From {filename}:\n{self._answer_text(answer)}")
+                    elif response.get("status") == "error":
+                        record_error(handler.handler_type, "query")
+                except ServiceUnavailable:
+                    raise
                 except Exception as e:
-                    print(f"Error querying {filename}: {e}")
+                    record_error(doc_info["handler_type"], "query")
+                    logger.warning(f"Error querying {filename}: {e}", exc_info=True)
                     continue
 
             if not all_responses:
                 return {"status": "error", "message": "No relevant information found"}
 
             combined_answer = "\n\n".join(all_responses)
+            if session_id:
+                self._remember(session_id, query, combined_answer)
             return {"status": "success", "answer": combined_answer}
 
+        except ServiceUnavailable:
+            raise
         except Exception as e:
-            print(f"Multi-document query failed: {e}")
-            if self.processed_documents:
-                last_handler = self.processed_documents[-1]["handler"]
-                return last_handler.query(query)
+            logger.error(f"Multi-document query failed: {e}", exc_info=True)
             return {"status": "error", "message": str(e)}
 
+    @staticmethod
+    def _conversation_key(session_id: str) -> str:
+        return f"conversation:{session_id}"
+
+    def load_conversation(self, session_id: str) -> Conversation:
+        """
+        Load a chat session's memory, shared across workers.
+
+        Args:
+            session_id: Client-chosen session identifier
+
+        Returns:
+            The session memory; empty for new or expired sessions
+        """
+        stored = self.state.cache_get(self._conversation_key(session_id))
+        return Conversation.model_validate(stored) if stored else Conversation()
+
+    def _update_conversation(
+        self, session_id: str, update: Callable[[Conversation], bool]
+    ) -> Optional[Conversation]:
+        """
+        Apply ``update`` to a session's stored memory with compare-and-set.
+
+        Concurrent turns of one session, on any worker, are retried against
+        the latest memory instead of overwriting each other.
+
+        Args:
+            session_id: Client-chosen session identifier
+            update: Changes the memory in place; returns False to leave it as is
+
+        Returns:
+            The memory as stored, or None if every attempt lost a race
+        """
+        key = self._conversation_key(session_id)
+        for _ in range(CONVERSATION_WRITE_ATTEMPTS):
+            stored = self.state.cache_get(key)
+            conversation = Conversation.model_validate(stored) if stored else Conversation()
+            if not update(conversation):
+                return conversation
+            if self.state.cache_compare_and_set(
+                key, stored, conversation.model_dump(), ttl=settings.CONVERSATION_TTL
+            ):
+                return conversation
+        logger.warning(f"Gave up updating conversation {session_id} after concurrent writes")
+        return None
+
+    def _remember(self, session_id: str, question: str, answer: str) -> None:
+        """Add a turn to a session's memory and summarize older turns in the background."""
+
+        def add_turn(conversation: Conversation) -> bool:
+            conversation.add_turn(question, answer, settings.CONVERSATION_TURN_TOKENS)
+            return True
+
+        conversation = self._update_conversation(session_id, add_turn)
+        if conversation is not None and len(conversation.turns) > settings.CONVERSATION_RECENT_TURNS:
+            with self._summarizing_lock:
+                if session_id in self._summarizing:
+                    return
+                self._summarizing.add(session_id)
+            # Not copying the context: the summary must not inherit the request deadline
+            self._summarizer.submit(self._summarize, session_id)
+
+    def _summarize(self, session_id: str) -> None:
+        """Fold a session's overflowing turns into its summary; runs after the response."""
+        try:
+            for _ in range(CONVERSATION_WRITE_ATTEMPTS):
+                if not self._fold_once(session_id):
+                    break
+        except Exception as e:
+            logger.warning(f"Summarizing conversation {session_id} failed: {e}", exc_info=True)
+        finally:
+            with self._summarizing_lock:
+                self._summarizing.discard(session_id)
+
+    def _fold_once(self, session_id: str) -> bool:
+        """Fold the turns beyond the recent ones once; returns whether anything was folded."""
+        recent = settings.CONVERSATION_RECENT_TURNS
+        snapshot = self.load_conversation(session_id)
+        overflow = len(snapshot.turns) - recent
+        if overflow <= 0:
+            return False
+        folded = snapshot.model_copy(deep=True)
+        try:
+            fold_turns(self.llm, folded, recent, settings.CONVERSATION_SUMMARY_TOKENS)
+        except Exception as e:
+            # Drop the oldest turns rather than let the memory grow
+            logger.warning(f"Summarizing conversation {session_id} failed: {e}")
+            folded.summary = snapshot.summary
+
+        def apply(conversation: Conversation) -> bool:
+            # Turns added meanwhile are kept; a concurrent fold wins
+            if conversation.summary != snapshot.summary or conversation.turns[:overflow] != snapshot.turns[:overflow]:
+                return False
+            conversation.summary = folded.summary
+            conversation.turns = conversation.turns[overflow:]
+            return True
+
+        return self._update_conversation(session_id, apply) is not None
+
+    def _route(
+        self,
+        query: str,
+        processed: List[Dict[str, Any]],
+        selected: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Narrow the selected documents to those closest to the query.
+
+        Routing only kicks in when enabled and when more than
+        ``ROUTING_MIN_DOCUMENTS`` documents are selected; otherwise
+        ``selected`` is returned unchanged.
+
+        Args:
+            query: The question to ask
+            processed: Every processed document record
+            selected: Records left after the filename and type filters
+
+        Returns:
+            The routed records, or ``selected`` itself when not routed
+        """
+        top_m = settings.ROUTING_TOP_M
+        if not top_m or len(selected) <= max(top_m, settings.ROUTING_MIN_DOCUMENTS):
+            return selected
+
+        with track_stage("route"):
+            self.router.refresh(processed, self.state.corpus_version())
+            with governor.admit("chat"):
+                query_vector = call_provider("embed", self.query_embeddings.embed_query, query)
+            routed = self.router.route(query_vector, selected, top_m)
+        record_routing(len(selected), len(routed))
+        return routed
+
+    def query_batch(
+        self,
+        questions: List[str],
+        retrieval: Optional[RetrievalOptions] = None,
+        documents: Optional[List[str]] = None,
+        document_types: Optional[List[str]] = None,
+        max_concurrency: int = 8,
+    ) -> Dict[str, Any]:
+        """
+        Answer many questions against all processed documents.
+
+        Args:
+            questions: Questions to answer
+            retrieval: Retrieval controls applied to every question
+            documents: Only query documents with these filenames
+            document_types: Only query these handler types (pdf, docx, txt, web)
+            max_concurrency: Maximum concurrent retrievals and LLM calls per document
+
+        Returns:
+            Dictionary with one result per question, the shared embedding
+            time and per-document timings
+        """
+        processed = self.processed_documents
+        if not processed:
+            return {"status": "error", "message": "No documents processed"}
+
+        selected = self._select_documents(processed, documents, document_types)
+        logger.info(f"Batch of {len(questions)} questions over {len(selected)} documents")
+        if not selected:
+            return {"status": "error", "message": "No processed documents match the filters"}
+
+        answers: List[List[str]] = [[] for _ in questions]
+        retrieve_ms = [0.0 for _ in questions]
+        timings: Dict[str, Any] = {}
+
+        # Embed the questions once for every document rather than once per handler
+        vectors = None
+        if any(doc_info["handler_type"] != "web" for doc_info in selected):
+            start = perf_counter()
+            with governor.admit("batch"):
+                vectors = call_provider("embed", self.query_embeddings.embed_queries, questions)
+            timings["embed_ms"] = round((perf_counter() - start) * 1000, 3)
+
+        for doc_info in selected:
+            filename = doc_info["filename"].split('\\')[-1]
+            options = self._scoped_options(retrieval, doc_info)
+            try:
+                handler = self._handler_for(doc_info)
+                with track_stage("query_batch", handler.handler_type):
+                    response = handler.query_batch(
+                        questions, options, max_concurrency, vectors, doc_info
+                    )
+            except ServiceUnavailable:
+                raise
+            except Exception as e:
+                logger.error(f"Batch query of {filename} failed: {e}", exc_info=True)
+                continue
+
+            if response.get("status") != "success":
+                record_error(doc_info["handler_type"], "query")
+                continue
+            timings[filename] = response["timings"]
+            for i, result in enumerate(response["results"]):
+                retrieve_ms[i] += result.get("retrieve_ms", 0.0)
+                if result.get("status") == "success":
+                    answers[i].append(f"From {filename}:\n{self._answer_text(result['answer'])}")
+
+        results = []
+        for question, parts, ms in zip(questions, answers, retrieve_ms):
+            if parts:
+                results.append({
+                    "question": question,
+                    "status": "success",
+                    "answer": "\n\n".join(parts),
+                    "retrieve_ms": round(ms, 3),
+                })
+            else:
+                results.append({
+                    "question": question,
+                    "status": "error",
+                    "message": "No relevant information found",
+                    "retrieve_ms": round(ms, 3),
+                })
+        return {"status": "success", "results": results, "timings": timings}
+
+    def coalescing_key(
+        self,
+        query: str,
+        retrieval: Optional[RetrievalOptions] = None,
+        documents: Optional[List[str]] = None,
+        document_types: Optional[List[str]] = None,
+        session_id: Optional[str] = None,
+    ) -> str:
+        """
+        Build the identity of a query for request coalescing.
+
+        Queries that differ only in case or whitespace, asked with the same
+        retrieval controls against the same corpus version in the same chat
+        session, share a key.
+        """
+        normalized = re.sub(r"\s+", " ", query).strip().casefold()
+        return json.dumps([
+            normalized,
+            (retrieval or RetrievalOptions()).model_dump(),
+            sorted(documents or []),
+            sorted(t.lower() for t in document_types or []),
+            self.state.corpus_version(),
+            session_id,
+        ])
+
+    @staticmethod
+    def _scoped_options(retrieval: Optional[RetrievalOptions], doc_info: Dict[str, Any]) -> RetrievalOptions:
+        """
+        Restrict retrieval to one document's chunks.
+
+        Every handler writes to the same index namespace, so without the
+        filter a document's query would also match other documents' chunks,
+        including ones excluded by the filename and type filters.
+        """
+        return (retrieval or RetrievalOptions()).model_copy(update={"sources": [doc_info["file_path"]]})
+
+    @staticmethod
+    def _answer_text(answer: Any) -> str:
+        """Extract text from an answer that is a string or a list of content parts."""
+        if isinstance(answer, list):
+            return "".join(
+                part.get("text", "") if isinstance(part, dict) else str(part) for part in answer
+            )
+        return str(answer)
+
+    @staticmethod
+    def _select_documents(
+        processed: List[Dict[str, Any]],
+        documents: Optional[List[str]],
+        document_types: Optional[List[str]],
+    ) -> List[Dict[str, Any]]:
+        """Return the processed documents matching the filename and type filters."""
+        selected = processed
+        if documents:
+            wanted = set(documents)
+            selected = [d for d in selected if d["filename"] in wanted]
+        if document_types:
+            types = {t.lower() for t in document_types}
+            selected = [d for d in selected if d["handler_type"] in types]
+        return selected
+
     def process_url(self, url: str) -> Dict[str, Any]:
         """
         Process a URL and add to documents.
@@ -134,12 +597,11 @@ class DocumentEngine:
             result = self.web_handler.process(url)
             if result["status"] == "success":
                 doc_info = {
-                    "handler": self.web_handler,
                     "file_path": url,
                     "content_type": "text/html",
                     "filename": f"webpage_{url.split('/')[-1] or 'index'}"
                 }
-                self.processed_documents.append(doc_info)
+                self._register(self.web_handler, doc_info, result)
 
                 try:
                     if hasattr(self.web_handler, 'get_content'):
@@ -155,8 +617,22 @@ class DocumentEngine:
 
     def clear_documents(self) -> Dict[str, Any]:
         """Clear all processed documents."""
-        self.processed_documents = []
+        self.state.clear_documents()
         self.all_content = ""
         logger.info("All documents cleared")
         return {"status": "success", "message": "All documents cleared"}
 
+    def get_status(self) -> Dict[str, Any]:
+        """Get the status of processed and pending documents."""
+        documents = self.processed_documents
+        document_types: List[str] = []
+        for doc_info in documents:
+            if doc_info["content_type"] not in document_types:
+                document_types.append(doc_info["content_type"])
+        return {
+            "total_documents": len(documents),
+            "document_types": document_types,
+            "filenames": [doc_info["filename"] for doc_info in documents],
+            "pending_uploads": len(self.state.list_uploads()),
+            "corpus_version": self.state.corpus_version(),
+        }
@@ -0,0 +1,324 @@
+"""Pluggable engine state shared across API workers."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..core.config import settings
+
+# Seconds between deletions of expired cache entries, done on write
+CACHE_PURGE_INTERVAL = 60
+
+
+class StateBackend(ABC):
+    """
+    Storage for the upload queue, document registry and shared caches.
+
+    Every API worker reads and writes the same backend, so a document
+    uploaded or processed on one worker is visible to all of them. Records
+    are JSON-serializable dicts; handler objects never leave the process.
+    """
+
+    @abstractmethod
+    def add_upload(self, file_info: Dict[str, Any]) -> None:
+        """Queue an uploaded file for processing."""
+
+    @abstractmethod
+    def list_uploads(self) -> List[Dict[str, Any]]:
+        """Return queued uploads without removing them."""
+
+    @abstractmethod
+    def take_uploads(self) -> List[Dict[str, Any]]:
+        """Atomically remove and return all queued uploads."""
+
+    @abstractmethod
+    def add_document(self, doc_info: Dict[str, Any]) -> None:
+        """Register a processed document and bump the corpus version."""
+
+    @abstractmethod
+    def replace_document(self, doc_info: Dict[str, Any]) -> None:
+        """Register a document, dropping any earlier record with the same ``file_path``."""
+
+    @abstractmethod
+    def list_documents(self) -> List[Dict[str, Any]]:
+        """Return processed documents in processing order."""
+
+    @abstractmethod
+    def clear_documents(self) -> None:
+        """Remove all processed documents and bump the corpus version."""
+
+    @abstractmethod
+    def corpus_version(self) -> int:
+        """Return a counter that changes whenever the document set changes."""
+
+    @abstractmethod
+    def cache_get(self, key: str) -> Optional[Any]:
+        """Return a cached value, or None if missing or expired."""
+
+    @abstractmethod
+    def cache_set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Cache a JSON-serializable value, optionally for ``ttl`` seconds."""
+
+    @abstractmethod
+    def cache_compare_and_set(
+        self, key: str, expected: Optional[Any], value: Any, ttl: Optional[float] = None
+    ) -> bool:
+        """
+        Cache ``value`` only if ``key`` still holds ``expected``.
+
+        Args:
+            key: Cache key
+            expected: Value read earlier; None when it was missing or expired
+            value: JSON-serializable value to store
+            ttl: Lifetime in seconds, or None to keep it until replaced
+
+        Returns:
+            Whether the value was stored; False if another writer got there first
+        """
+
+
+class MemoryStateBackend(StateBackend):
+    """In-process backend; only correct with a single worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._uploads: List[Dict[str, Any]] = []
+        self._documents: List[Dict[str, Any]] = []
+        self._version = 0
+        self._cache: Dict[str, Any] = {}
+        self._purged_at = time.monotonic()
+
+    def add_upload(self, file_info: Dict[str, Any]) -> None:
+        with self._lock:
+            self._uploads.append(dict(file_info))
+
+    def list_uploads(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._uploads)
+
+    def take_uploads(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            uploads, self._uploads = self._uploads, []
+            return uploads
+
+    def add_document(self, doc_info: Dict[str, Any]) -> None:
+        with self._lock:
+            self._documents.append(dict(doc_info))
+            self._version += 1
+
+    def replace_document(self, doc_info: Dict[str, Any]) -> None:
+        with self._lock:
+            self._documents = [
+                document for document in self._documents
+                if document.get("file_path") != doc_info["file_path"]
+            ]
+            self._documents.append(dict(doc_info))
+            self._version += 1
+
+    def list_documents(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._documents)
+
+    def clear_documents(self) -> None:
+        with self._lock:
+            self._documents = []
+            self._version += 1
+
+    def corpus_version(self) -> int:
+        return self._version
+
+    def cache_get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._cache_get(key)
+
+    def cache_set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._cache_set(key, value, ttl)
+
+    def cache_compare_and_set(
+        self, key: str, expected: Optional[Any], value: Any, ttl: Optional[float] = None
+    ) -> bool:
+        with self._lock:
+            if self._cache_get(key) != expected:
+                return False
+            self._cache_set(key, value, ttl)
+            return True
+
+    def _cache_get(self, key: str) -> Optional[Any]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.time():
+            self._cache.pop(key, None)
+            return None
+        return value
+
+    def _cache_set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        now = time.time()
+        self._cache[key] = (value, now + ttl if ttl else None)
+        if time.monotonic() - self._purged_at >= CACHE_PURGE_INTERVAL:
+            # Entries nobody reads again would otherwise stay forever
+            self._purged_at = time.monotonic()
+            self._cache = {
+                k: entry for k, entry in self._cache.items() if entry[1] is None or entry[1] >= now
+            }
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    SQLite-backed state shared by every worker on a host.
+
+    Uses WAL mode so readers never block the writer; point ``path`` at a
+    shared volume to share state between containers on one node.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._purged_at = time.monotonic()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS uploads (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL);
+                CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at);
+                INSERT OR IGNORE INTO meta (key, value) VALUES ('corpus_version', 0);
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def add_upload(self, file_info: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT INTO uploads (data) VALUES (?)", (json.dumps(file_info),))
+
+    def list_uploads(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT data FROM uploads ORDER BY id").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def take_uploads(self) -> List[Dict[str, Any]]:
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT id, data FROM uploads ORDER BY id").fetchall()
+            if rows:
+                conn.execute("DELETE FROM uploads WHERE id <= ?", (rows[-1][0],))
+        return [json.loads(row[1]) for row in rows]
+
+    def add_document(self, doc_info: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO documents (data) VALUES (?)", (json.dumps(doc_info),))
+            self._bump_version(conn)
+
+    def replace_document(self, doc_info: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM documents WHERE json_extract(data, '$.file_path') = ?",
+                (doc_info["file_path"],),
+            )
+            conn.execute("INSERT INTO documents (data) VALUES (?)", (json.dumps(doc_info),))
+            self._bump_version(conn)
+
+    def list_documents(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT data FROM documents ORDER BY id").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def clear_documents(self) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM documents")
+            self._bump_version(conn)
+
+    def corpus_version(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'corpus_version'").fetchone()
+        return row[0]
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection) -> None:
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'corpus_version'")
+
+    def cache_get(self, key: str) -> Optional[Any]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def cache_set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            self._purge_expired(conn)
+
+    def cache_compare_and_set(
+        self, key: str, expected: Optional[Any], value: Any, ttl: Optional[float] = None
+    ) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            live = row is not None and (row[1] is None or row[1] >= time.time())
+            if (json.loads(row[0]) if live else None) != expected:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl if ttl else None),
+            )
+            self._purge_expired(conn)
+        return True
+
+    def _purge_expired(self, conn: sqlite3.Connection) -> None:
+        """Delete expired cache rows, at most once per ``CACHE_PURGE_INTERVAL`` per process."""
+        if time.monotonic() - self._purged_at < CACHE_PURGE_INTERVAL:
+            return
+        self._purged_at = time.monotonic()
+        conn.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+        )
+
+
+def create_state_backend() -> StateBackend:
+    """Create the state backend selected by ``STATE_BACKEND``."""
+    backend = settings.STATE_BACKEND.lower()
+    if backend == "memory":
+        return MemoryStateBackend()
+    if backend == "sqlite":
+        return SQLiteStateBackend(settings.STATE_DB_PATH)
+    raise ValueError(f"Unknown STATE_BACKEND: {settings.STATE_BACKEND}")
@@ -0,0 +1,312 @@
+"""Resumable chunked uploads assembled on the server."""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+from ..core.metrics import record_cache, track_stage
+from .state import StateBackend
+
+try:
+    import fcntl
+except ImportError:
+    # Without flock (Windows), chunks are only serialized within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Block size used when re-hashing a partial file to resume an upload
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Seconds between sweeps for partial files of expired uploads
+SWEEP_INTERVAL = 300
+
+
+class UploadError(Exception):
+    """
+    A chunked upload request that cannot be applied.
+
+    Attributes:
+        status_code: HTTP status to answer with
+        offset: Bytes the server holds, when the client should resume from there
+    """
+
+    def __init__(self, message: str, status_code: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+class ChunkedUploads:
+    """
+    Upload sessions that accept a file as a sequence of byte ranges.
+
+    Chunks are appended in order to a partial file while a SHA-256 of the
+    bytes is updated incrementally, so finishing an upload never re-reads
+    the file. The received offset is the partial file's size, so a client
+    can resume after an interruption, or a worker restart, by asking for it.
+    Session records live in the state backend and expire after ``ttl``
+    seconds; the partial files must be on storage shared by every worker.
+    Chunks of one upload are serialized with an ``flock`` on its partial
+    file, so concurrent requests on different workers cannot interleave,
+    and partial files left by expired sessions are swept periodically.
+    """
+
+    def __init__(
+        self,
+        state: StateBackend,
+        upload_dir: str,
+        chunk_size: int,
+        max_size: int,
+        ttl: int,
+    ):
+        self.state = state
+        self.upload_dir = upload_dir
+        self.partial_dir = os.path.join(upload_dir, ".partial")
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.ttl = ttl
+        # Hash state per upload, valid up to the recorded offset
+        self._hashers: Dict[str, Tuple[int, Any]] = {}
+        self._lock = threading.Lock()
+        self._swept_at: Optional[float] = None
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+    def create(
+        self,
+        filename: str,
+        size: int,
+        content_type: str,
+        sha256: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Start an upload session.
+
+        Args:
+            filename: Name the assembled file is stored under
+            size: Total size of the file in bytes
+            content_type: Resolved MIME type of the file
+            sha256: Expected hex digest, checked when the upload completes
+
+        Returns:
+            The session record
+
+        Raises:
+            UploadError: If the file is larger than ``max_size``
+        """
+        if self.max_size and size > self.max_size:
+            raise UploadError(f"File is larger than {self.max_size} bytes", status_code=413)
+        if self._swept_at is None or time.monotonic() - self._swept_at >= SWEEP_INTERVAL:
+            self._swept_at = time.monotonic()
+            self.sweep()
+        upload_id = uuid.uuid4().hex
+        record = {
+            "upload_id": upload_id,
+            "filename": os.path.basename(filename),
+            "content_type": content_type,
+            "size": size,
+            "expected_sha256": sha256.lower() if sha256 else None,
+            "complete": False,
+        }
+        open(self._part_path(upload_id), "wb").close()
+        self._save(record)
+        if size == 0:
+            return self._finish(record, hashlib.sha256())
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        """
+        Describe an upload session, including the bytes received so far.
+
+        Raises:
+            UploadError: If the session does not exist or has expired
+        """
+        record = self._load(upload_id)
+        offset = record["size"] if record["complete"] else self._received(upload_id)
+        return {**record, "offset": offset, "chunk_size": self.chunk_size}
+
+    def append(self, upload_id: str, start: int, data: bytes) -> Dict[str, Any]:
+        """
+        Write the chunk starting at byte ``start``.
+
+        Chunks must arrive in order. A chunk that repeats bytes already
+        received, e.g. one retried after a lost response, only contributes
+        its new bytes.
+
+        Args:
+            upload_id: Upload session
+            start: Offset of the chunk's first byte in the file
+            data: Chunk bytes
+
+        Returns:
+            The updated session status; complete once every byte arrived
+
+        Raises:
+            UploadError: If the session is unknown, the chunk leaves a gap
+                (409, with the offset to resume from) or overruns the size
+        """
+        self._load(upload_id)
+        with self._locked(upload_id) as part:
+            # Re-read under the lock in case a concurrent chunk finished the upload
+            record = self._load(upload_id)
+            if record["complete"]:
+                return self.status(upload_id)
+            if part is None:
+                raise UploadError("Upload not found or expired", status_code=404)
+            offset = part.seek(0, os.SEEK_END)
+            if start > offset:
+                raise UploadError(
+                    f"Chunk starts at byte {start} but only {offset} bytes were received",
+                    status_code=409,
+                    offset=offset,
+                )
+            data = data[offset - start:]
+            if offset + len(data) > record["size"]:
+                raise UploadError(f"Chunk runs past the declared size of {record['size']} bytes")
+            if not data:
+                return self.status(upload_id)
+
+            hasher = self._hasher(upload_id, offset)
+            with track_stage("upload_write", "api"):
+                part.write(data)
+                part.flush()
+            hasher.update(data)
+            offset += len(data)
+            self._hashers[upload_id] = (offset, hasher)
+
+            if offset == record["size"]:
+                return self._finish(record, hasher)
+        return self.status(upload_id)
+
+    def cancel(self, upload_id: str) -> None:
+        """Abandon an upload session and delete its partial file."""
+        self._load(upload_id)
+        with self._locked(upload_id):
+            self._discard(upload_id)
+        self.state.cache_set(self._key(upload_id), None, ttl=1)
+
+    def sweep(self) -> int:
+        """
+        Delete partial files of sessions that expired before completing.
+
+        A partial file is removed once its session record is gone and it
+        has not been written to for ``ttl`` seconds.
+
+        Returns:
+            Number of partial files removed
+        """
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for upload_id in os.listdir(self.partial_dir):
+            try:
+                if os.path.getmtime(self._part_path(upload_id)) >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            if self.state.cache_get(self._key(upload_id)):
+                continue
+            with self._locked(upload_id) as part:
+                if part is not None:
+                    self._discard(upload_id)
+                    removed += 1
+        if removed:
+            logger.info(f"Removed {removed} partial files of expired uploads")
+        return removed
+
+    def _finish(self, record: Dict[str, Any], hasher) -> Dict[str, Any]:
+        """Verify the digest, move the file into place and queue it for processing."""
+        upload_id = record["upload_id"]
+        digest = hasher.hexdigest()
+        if record["expected_sha256"] and digest != record["expected_sha256"]:
+            self._discard(upload_id)
+            self.state.cache_set(self._key(upload_id), None, ttl=1)
+            raise UploadError("Uploaded bytes do not match the expected SHA-256", status_code=422)
+
+        file_location = os.path.join(self.upload_dir, record["filename"])
+        os.replace(self._part_path(upload_id), file_location)
+        self._hashers.pop(upload_id, None)
+        record = {**record, "complete": True, "sha256": digest, "file_location": file_location}
+        self._save(record)
+        self.state.add_upload({
+            "filename": record["filename"],
+            "file_location": file_location,
+            "content_type": record["content_type"],
+        })
+        return self.status(upload_id)
+
+    def _hasher(self, upload_id: str, offset: int):
+        """Return the hash of the first ``offset`` bytes, re-hashing the file if needed."""
+        cached = self._hashers.get(upload_id)
+        record_cache("api", "upload_hash", hit=cached is not None and cached[0] == offset)
+        if cached is not None and cached[0] == offset:
+            return cached[1]
+        # Resumed on another worker or after a restart
+        hasher = hashlib.sha256()
+        with open(self._part_path(upload_id), "rb") as part:
+            remaining = offset
+            while remaining:
+                block = part.read(min(HASH_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+        return hasher
+
+    def _received(self, upload_id: str) -> int:
+        try:
+            return os.path.getsize(self._part_path(upload_id))
+        except FileNotFoundError:
+            raise UploadError("Upload not found or expired", status_code=404)
+
+    def _discard(self, upload_id: str) -> None:
+        self._hashers.pop(upload_id, None)
+        try:
+            os.remove(self._part_path(upload_id))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def _locked(self, upload_id: str) -> Iterator[Optional[BinaryIO]]:
+        """
+        Hold an exclusive lock on an upload's partial file.
+
+        Yields the open file, or None if it is gone, e.g. because the upload
+        was completed or cancelled while this caller waited for the lock.
+        """
+        path = self._part_path(upload_id)
+        with self._lock if fcntl is None else nullcontext():
+            try:
+                part = open(path, "r+b")
+            except FileNotFoundError:
+                yield None
+                return
+            with part:
+                if fcntl is not None:
+                    # Released when the file is closed
+                    fcntl.flock(part.fileno(), fcntl.LOCK_EX)
+                try:
+                    moved = os.stat(path).st_ino != os.fstat(part.fileno()).st_ino
+                except FileNotFoundError:
+                    moved = True
+                yield None if moved else part
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.partial_dir, upload_id)
+
+    @staticmethod
+    def _key(upload_id: str) -> str:
+        return f"upload:{upload_id}"
+
+    def _load(self, upload_id: str) -> Dict[str, Any]:
+        record = self.state.cache_get(self._key(upload_id))
+        if not record:
+            raise UploadError("Upload not found or expired", status_code=404)
+        return record
+
+    def _save(self, record: Dict[str, Any]) -> None:
+        self.state.cache_set(self._key(record["upload_id"]), record, ttl=self.ttl)
@@ -0,0 +1,181 @@
+"""Startup warm-up of provider clients, the vector index and the RAG pipeline."""
+
+import logging
+import threading
+import time
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.local_index import get_local_index
+from ..core.metrics import observe_stage
+from ..core.resilience import call_provider, request_deadline
+from ..core.vector_index import pinecone_connection
+from .engine import DocumentEngine
+
+logger = logging.getLogger(__name__)
+
+PENDING, READY, FAILED, SKIPPED = "pending", "ready", "failed", "skipped"
+
+
+class Warmup:
+    """
+    Run warm-up steps once at startup and report readiness.
+
+    Each component is warmed in order and timed. Failed components are
+    retried every ``retry_interval`` seconds in the background, so a
+    provider that is briefly unavailable at boot does not leave the
+    instance unready forever.
+    """
+
+    def __init__(self, retry_interval: float = 10.0):
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def disable(self) -> None:
+        """Report ready without warming anything."""
+        with self._lock:
+            self._components = {"warmup": {"status": SKIPPED, "ms": 0.0, "detail": "WARMUP_ENABLED is off"}}
+
+    def start(self, engine: DocumentEngine) -> None:
+        """Warm up in a background thread; the server keeps answering liveness checks."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self.run, args=(engine,), name="warmup", daemon=True
+            )
+        self._thread.start()
+
+    def run(self, engine: DocumentEngine, max_rounds: Optional[int] = None) -> bool:
+        """
+        Warm every component, retrying failures until all are ready.
+
+        Args:
+            engine: Engine whose clients and handlers to warm
+            max_rounds: Stop retrying after this many rounds; None retries forever
+
+        Returns:
+            Whether every component ended up ready or skipped
+        """
+        steps = warmup_steps(engine)
+        with self._lock:
+            self._started_at = time.time()
+            for name, _ in steps:
+                self._components[name] = {"status": PENDING}
+
+        rounds = 0
+        while True:
+            rounds += 1
+            for name, step in steps:
+                if self._components[name]["status"] in (READY, SKIPPED):
+                    continue
+                self._run_step(name, step)
+            if self.is_ready():
+                with self._lock:
+                    self._finished_at = time.time()
+                logger.info(f"Warm-up complete in {self.report()['total_ms']:.0f}ms")
+                return True
+            if max_rounds is not None and rounds >= max_rounds:
+                return False
+            time.sleep(self.retry_interval)
+
+    def _run_step(self, name: str, step: Callable[[], Optional[str]]) -> None:
+        start = perf_counter()
+        try:
+            # A bounded deadline keeps a hung provider from stalling the retry loop
+            with request_deadline(settings.WARMUP_TIMEOUT):
+                skipped = step()
+            status, detail = (SKIPPED, skipped) if skipped else (READY, None)
+        except Exception as e:
+            status, detail = FAILED, f"{type(e).__name__}: {e}"
+            logger.warning(f"Warm-up of {name} failed: {detail}")
+        seconds = perf_counter() - start
+        observe_stage(f"warmup_{name}", "engine", seconds)
+        entry: Dict[str, Any] = {"status": status, "ms": round(seconds * 1000, 3)}
+        if detail:
+            entry["detail"] = detail
+        with self._lock:
+            self._components[name] = entry
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return bool(self._components) and all(
+                c["status"] in (READY, SKIPPED) for c in self._components.values()
+            )
+
+    def report(self) -> Dict[str, Any]:
+        """Readiness, with the status and duration of each component."""
+        with self._lock:
+            components = {name: dict(entry) for name, entry in self._components.items()}
+            started, finished = self._started_at, self._finished_at
+        ready = bool(components) and all(c["status"] in (READY, SKIPPED) for c in components.values())
+        if ready:
+            status = "ready"
+        elif any(c["status"] == FAILED for c in components.values()):
+            status = "failed"
+        else:
+            status = "warming"
+        report: Dict[str, Any] = {
+            "status": status,
+            "components": components,
+            "total_ms": round(sum(c.get("ms", 0.0) for c in components.values()), 3),
+        }
+        if started is not None:
+            report["elapsed_s"] = round((finished or time.time()) - started, 3)
+        return report
+
+
+def warmup_steps(engine: DocumentEngine) -> List[Tuple[str, Callable[[], Optional[str]]]]:
+    """
+    List the warm-up steps for an engine, in order.
+
+    Each step returns None when done, or a reason when it was skipped.
+    """
+    rag_handlers = [h for h in engine.handlers.values() if h.handler_type != "web"]
+
+    def state() -> None:
+        engine.state.corpus_version()
+
+    def vector_index() -> None:
+        if settings.VECTOR_BACKEND == "local":
+            get_local_index()
+            return
+        # Validates the index, then opens a data-plane connection
+        pinecone_connection.validate()
+        call_provider("search", pinecone_connection.index.describe_index_stats)
+
+    def embedding() -> None:
+        # Handlers hold their own clients; warm each connection pool once
+        clients = {id(h.embedding_model.embeddings): h.embedding_model for h in rag_handlers}
+        clients[id(engine.query_embeddings.embeddings)] = engine.query_embeddings
+        for client in clients.values():
+            call_provider("embed", client.embeddings.embed_query, "warm-up")
+
+    def llm() -> Optional[str]:
+        if not settings.WARMUP_LLM:
+            return "WARMUP_LLM is disabled"
+        models = {id(h.llm): h.llm for h in rag_handlers}
+        models[id(engine.llm)] = engine.llm
+        for model in models.values():
+            call_provider("generate", model.invoke, "Reply with OK.")
+        return None
+
+    def pipeline() -> None:
+        for handler in rag_handlers:
+            handler._get_graph()
+
+    return [
+        ("state", state),
+        ("vector_index", vector_index),
+        ("embedding", embedding),
+        ("llm", llm),
+        ("pipeline", pipeline),
+    ]
+
+
+warmup = Warmup(retry_interval=settings.WARMUP_RETRY_INTERVAL)
@@ -0,0 +1,69 @@
+"""Admission control tests."""
+
+import threading
+import time
+
+import pytest
+
+from src.chat_with_doc.core.admission import AdmissionPool, AdmissionRejected
+
+
+def test_full_queue_rejects_immediately():
+    """Test callers beyond the wait queue are rejected with a Retry-After."""
+    pool = AdmissionPool("test", max_concurrent=1, max_queue=0, max_wait=5)
+    with pool.admit():
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with pool.admit():
+                pass
+    assert excinfo.value.pool == "test"
+    assert excinfo.value.retry_after >= 1
+    assert pool.active == 0
+
+
+def test_waiter_is_admitted_when_slot_frees():
+    """Test a queued caller runs once the holder releases its slot."""
+    pool = AdmissionPool("test", max_concurrent=1, max_queue=1, max_wait=5)
+    holding = threading.Event()
+    release = threading.Event()
+    admitted = []
+
+    def holder():
+        with pool.admit():
+            holding.set()
+            release.wait()
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    holding.wait()
+
+    def waiter():
+        with pool.admit():
+            admitted.append(True)
+
+    second = threading.Thread(target=waiter)
+    second.start()
+    while pool.waiting == 0:
+        time.sleep(0.001)
+    release.set()
+    thread.join()
+    second.join()
+    assert admitted == [True]
+    assert pool.active == 0 and pool.waiting == 0
+
+
+def test_wait_timeout_rejects():
+    """Test a queued caller is rejected when its wait exceeds max_wait."""
+    pool = AdmissionPool("test", max_concurrent=1, max_queue=4, max_wait=0.01)
+    with pool.admit():
+        with pytest.raises(AdmissionRejected):
+            with pool.admit():
+                pass
+    assert pool.waiting == 0
+
+
+def test_weight_is_capped_at_pool_size():
+    """Test a batch asking for more slots than exist still runs."""
+    pool = AdmissionPool("test", max_concurrent=2, max_queue=0, max_wait=1)
+    with pool.admit(weight=10):
+        assert pool.active == 2
+    assert pool.active == 0
@@ -35,3 +35,211 @@ def test_clear_documents(client):
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "success"
+
+
+def test_metrics_endpoint(client):
+    """Test the Prometheus metrics endpoint."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "chatwithdoc_stage_duration_seconds" in response.text
+
+
+def test_metrics_are_summed_across_workers_in_multiprocess_mode(tmp_path):
+    """Test /metrics reports every worker's values when PROMETHEUS_MULTIPROC_DIR is set."""
+    import os
+    import subprocess
+    import sys
+
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    worker = (
+        "from src.chat_with_doc.core import metrics\n"
+        "metrics.record_error('txt', 'query')\n"
+        "metrics.set_admission_state('chat', 2, 0)\n"
+    )
+    subprocess.run([sys.executable, "-c", worker], env=env, check=True)
+    subprocess.run([sys.executable, "-c", worker + "metrics.mark_worker_dead()\n"], env=env, check=True)
+    scrape = subprocess.run(
+        [sys.executable, "-c", "from src.chat_with_doc.core import metrics\n"
+         "print(metrics.render_latest()[0].decode())"],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+
+    assert 'chatwithdoc_errors_total{handler="txt",stage="query"} 2.0' in scrape
+    # The worker that shut down no longer counts towards live gauges
+    assert 'chatwithdoc_admission_in_use{pool="chat"} 2.0' in scrape
+
+
+def test_chat_returns_429_when_saturated(client, monkeypatch):
+    """Test an admission rejection becomes a 429 with Retry-After."""
+    from src.chat_with_doc.api import routes
+    from src.chat_with_doc.core.admission import AdmissionRejected
+
+    def reject(*args, **kwargs):
+        raise AdmissionRejected("chat", 3)
+
+    monkeypatch.setattr(routes.doc_engine, "query_documents", reject)
+    response = client.post("/api/chat", json={"message": "hello"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
+
+
+def test_large_responses_are_compressed(client):
+    """Test bodies above the threshold are compressed and small ones are not."""
+    response = client.get("/metrics", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "chatwithdoc_stage_duration_seconds" in response.text
+
+    response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"status": "healthy"}
+
+
+def test_brotli_is_used_when_accepted(client):
+    """Test clients accepting br get Brotli and the rest fall back to gzip."""
+    brotli = pytest.importorskip("brotli")
+
+    with client.stream("GET", "/metrics", headers={"Accept-Encoding": "gzip, br"}) as response:
+        assert response.headers["content-encoding"] == "br"
+        body = brotli.decompress(b"".join(response.iter_raw()))
+    assert b"chatwithdoc_stage_duration_seconds" in body
+
+    response = client.get("/metrics", headers={"Accept-Encoding": "gzip, br;q=0"})
+    assert response.headers["content-encoding"] == "gzip"
+
+
+def test_streamed_responses_are_brotli_compressed_chunk_by_chunk():
+    """Test a streamed body is compressed into one valid Brotli stream."""
+    brotli = pytest.importorskip("brotli")
+    from starlette.applications import Starlette
+    from starlette.responses import StreamingResponse
+    from starlette.routing import Route
+
+    from src.chat_with_doc.api.responses import CompressionMiddleware
+
+    parts = [f"part {i} ".encode() * 200 for i in range(5)]
+
+    async def stream(request):
+        async def chunks():
+            for part in parts:
+                yield part
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app = CompressionMiddleware(Starlette(routes=[Route("/", stream)]), minimum_size=10)
+    with TestClient(app).stream("GET", "/", headers={"Accept-Encoding": "br"}) as response:
+        assert response.headers["content-encoding"] == "br"
+        assert brotli.decompress(b"".join(response.iter_raw())) == b"".join(parts)
+
+
+def test_fast_json_response_renders_numpy_and_int_keys():
+    """Test the orjson response handles values the stdlib encoder rejects."""
+    import numpy as np
+
+    from src.chat_with_doc.api.responses import FastJSONResponse
+
+    response = FastJSONResponse({1: np.array([0.5, 1.5]), "n": np.float32(2.0)})
+    assert response.body == b'{"1":[0.5,1.5],"n":2.0}'
+
+
+def test_frontend_assets_are_content_hashed_and_cached(client):
+    """Test pages link hashed assets, which are immutable, and everything revalidates by ETag."""
+    import re
+
+    page = client.get("/")
+    assert page.headers["cache-control"] == "no-cache"
+    asset = re.search(r'href="(css/styles\.css\?v=[0-9a-f]+)"', page.text).group(1)
+    assert client.get("/", headers={"If-None-Match": page.headers["etag"]}).status_code == 304
+
+    versioned = client.get(f"/{asset}")
+    assert versioned.status_code == 200
+    assert versioned.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+    for url in ("/css/styles.css", "/css/styles.css?v=stale"):
+        response = client.get(url)
+        assert response.headers["cache-control"] == "no-cache"
+        revalidated = client.get(url, headers={"If-None-Match": response.headers["etag"]})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["cache-control"] == "no-cache"
+
+
+def test_chat_profile_covers_engine_work(client, monkeypatch, tmp_path):
+    """Test cProfile dumps and stage timings include work done in the worker thread."""
+    import pstats
+
+    from src.chat_with_doc.api import routes
+    from src.chat_with_doc.core.config import settings
+    from src.chat_with_doc.core.metrics import track_stage
+
+    def engine_work_for_profile(query, **kwargs):
+        with track_stage("retrieve", "txt"):
+            pass
+        return {"status": "success", "answer": "ok"}
+
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(routes.doc_engine, "query_documents", engine_work_for_profile)
+    response = client.post("/api/chat", json={"message": "hi"}, headers={"X-Profile": "cprofile"})
+
+    timings = response.json()["timings"]
+    assert "retrieve" in timings["by_stage_ms"]
+    functions = {name for _, _, name in pstats.Stats(timings["profile_path"]).stats}
+    assert "engine_work_for_profile" in functions
+
+
+def test_chat_with_own_deadline_is_not_coalesced(client, monkeypatch):
+    """Test requests with their own deadline never share a call with others."""
+    from src.chat_with_doc.api import routes
+
+    async def shared(key, call):
+        raise AssertionError("coalesced")
+
+    monkeypatch.setattr(routes.chat_flight, "run", shared)
+    monkeypatch.setattr(
+        routes.doc_engine, "query_documents", lambda query, **kwargs: {"status": "success", "answer": "ok"}
+    )
+    response = client.post("/api/chat", json={"message": "hi"}, headers={"X-Request-Timeout": "5"})
+    assert response.status_code == 200 and response.json()["response"] == "ok"
+
+
+def test_process_documents_runs_off_the_event_loop(client, monkeypatch):
+    """Test ingestion, and its admission waits, run in a worker thread."""
+    import asyncio
+
+    from src.chat_with_doc.api import routes
+
+    def process_document(file_location, content_type):
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return {"status": "success"}
+
+    monkeypatch.setattr(routes.doc_engine, "process_document", process_document)
+    routes.doc_engine.state.add_upload(
+        {"filename": "a.txt", "file_location": "/tmp/a.txt", "content_type": "text/plain"}
+    )
+    response = client.post("/api/process-documents")
+    assert response.status_code == 200
+    assert response.json()["processed_count"] == 1
+
+
+def test_chat_coalescing_key_is_built_off_the_event_loop(client, monkeypatch):
+    """Test the coalescing key, which reads the corpus version, runs in a worker thread."""
+    import asyncio
+
+    from src.chat_with_doc.api import routes
+
+    coalescing_key = routes.doc_engine.coalescing_key
+    threads = []
+
+    def spy(*args):
+        try:
+            asyncio.get_running_loop()
+            threads.append("loop")
+        except RuntimeError:
+            threads.append("worker")
+        return coalescing_key(*args)
+
+    monkeypatch.setattr(routes.doc_engine, "coalescing_key", spy)
+    monkeypatch.setattr(
+        routes.doc_engine, "query_documents", lambda *a, **kw: {"status": "success", "answer": "ok"}
+    )
+    response = client.post("/api/chat", json={"message": "hello"})
+    assert response.status_code == 200
+    assert threads == ["worker"]
@@ -0,0 +1,86 @@
+"""Request coalescing tests."""
+
+import asyncio
+
+import pytest
+
+from src.chat_with_doc.core.coalesce import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    """Test identical concurrent calls run the work once."""
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flight.run("q", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["answer"] * 5
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_failure_is_delivered_to_every_waiter_and_released():
+    """Test a failed shared call raises in all waiters and is not reused."""
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def ok():
+        return "recovered"
+
+    async def main():
+        results = await asyncio.gather(
+            *(flight.run("q", fail) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        return await flight.run("q", ok)
+
+    assert asyncio.run(main()) == "recovered"
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    """Test cancelling one waiter leaves the others with the result."""
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        first = asyncio.ensure_future(flight.run("q", work))
+        second = asyncio.ensure_future(flight.run("q", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "answer"
+
+
+def test_last_waiter_cancelling_stops_the_call():
+    """Test the shared call is cancelled once nobody is waiting."""
+    flight = SingleFlight("test")
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+
+    async def main():
+        waiter = asyncio.ensure_future(flight.run("q", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert finished == []
+    assert flight.in_flight() == 0
@@ -0,0 +1,89 @@
+"""Context packing tests."""
+
+from langchain_core.documents import Document
+
+from src.chat_with_doc.handlers.context import (
+    build_context,
+    drop_near_duplicates,
+    estimate_tokens,
+    merge_adjacent,
+    pack_to_budget,
+)
+
+TEXT = " ".join(f"word{i}" for i in range(400))
+
+
+def _chunk(start, end, **metadata):
+    metadata.setdefault("source", "a.txt")
+    return Document(page_content=TEXT[start:end], metadata={"start_index": start, **metadata})
+
+
+def test_merge_adjacent_by_offset():
+    """Test overlapping chunks from one source are merged without repeats."""
+    docs = [_chunk(500, 1500), _chunk(0, 700), _chunk(2000, 2500)]
+    merged = merge_adjacent(docs, max_overlap=200)
+    assert [doc.page_content for doc in merged] == [TEXT[0:1500], TEXT[2000:2500]]
+
+
+def test_merge_adjacent_by_text_overlap():
+    """Test chunks without offsets are merged on the repeated text."""
+    docs = [
+        Document(page_content=TEXT[0:700], metadata={"source": "a.txt"}),
+        Document(page_content=TEXT[500:1500], metadata={"source": "a.txt"}),
+        Document(page_content=TEXT[500:1500], metadata={"source": "b.txt"}),
+    ]
+    merged = merge_adjacent(docs, max_overlap=200)
+    assert merged[0].page_content == TEXT[0:1500]
+    assert len(merged) == 2
+
+
+def test_drop_near_duplicates():
+    """Test near-identical chunks are dropped in favour of the higher rank."""
+    first = Document(page_content=TEXT[0:1000])
+    second = Document(page_content=TEXT[0:990])
+    other = Document(page_content=TEXT[1500:2500])
+    assert drop_near_duplicates([first, second, other], 0.9) == [first, other]
+
+
+def test_pack_to_budget():
+    """Test packing stays within the token budget."""
+    docs = [_chunk(0, 800), _chunk(1000, 1800), _chunk(2000, 2800)]
+    packed = pack_to_budget(docs, token_budget=300)
+    assert sum(estimate_tokens(doc.page_content) for doc in packed) <= 300
+    assert packed[0].page_content == TEXT[0:800]
+
+
+def test_build_context():
+    """Test the full pipeline keeps rank order."""
+    docs = [_chunk(2000, 2500, source="b.txt"), _chunk(0, 700), _chunk(500, 1500)]
+    context = build_context(docs, token_budget=10_000, max_overlap=200)
+    assert [doc.page_content for doc in context] == [TEXT[2000:2500], TEXT[0:1500]]
+
+
+def test_merge_adjacent_across_stripped_whitespace():
+    """Test consecutive chunks separated only by stripped whitespace form one block."""
+    source = "First paragraph ends here.\n\nSecond paragraph follows. Third sentence."
+    second = source.index("Second")
+    third = source.index("Third")
+    docs = [
+        Document(page_content=source[second:third - 1], metadata={"source": "a.txt", "start_index": second}),
+        Document(page_content=source[third:], metadata={"source": "a.txt", "start_index": third}),
+        Document(page_content=source[:second - 2], metadata={"source": "a.txt", "start_index": 0}),
+    ]
+    merged = merge_adjacent(docs, max_overlap=10)
+    assert [doc.page_content for doc in merged] == [
+        "First paragraph ends here.\nSecond paragraph follows. Third sentence."
+    ]
+
+    # A real gap, e.g. a chunk that was not retrieved, still splits blocks
+    assert len(merge_adjacent([_chunk(0, 700), _chunk(800, 1500)], max_overlap=200)) == 2
+
+
+def test_merge_adjacent_sorts_chunks_without_offsets():
+    """Test a lower-ranked chunk that comes first in the source is still merged."""
+    docs = [
+        Document(page_content=TEXT[500:1500], metadata={"source": "a.txt"}),
+        Document(page_content=TEXT[0:700], metadata={"source": "a.txt"}),
+    ]
+    merged = merge_adjacent(docs, max_overlap=200)
+    assert [doc.page_content for doc in merged] == [TEXT[0:1500]]
@@ -0,0 +1,136 @@
+"""Conversation memory tests."""
+
+import os
+
+os.environ.setdefault("GOOGLE_API_KEY", "dummy")
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.chat_with_doc.handlers.context import estimate_tokens
+from src.chat_with_doc.handlers.conversation import (
+    Conversation,
+    clip_tokens,
+    fold_turns,
+    rewrite_question,
+)
+
+
+def test_clip_tokens_cuts_at_word_boundary():
+    """Test long text is clipped to the token limit on a word boundary."""
+    text = "word " * 100
+    clipped = clip_tokens(text, 10)
+    assert clipped.endswith(" ...")
+    assert estimate_tokens(clipped) <= 12
+    assert clip_tokens("short", 10) == "short"
+
+
+def test_rewrite_skips_llm_without_history():
+    """Test the first question of a session is used as is."""
+    llm = FakeListChatModel(responses=[])
+    assert rewrite_question(llm, Conversation(), "What is the refund policy?") == "What is the refund policy?"
+
+    conversation = Conversation()
+    conversation.add_turn("What is the refund policy?", "Refunds take 5 days.", 100)
+    llm = FakeListChatModel(responses=["How long do refunds to Canada take?"])
+    assert rewrite_question(llm, conversation, "And to Canada?") == "How long do refunds to Canada take?"
+
+
+def test_fold_turns_keeps_recent_turns_and_bounds_summary():
+    """Test older turns are folded into a bounded summary, recent ones kept verbatim."""
+    llm = FakeListChatModel(responses=["summary " * 200])
+    conversation = Conversation()
+    for i in range(3):
+        conversation.add_turn(f"question {i}", f"answer {i}", 100)
+
+    assert fold_turns(llm, conversation, recent_turns=3, summary_tokens=50) is False
+    conversation.add_turn("question 3", "answer 3", 100)
+    assert fold_turns(llm, conversation, recent_turns=3, summary_tokens=50) is True
+
+    assert [turn.question for turn in conversation.turns] == ["question 1", "question 2", "question 3"]
+    assert 0 < estimate_tokens(conversation.summary) <= 52
+    assert conversation.format().startswith("Summary of earlier conversation:")
+
+
+class DeferredExecutor:
+    """Holds submitted summaries until the test runs them."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args):
+        self.jobs.append((fn, args))
+
+    def run_all(self):
+        jobs, self.jobs = self.jobs, []
+        for fn, args in jobs:
+            fn(*args)
+
+
+def _refunds_engine():
+    from src.chat_with_doc.services.engine import DocumentEngine
+    from src.chat_with_doc.services.state import MemoryStateBackend
+
+    engine = DocumentEngine(MemoryStateBackend())
+    engine.web_handler.url = "https://example.com/refunds"
+    engine.web_handler.content = "Refunds take 5 days. Refunds to Canada take 10 days."
+    engine._register(
+        engine.web_handler,
+        {"file_path": engine.web_handler.url, "content_type": "text/html", "filename": "refunds"},
+        {"num_chunks": 1},
+    )
+    # Serves both the question rewrites and the summaries
+    engine.llm = FakeListChatModel(responses=["refunds to Canada"])
+    engine._summarizer = DeferredExecutor()
+    return engine
+
+
+def test_summary_runs_after_the_answer():
+    """Test folding old turns is left to the background, off the answer's path."""
+    from src.chat_with_doc.core.config import settings
+
+    engine = _refunds_engine()
+    recent = settings.CONVERSATION_RECENT_TURNS
+    for turn in range(recent + 1):
+        assert engine.query_documents(f"refunds question {turn}", session_id="s1")["status"] == "success"
+
+    # The answer is back with every turn stored; one summary job is queued
+    assert len(engine.load_conversation("s1").turns) == recent + 1
+    assert len(engine._summarizer.jobs) == 1
+
+    engine._summarizer.run_all()
+    conversation = engine.load_conversation("s1")
+    assert len(conversation.turns) == recent
+    assert conversation.summary == "refunds to Canada"
+
+
+def test_concurrent_turns_of_a_session_are_all_kept():
+    """Test turns remembered at the same time do not overwrite each other."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    engine = _refunds_engine()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: engine._remember("s1", f"question {i}", "answer"), range(4)))
+
+    questions = sorted(turn.question for turn in engine.load_conversation("s1").turns)
+    assert questions == [f"question {i}" for i in range(4)]
+
+
+def test_engine_history_stays_bounded_across_turns():
+    """Test a long session keeps a constant-size memory in the state backend."""
+    from src.chat_with_doc.core.config import settings
+
+    engine = _refunds_engine()
+
+    sizes = []
+    for turn in range(12):
+        result = engine.query_documents(f"refunds question {turn} " * 50, session_id="s1")
+        assert result["status"] == "success"
+        engine._summarizer.run_all()
+        conversation = engine.load_conversation("s1")
+        assert len(conversation.turns) <= settings.CONVERSATION_RECENT_TURNS
+        sizes.append(estimate_tokens(conversation.format()))
+
+    assert conversation.summary == "refunds to Canada"
+    steady = sizes[settings.CONVERSATION_RECENT_TURNS:]
+    assert max(steady) - min(steady) < 0.05 * max(steady)
+    assert engine.load_conversation("other").is_empty()
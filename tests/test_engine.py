@@ -4,6 +4,7 @@ import os
 
 
 import pytest
+from langchain_core.embeddings import Embeddings
 
 os.environ.setdefault("GOOGLE_API_KEY", "dummy")
 
@@ -46,3 +47,308 @@ def test_pdf_handler_imports_with_available_loader():
     from src.chat_with_doc.handlers.pdf import PDFHandler
 
     assert PDFHandler.__name__ == 'PDFHandler'
+
+
+def test_documents_are_shared_through_state_backend():
+    """Test a document registered by one engine is queryable from another."""
+    from src.chat_with_doc.services.state import MemoryStateBackend
+
+    state = MemoryStateBackend()
+    first, second = DocumentEngine(state), DocumentEngine(state)
+
+    first.web_handler.url = "https://example.com/python"
+    first.web_handler.content = "Python is a popular programming language. It was created by Guido."
+    first._register(
+        first.web_handler,
+        {"file_path": first.web_handler.url, "content_type": "text/html", "filename": "webpage_python"},
+        {"num_chunks": 1},
+    )
+
+    assert second.get_status()["filenames"] == ["webpage_python"]
+    result = second.query_documents("programming language")
+    assert result["status"] == "success"
+    assert "popular programming language" in result["answer"]
+
+
+def test_web_pages_are_answered_from_their_own_record():
+    """Test web queries read content from the record, not the shared handler."""
+    from src.chat_with_doc.services.state import MemoryStateBackend
+
+    engine = DocumentEngine(MemoryStateBackend())
+    for name, text in (("cats", "Cats sleep for most of the day."), ("dogs", "Dogs need a daily walk outside.")):
+        engine.state.add_document({
+            "file_path": f"https://example.com/{name}",
+            "content_type": "text/html",
+            "filename": name,
+            "handler_type": "web",
+            "content": text,
+        })
+
+    cats = engine.query_documents("how long do they sleep", documents=["cats"])
+    dogs = engine.query_documents("how long do they sleep", documents=["dogs"])
+    assert "Cats sleep" in cats["answer"] and "Dogs" not in cats["answer"]
+    assert "Dogs" in dogs["answer"] and "Cats" not in dogs["answer"]
+    assert engine.web_handler.content == ""
+
+
+def test_failed_query_returns_the_error_without_an_unscoped_retry(monkeypatch):
+    """Test a failure outside the per-document loop is reported, not retried unfiltered."""
+    from src.chat_with_doc.services.state import MemoryStateBackend
+
+    engine = DocumentEngine(MemoryStateBackend())
+    engine.state.add_document({
+        "file_path": "https://example.com/cats",
+        "content_type": "text/html",
+        "filename": "cats",
+        "handler_type": "web",
+        "content": "Cats sleep for most of the day.",
+    })
+    calls = []
+    query = engine.web_handler.query
+    monkeypatch.setattr(engine.web_handler, "query", lambda *a, **kw: calls.append(1) or query(*a, **kw))
+
+    def fail(*args):
+        raise RuntimeError("memory write failed")
+
+    monkeypatch.setattr(engine, "_remember", fail)
+    result = engine.query_documents("how long do they sleep", session_id="s1")
+    assert result == {"status": "error", "message": "memory write failed"}
+    assert len(calls) == 1
+
+
+def test_registry_is_decoded_once_per_corpus_version(tmp_path, monkeypatch):
+    """Test chats reuse the decoded registry until a document is added."""
+    from src.chat_with_doc.services.state import SQLiteStateBackend
+
+    state = SQLiteStateBackend(str(tmp_path / "state.db"))
+    engine = DocumentEngine(state)
+    reads = []
+    list_documents = state.list_documents
+    monkeypatch.setattr(state, "list_documents", lambda: reads.append(1) or list_documents())
+
+    state.add_document({"file_path": "/docs/a.txt", "filename": "a.txt", "centroid": [0.5] * 768})
+    for _ in range(3):
+        assert [d["filename"] for d in engine.processed_documents] == ["a.txt"]
+    assert len(reads) == 1
+
+    DocumentEngine(state).state.add_document({"file_path": "/docs/b.txt", "filename": "b.txt"})
+    assert len(engine.processed_documents) == 2 and len(reads) == 2
+
+
+class _FakeVectorStore:
+    """Vector store returning one chunk, or none for empty query vectors."""
+
+    def __init__(self):
+        self.calls = 0
+        self.filters = []
+
+    def similarity_search_by_vector_with_score(self, vector, k=4, filter=None):
+        from langchain_core.documents import Document
+
+        self.calls += 1
+        self.filters.append(filter)
+        if not any(vector):
+            return []
+        return [(Document(page_content="Refunds take 5 days.", metadata={"source": "a.txt"}), 0.9)]
+
+
+class _FakeEmbeddings(Embeddings):
+    """One-dimensional embeddings: ``[0.0]`` for texts in ``empty``, ``[1.0]`` otherwise."""
+
+    def __init__(self, empty=(), on_call=None):
+        self.calls = 0
+        self.empty = set(empty)
+        self.on_call = on_call
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.on_call is not None:
+            self.on_call()
+        return [[0.0] if text in self.empty else [1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_query_batch_embeds_once_and_batches_generation():
+    """Test batch queries share one embedding call and one LLM batch."""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    from src.chat_with_doc.handlers.base import InstrumentedEmbeddings
+    from src.chat_with_doc.handlers.txt import TXTHandler
+
+    embeddings = _FakeEmbeddings(empty={"unrelated"})
+    handler = TXTHandler()
+    handler.embedding_model = InstrumentedEmbeddings(embeddings, "txt")
+    handler.llm = FakeListChatModel(responses=["Five days."])
+    handler.vector_store = _FakeVectorStore()
+
+    result = handler.query_batch(["How long do refunds take?", "unrelated", "Refund time?"])
+
+    assert result["status"] == "success"
+    assert embeddings.calls == 1
+    assert handler.vector_store.calls == 3
+    assert [r["status"] for r in result["results"]] == ["success", "empty", "success"]
+    assert result["results"][0]["answer"] == "Five days."
+    assert set(result["timings"]) == {"embed_ms", "retrieve_ms", "generate_ms"}
+
+
+def test_batch_work_holds_batch_slots_not_chat_slots(monkeypatch):
+    """Test a batch's embedding, searches and LLM calls are admitted by the batch pool."""
+    from langchain_core.messages import AIMessage
+
+    from src.chat_with_doc.core import admission
+    from src.chat_with_doc.handlers.txt import TXTHandler
+
+    def chat_active():
+        return admission.governor.pools["chat"].active
+
+    class RecordingVectorStore(_FakeVectorStore):
+        def similarity_search_by_vector_with_score(self, vector, k=4, filter=None):
+            chat_seen.append(chat_active())
+            return super().similarity_search_by_vector_with_score(vector, k, filter)
+
+    class RecordingLLM:
+        seen = []
+
+        def invoke(self, messages):
+            pools = admission.governor.pools
+            RecordingLLM.seen.append((pools["chat"].active, pools["batch"].active))
+            return AIMessage(content="ok")
+
+    monkeypatch.setattr(admission.governor, "pools", {
+        "chat": admission.AdmissionPool("chat", 4, 0, 1),
+        "batch": admission.AdmissionPool("batch", 2, 0, 1),
+    })
+    handler = TXTHandler()
+    handler.embedding_model.embeddings = _FakeEmbeddings(
+        on_call=lambda: chat_seen.append(chat_active())
+    )
+    handler.llm = RecordingLLM()
+    handler.vector_store = RecordingVectorStore()
+    chat_seen = []
+
+    result = handler.query_batch(["a", "b", "c"], max_concurrency=16)
+
+    assert [r["answer"] for r in result["results"]] == ["ok"] * 3
+    assert RecordingLLM.seen == [(0, 2)] * 3
+    assert chat_seen == [0] * 4
+
+
+def test_engine_query_batch_embeds_once_for_all_documents():
+    """Test a batch over several documents embeds its questions in one call."""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    from src.chat_with_doc.services.state import MemoryStateBackend
+
+    engine = DocumentEngine(MemoryStateBackend())
+    engine.query_embeddings.embeddings = engine_embeddings = _FakeEmbeddings()
+    engine.txt_handler.embedding_model.embeddings = handler_embeddings = _FakeEmbeddings()
+    engine.txt_handler.llm = FakeListChatModel(responses=["Five days."])
+    engine.txt_handler.vector_store = _FakeVectorStore()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        engine.state.add_document({"file_path": f"/docs/{name}", "filename": name, "handler_type": "txt"})
+
+    result = engine.query_batch(["How long do refunds take?", "Refund time?"])
+
+    assert result["status"] == "success"
+    assert (engine_embeddings.calls, handler_embeddings.calls) == (1, 0)
+    assert engine.txt_handler.vector_store.calls == 6
+    assert "embed_ms" in result["timings"] and "embed_ms" not in result["timings"]["a.txt"]
+    assert result["results"][0]["answer"].count("Five days.") == 3
+    # Each document only searches its own chunks in the shared namespace
+    sources = sorted(f["source"]["$in"][0] for f in engine.txt_handler.vector_store.filters)
+    assert sources == ["/docs/a.txt"] * 2 + ["/docs/b.txt"] * 2 + ["/docs/c.txt"] * 2
+
+
+def test_type_filter_is_pushed_into_the_vector_search():
+    """Test a type-filtered query only retrieves the selected documents' chunks."""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    from src.chat_with_doc.services.state import MemoryStateBackend
+
+    engine = DocumentEngine(MemoryStateBackend())
+    for handler in (engine.txt_handler, engine.pdf_handler):
+        handler.embedding_model.embeddings = _FakeEmbeddings()
+        handler.llm = FakeListChatModel(responses=["Five days."])
+        handler.vector_store = _FakeVectorStore()
+    engine.state.add_document({"file_path": "/docs/a.txt", "filename": "a.txt", "handler_type": "txt"})
+    engine.state.add_document({"file_path": "/docs/b.pdf", "filename": "b.pdf", "handler_type": "pdf"})
+
+    assert engine.query_documents("refunds?", document_types=["txt"])["status"] == "success"
+    assert engine.txt_handler.vector_store.filters == [{"source": {"$in": ["/docs/a.txt"]}}]
+    assert engine.pdf_handler.vector_store.calls == 0
+
+
+def test_query_is_routed_to_closest_documents(monkeypatch):
+    """Test large corpora are narrowed to the documents nearest the query."""
+    from src.chat_with_doc.core.config import settings
+    from src.chat_with_doc.services.state import MemoryStateBackend
+
+    class AxisEmbeddings(Embeddings):
+        def embed_documents(self, texts):
+            return [self.embed_query(text) for text in texts]
+
+        def embed_query(self, text):
+            return [1.0, 0.0] if "alpha" in text else [0.0, 1.0]
+
+    monkeypatch.setattr(settings, "ROUTING_TOP_M", 1)
+    monkeypatch.setattr(settings, "ROUTING_MIN_DOCUMENTS", 1)
+    engine = DocumentEngine(MemoryStateBackend())
+    engine.query_embeddings.embeddings = AxisEmbeddings()
+    docs = [
+        {"file_path": "/docs/a.txt", "filename": "a.txt", "handler_type": "txt", "centroid": [1.0, 0.0]},
+        {"file_path": "/docs/b.txt", "filename": "b.txt", "handler_type": "txt", "centroid": [0.0, 1.0]},
+    ]
+
+    assert engine._route("what is alpha?", docs, docs) == [docs[0]]
+    assert engine._route("and beta?", docs, docs) == [docs[1]]
+    single = docs[:1]
+    assert engine._route("and beta?", docs, single) is single
+    monkeypatch.setattr(settings, "ROUTING_TOP_M", 0)
+    assert engine._route("what is alpha?", docs, docs) is docs
+
+
+def test_upsert_time_excludes_only_its_own_embedding(monkeypatch):
+    """Test concurrent ingests each time their upsert without the other's embedding."""
+    import threading
+    import time
+
+    from langchain_core.documents import Document
+
+    from src.chat_with_doc.handlers import base
+    from src.chat_with_doc.handlers.txt import TXTHandler
+
+    class SlowEmbeddings:
+        def embed_documents(self, texts):
+            time.sleep(0.2)
+            return [[1.0, 0.0] for _ in texts]
+
+    class EmbeddingStore:
+        def __init__(self, embedding):
+            self.embedding = embedding
+
+        def add_documents(self, documents, ids=None, batch_size=None):
+            self.embedding.embed_documents([doc.page_content for doc in documents])
+            time.sleep(0.05)
+
+    upserts = []
+    monkeypatch.setattr(
+        base, "observe_stage",
+        lambda stage, handler, seconds: upserts.append(seconds) if stage == "upsert" else None,
+    )
+    handler = TXTHandler()
+    handler.embedding_model.embeddings = SlowEmbeddings()
+    store = EmbeddingStore(handler.embedding_model)
+
+    threads = [
+        threading.Thread(target=handler._add_to_vector_store, args=(store, [Document(page_content=str(i))]))
+        for i in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(upserts) == 2
+    assert all(0.03 < seconds < 0.15 for seconds in upserts)
@@ -0,0 +1,110 @@
+"""Bulk ingestion tests."""
+
+import json
+import os
+
+os.environ.setdefault("GOOGLE_API_KEY", "dummy")
+
+from langchain_core.embeddings import Embeddings
+
+from src.chat_with_doc.core import local_index
+from src.chat_with_doc.core.config import settings
+from src.chat_with_doc.services.engine import DocumentEngine
+from src.chat_with_doc.services.ingest import BulkIngester, IngestManifest, discover_files
+from src.chat_with_doc.services.state import MemoryStateBackend
+
+
+class LengthEmbeddings(Embeddings):
+    """Tiny deterministic embeddings."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0, float(text.count("e")), 0.5]
+
+
+def _ingester(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(local_index, "_local_index", local_index.LocalVectorIndex(4))
+    engine = DocumentEngine(MemoryStateBackend())
+    engine.txt_handler.embedding_model.embeddings = LengthEmbeddings()
+    manifest = IngestManifest(str(tmp_path / "state" / "manifest.jsonl"))
+    return BulkIngester(engine, manifest, parse_workers=2, index_concurrency=2)
+
+
+def test_discover_files_routes_supported_extensions(tmp_path):
+    """Test only supported, non-hidden files are found, in a stable order."""
+    (tmp_path / "b").mkdir()
+    (tmp_path / ".git").mkdir()
+    for name in ("b/two.TXT", "one.pdf", "notes.md", ".hidden.txt", ".git/x.txt"):
+        (tmp_path / name).write_text("x")
+
+    found = [os.path.relpath(p, tmp_path) for p in discover_files(str(tmp_path))]
+    assert found == ["one.pdf", os.path.join("b", "two.TXT")]
+
+
+def test_bulk_ingest_resumes_from_manifest(tmp_path, monkeypatch):
+    """Test completed files are skipped on the next run and changed ones re-ingested."""
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for i in range(5):
+        (corpus / f"doc{i}.txt").write_text(f"Document {i}. " + "Some text here. " * 400)
+    (corpus / "broken.pdf").write_bytes(b"not a pdf")
+
+    ingester = _ingester(tmp_path, monkeypatch)
+    stats = ingester.run(str(corpus))
+
+    assert (stats.discovered, stats.ingested, stats.failed) == (6, 5, 1)
+    assert stats.chunks == len(local_index.get_local_index()) > 5
+    assert "files/s" in stats.summary()
+    documents = ingester.engine.processed_documents
+    assert len(documents) == 5 and all(doc.get("centroid") for doc in documents)
+
+    entries = [json.loads(line) for line in open(ingester.manifest.path)]
+    done = [e for e in entries if e["status"] == "done"]
+    assert len(done) == 5 and all(e["sha256"] and e["num_chunks"] for e in done)
+
+    # A new run over the same manifest only retries failures and changed files
+    (corpus / "doc0.txt").write_text("Changed document.")
+    rerun = BulkIngester(
+        ingester.engine, IngestManifest(ingester.manifest.path), parse_workers=1, index_concurrency=1
+    ).run(str(corpus))
+    assert (rerun.ingested, rerun.unchanged, rerun.failed) == (1, 4, 1)
+
+    # The changed file replaces its registry record and its old chunks
+    assert len(ingester.engine.processed_documents) == 5
+    index = local_index.get_local_index()
+    changed = str(corpus / "doc0.txt")
+    assert [index.document(row).page_content for row in range(len(index))
+            if index.document(row).metadata["source"] == changed] == ["Changed document."]
+
+
+def test_large_text_files_are_streamed(tmp_path, monkeypatch):
+    """Test text files over the streaming threshold are split from disk while indexing."""
+    from src.chat_with_doc.services import ingest
+
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "big.txt").write_text("Line of a large text file. " * 2000)
+    monkeypatch.setattr(settings, "TXT_STREAMING_THRESHOLD", 1024)
+    monkeypatch.setattr(settings, "TXT_STREAM_WINDOW_BYTES", 4096)
+
+    ingester = _ingester(tmp_path, monkeypatch)
+    parsed = ingest.parse_file(str(corpus / "big.txt"), "text/plain", ingester.splitter)
+    assert parsed["streamed"] and "chunks" not in parsed
+
+    stats = ingester.run(str(corpus))
+    assert (stats.ingested, stats.failed) == (1, 0)
+    assert stats.chunks == len(local_index.get_local_index()) > 10
+
+
+def test_cli_refuses_backends_that_lose_the_ingest(tmp_path, monkeypatch, capsys):
+    """Test the ingest command will not run against in-process backends by default."""
+    from src.chat_with_doc import cli
+
+    monkeypatch.setattr(settings, "STATE_BACKEND", "memory")
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "pinecone")
+    assert cli.ingest([str(tmp_path), "--manifest", str(tmp_path / "m.jsonl")]) == 2
+    assert "STATE_BACKEND=memory" in capsys.readouterr().err
+    assert not (tmp_path / "m.jsonl").exists()
@@ -0,0 +1,137 @@
+"""Local quantized vector index tests."""
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from src.chat_with_doc.core.local_index import LocalVectorIndex, LocalVectorStore
+
+DIM = 64
+
+
+def make_corpus(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((rows, DIM)).astype(np.float32)
+
+
+def build(vectors, **kwargs):
+    index = LocalVectorIndex(DIM, **kwargs)
+    ids = [f"id{i}" for i in range(len(vectors))]
+    metadatas = [{"source": f"doc{i % 4}.txt"} for i in range(len(vectors))]
+    index.add(ids, vectors, [f"chunk {i}" for i in range(len(vectors))], metadatas)
+    return index
+
+
+def exact_top(vectors, query, k):
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return list(np.argsort(-(normed @ (query / np.linalg.norm(query))))[:k])
+
+
+@pytest.mark.parametrize("quantization", ["float32", "float16", "int8"])
+def test_quantized_search_recall(quantization):
+    """Test quantized scoring finds nearly all exact nearest neighbours."""
+    vectors = make_corpus()
+    index = build(vectors, quantization=quantization)
+    queries = make_corpus(50, seed=1)
+    hits = 0
+    for query in queries:
+        found = {row for row, _ in index.search(query, 10)}
+        hits += len(found & set(exact_top(vectors, query, 10)))
+    assert hits / (10 * len(queries)) >= 0.9
+
+
+def test_rescoring_returns_exact_order_and_scores():
+    """Test float32 rescoring restores the exact ranking."""
+    vectors = make_corpus()
+    index = build(vectors, quantization="int8", rescore=True, rescore_factor=8)
+    query = make_corpus(1, seed=2)[0]
+    results = index.search(query, 5)
+    assert [row for row, _ in results] == exact_top(vectors, query, 5)
+    best = vectors[results[0][0]]
+    cosine = best @ query / (np.linalg.norm(best) * np.linalg.norm(query))
+    assert results[0][1] == pytest.approx(float(cosine), rel=1e-5)
+
+
+def test_rescore_vectors_can_be_memory_mapped(tmp_path):
+    """Test rescoring vectors live in a file under the rescore directory."""
+    index = build(make_corpus(3000), rescore=True, rescore_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+    assert index.memory_usage()["rescore"] == 3000 * DIM * 4
+
+
+def test_int8_storage_is_a_quarter_of_float32():
+    """Test int8 codes take one byte per dimension plus a scale."""
+    vectors = make_corpus(1000)
+    usage = build(vectors, quantization="int8").memory_usage()
+    assert usage["codes"] == 1000 * DIM
+    assert usage["scales"] == 1000 * 4
+    assert build(vectors, quantization="float16").memory_usage()["codes"] == 1000 * DIM * 2
+
+
+def test_source_filter_and_overwrite():
+    """Test source filters restrict results and re-adding an ID overwrites it."""
+    vectors = make_corpus(200)
+    index = build(vectors)
+    results = index.search(vectors[1], 5, filter={"source": {"$in": ["doc1.txt"]}})
+    assert results[0][0] == 1
+    assert all(index.document(row).metadata["source"] == "doc1.txt" for row, _ in results)
+
+    index.add(["id1"], [vectors[2]], ["replaced"], [{"source": "doc1.txt"}])
+    assert len(index) == 200
+    assert index.document(1).page_content == "replaced"
+
+
+def test_delete_compacts_rows():
+    """Test deleted IDs disappear from search and the remaining rows stay consistent."""
+    vectors = make_corpus(200)
+    index = build(vectors, rescore=True)
+    assert index.delete(["id1", "id5", "missing"]) == 2
+    assert len(index) == 198
+    assert "id1" not in index.ids("id1")
+    assert index.search(vectors[1], 1)[0][1] < 0.99
+    row, score = index.search(vectors[7], 1)[0]
+    assert index.document(row).id == "id7" and score == pytest.approx(1.0, abs=1e-5)
+    assert index.search(vectors[7], 1, filter={"source": {"$in": ["doc3.txt"]}})[0][0] == row
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic embeddings for store-level tests."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+        return rng.standard_normal(DIM).tolist()
+
+
+def test_vector_store_round_trip():
+    """Test the LangChain adapter supports the calls the handlers make."""
+    store = LocalVectorStore(LocalVectorIndex(DIM), HashEmbeddings())
+    texts = [f"passage {i}" for i in range(20)]
+    store.add_texts(texts, [{"source": "a.txt"} for _ in texts], ids=texts)
+
+    vector = HashEmbeddings().embed_query("passage 3")
+    doc, score = store.similarity_search_by_vector_with_score(vector, k=1)[0]
+    assert doc.page_content == "passage 3"
+    assert score == pytest.approx(1.0, abs=0.01)
+    mmr = store.max_marginal_relevance_search_by_vector(vector, k=3, fetch_k=10)
+    assert mmr[0].page_content == "passage 3"
+    assert len(mmr) == 3
+
+
+def test_coarse_prefix_search_matches_full_search():
+    """Test the truncated-prefix pass keeps the full-dimension top results."""
+    rng = np.random.default_rng(3)
+    # Matryoshka-like vectors: leading dimensions carry most of the variance
+    decay = np.linspace(3.0, 0.2, DIM).astype(np.float32)
+    vectors = rng.standard_normal((2000, DIM)).astype(np.float32) * decay
+    full = build(vectors, quantization="float32")
+    coarse = build(vectors, quantization="float32", coarse_dim=16, coarse_factor=20)
+    assert coarse.memory_usage()["coarse"] == 2000 * 16 * 4
+
+    query = rng.standard_normal(DIM).astype(np.float32) * decay
+    expected = full.search(query, 5)
+    assert coarse.search(query, 5) == pytest.approx(expected)
+    filtered = coarse.search(query, 5, filter={"source": "doc2.txt"})
+    assert all(row % 4 == 2 for row, _ in filtered)
@@ -0,0 +1,70 @@
+"""Request profiling tests."""
+
+import os
+
+from src.chat_with_doc.core.profiling import (
+    current_profile,
+    profile_request,
+    resolve_mode,
+)
+
+
+def test_resolve_mode():
+    """Test header values map to profiling modes."""
+    assert resolve_mode(None, 0.0) is None
+    assert resolve_mode("1", 0.0) == "timings"
+    assert resolve_mode("cProfile", 0.0) == "cprofile"
+    assert resolve_mode("bogus", 0.0) is None
+    assert resolve_mode(None, 1.0) == "timings"
+
+
+def test_profile_request_disabled_leaves_no_state(tmp_path):
+    """Test nothing is collected when profiling is off."""
+    with profile_request(None, str(tmp_path)) as profile:
+        assert profile is None
+        assert current_profile() is None
+
+
+def test_profile_request_collects_stages(tmp_path):
+    """Test stage timings and cProfile dumps are captured."""
+    with profile_request("cprofile", str(tmp_path)) as profile:
+        current_profile().add("retrieve", "pdf", 0.01)
+        current_profile().add("retrieve", "pdf", 0.02)
+    assert current_profile() is None
+
+    breakdown = profile.breakdown()
+    assert breakdown["by_stage_ms"]["retrieve"] == 30.0
+    assert len(breakdown["stages"]) == 2
+    assert os.path.exists(breakdown["profile_path"])
+
+
+def test_overlapping_cprofile_requests_fall_back_to_timings(tmp_path, monkeypatch):
+    """Test only one request is cProfiled at a time and a failed start is not fatal."""
+    import threading
+
+    from src.chat_with_doc.core import profiling
+
+    overlapping = {}
+
+    def second_request():
+        with profile_request("cprofile", str(tmp_path)) as profile:
+            profile.add("generate", "txt", 0.01)
+        overlapping["breakdown"] = profile.breakdown()
+
+    with profile_request("cprofile", str(tmp_path)) as first:
+        thread = threading.Thread(target=second_request)
+        thread.start()
+        thread.join()
+    assert "profile_path" in first.breakdown()
+    assert "profile_path" not in overlapping["breakdown"]
+    assert overlapping["breakdown"]["by_stage_ms"] == {"generate": 10.0}
+
+    class ActiveToolProfile:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling.cProfile, "Profile", ActiveToolProfile)
+    with profile_request("cprofile", str(tmp_path)) as profile:
+        pass
+    assert "profile_path" not in profile.breakdown()
+    assert not profiling._cprofile_lock.locked()
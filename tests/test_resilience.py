@@ -0,0 +1,139 @@
+"""Provider call resilience tests, using a fake provider with injected latency."""
+
+import threading
+import time
+
+import pytest
+
+from src.chat_with_doc.core.admission import AdmissionPool
+from src.chat_with_doc.core.resilience import (
+    CallPolicy,
+    DeadlineExceeded,
+    ProviderTimeout,
+    call_with_policy,
+    is_transient,
+    request_deadline,
+)
+
+
+class FakeProvider:
+    """Provider whose calls sleep for scripted latencies and may fail."""
+
+    def __init__(self, latencies, failures=0, error=None):
+        self.latencies = list(latencies)
+        self.failures = failures
+        self.error = error or ConnectionError("transient failure")
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, value):
+        with self._lock:
+            call = self.calls
+            self.calls += 1
+        time.sleep(self.latencies[min(call, len(self.latencies) - 1)])
+        if call < self.failures:
+            raise self.error
+        return f"{value}:{call}"
+
+
+def test_transient_failures_are_retried():
+    """Test idempotent calls are retried after a backoff until they succeed."""
+    provider = FakeProvider([0.0], failures=2)
+    policy = CallPolicy(timeout=1, retries=2, backoff_base=0.001)
+    assert call_with_policy("test_retry", policy, provider, "q") == "q:2"
+    assert provider.calls == 3
+
+
+def test_non_idempotent_calls_are_not_retried():
+    """Test a failing non-idempotent call raises on the first failure."""
+    provider = FakeProvider([0.0], failures=1)
+    policy = CallPolicy(timeout=1, retries=3, backoff_base=0.001, idempotent=False)
+    with pytest.raises(ConnectionError):
+        call_with_policy("test_no_retry", policy, provider, "q")
+    assert provider.calls == 1
+
+
+class StatusError(Exception):
+    """Provider SDK error carrying an HTTP status."""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_only_transient_errors_are_retried():
+    """Test rate limits and server errors are retried but other errors are not."""
+    policy = CallPolicy(timeout=1, retries=2, backoff_base=0.001)
+
+    provider = FakeProvider([0.0], failures=1, error=StatusError(429))
+    assert call_with_policy("test_transient", policy, provider, "q") == "q:1"
+
+    for error in (StatusError(400), ValueError("bad request")):
+        provider = FakeProvider([0.0], failures=1, error=error)
+        with pytest.raises(type(error)):
+            call_with_policy("test_transient", policy, provider, "q")
+        assert provider.calls == 1
+
+    assert is_transient(StatusError(503))
+    assert is_transient(ProviderTimeout())
+    assert not is_transient(StatusError(401))
+
+
+def test_slow_call_times_out():
+    """Test an attempt slower than the timeout raises ProviderTimeout."""
+    provider = FakeProvider([0.5])
+    policy = CallPolicy(timeout=0.05)
+    start = time.monotonic()
+    with pytest.raises(ProviderTimeout):
+        call_with_policy("test_timeout", policy, provider, "q")
+    assert time.monotonic() - start < 0.4
+
+
+def test_slow_call_is_hedged():
+    """Test a call slower than the latency percentile is raced by a duplicate."""
+    provider = FakeProvider([0.001] * 5 + [1.0, 0.001])
+    policy = CallPolicy(timeout=2, hedge_percentile=90, hedge_min_samples=5)
+    for i in range(5):
+        call_with_policy("test_hedge", policy, provider, "warm")
+
+    start = time.monotonic()
+    assert call_with_policy("test_hedge", policy, provider, "q") == "q:6"
+    assert time.monotonic() - start < 0.5
+
+
+def test_request_deadline_bounds_calls():
+    """Test calls inside an expired request deadline fail with DeadlineExceeded."""
+    provider = FakeProvider([0.5])
+    policy = CallPolicy(timeout=5, retries=3)
+    with request_deadline(0.05):
+        with pytest.raises(DeadlineExceeded):
+            call_with_policy("test_deadline", policy, provider, "q")
+        with pytest.raises(DeadlineExceeded):
+            call_with_policy("test_deadline", policy, provider, "q")
+
+
+def test_abandoned_call_holds_its_slot_until_it_finishes():
+    """Test a timed-out call still running keeps an admission slot."""
+    pool = AdmissionPool("test", max_concurrent=2, max_queue=0, max_wait=0)
+    provider = FakeProvider([0.3])
+    with pool.admit():
+        with pytest.raises(ProviderTimeout):
+            call_with_policy("test_abandon", CallPolicy(timeout=0.05), provider, "q")
+        assert pool.active == 2
+    assert pool.active == 1
+
+    time.sleep(0.5)
+    assert pool.active == 0
+
+
+def test_hedge_needs_a_free_slot():
+    """Test a slow call is not hedged when its admission pool is full."""
+    pool = AdmissionPool("test", max_concurrent=1, max_queue=0, max_wait=0)
+    provider = FakeProvider([0.001] * 5 + [0.2, 0.001])
+    policy = CallPolicy(timeout=2, hedge_percentile=90, hedge_min_samples=5)
+    for i in range(5):
+        call_with_policy("test_hedge_full", policy, provider, "warm")
+
+    with pool.admit():
+        assert call_with_policy("test_hedge_full", policy, provider, "q") == "q:5"
+    assert provider.calls == 6
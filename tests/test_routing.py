@@ -0,0 +1,59 @@
+"""Document routing tests."""
+
+import os
+
+import numpy as np
+
+os.environ.setdefault("GOOGLE_API_KEY", "dummy")
+
+from src.chat_with_doc.core.routing import DocumentRouter, collect_centroid, record_embeddings
+
+
+def _doc(name, centroid=None):
+    doc = {"file_path": f"/docs/{name}", "filename": name, "handler_type": "txt"}
+    if centroid is not None:
+        doc["centroid"] = centroid
+    return doc
+
+
+def test_collect_centroid_averages_normalized_embeddings():
+    """Test the centroid is the normalized mean of unit-length chunk vectors."""
+    record_embeddings([[1.0, 0.0]])  # outside any block: ignored
+    with collect_centroid() as centroid:
+        record_embeddings([[10.0, 0.0], [0.0, 1.0]])
+    with collect_centroid() as empty:
+        pass
+
+    assert centroid.count == 2
+    assert np.allclose(centroid.vector(), [2 ** -0.5, 2 ** -0.5])
+    assert empty.vector() is None
+
+
+def test_router_keeps_top_documents_and_unroutable_ones():
+    """Test routing keeps the closest documents plus those without a centroid."""
+    docs = [
+        _doc("north.txt", [0.0, 1.0]),
+        _doc("east.txt", [1.0, 0.0]),
+        _doc("north_east.txt", [0.7, 0.7]),
+        _doc("page", None),
+    ]
+    router = DocumentRouter()
+    router.refresh(docs, version=1)
+
+    routed = router.route([1.0, 0.1], docs, top_m=2)
+    assert [d["filename"] for d in routed] == ["east.txt", "north_east.txt", "page"]
+
+    # Candidates outside the selection are never returned
+    routed = router.route([1.0, 0.1], [docs[0], docs[2]], top_m=1)
+    assert [d["filename"] for d in routed] == ["north_east.txt"]
+
+
+def test_router_rebuilds_only_when_version_changes():
+    """Test the centroid matrix is reused for the same corpus version."""
+    router = DocumentRouter()
+    router.refresh([_doc("a.txt", [1.0, 0.0]), _doc("b.txt", [0.0, 1.0])], version=1)
+    router.refresh([], version=1)
+    assert len(router.route([1.0, 0.0], [_doc("a.txt"), _doc("b.txt")], top_m=1)) == 1
+
+    router.refresh([], version=2)
+    assert router.route([1.0, 0.0], [_doc("a.txt")], top_m=1) == [_doc("a.txt")]
@@ -0,0 +1,83 @@
+"""Text splitter tests."""
+
+import random
+
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.chat_with_doc.handlers.splitter import (
+    OffsetTextSplitter,
+    split_documents_parallel,
+    stream_split_file,
+)
+
+
+def _sample_text(seed, paragraphs=20):
+    rng = random.Random(seed)
+    return "\n\n".join(
+        "\n".join(
+            " ".join(f"w{rng.randint(0, 10**6)}" for _ in range(rng.randint(1, 40)))
+            for _ in range(rng.randint(1, 5))
+        )
+        for _ in range(paragraphs)
+    )
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(50, 0), (200, 40), (1000, 200)])
+def test_matches_recursive_character_splitter(chunk_size, chunk_overlap):
+    """Test chunks and start indexes match LangChain's splitter."""
+    docs = [Document(page_content=_sample_text(seed), metadata={"source": f"{seed}.txt"}) for seed in range(5)]
+    expected = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+    ).split_documents(docs)
+    actual = OffsetTextSplitter(chunk_size, chunk_overlap).split_documents(docs)
+
+    assert [d.page_content for d in actual] == [d.page_content for d in expected]
+    assert [d.metadata for d in actual] == [d.metadata for d in expected]
+
+
+def test_splits_unbroken_text_by_character():
+    """Test text without separators falls back to character splits."""
+    text = "x" * 25
+    expected = RecursiveCharacterTextSplitter(chunk_size=10, chunk_overlap=3).split_text(text)
+    assert OffsetTextSplitter(10, 3).split_text(text) == expected
+
+
+def test_split_documents_parallel_matches_serial():
+    """Test the process pool produces the serial result."""
+    docs = [Document(page_content=_sample_text(seed)) for seed in range(4)]
+    splitter = OffsetTextSplitter(300, 50)
+    parallel = split_documents_parallel(docs, splitter, max_workers=2)
+    serial = splitter.split_documents(docs)
+    assert [d.page_content for d in parallel] == [d.page_content for d in serial]
+    assert [d.metadata for d in parallel] == [d.metadata for d in serial]
+
+
+def test_split_pool_is_created_once_without_fork():
+    """Test concurrent first calls share one pool that does not fork the threaded parent."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from src.chat_with_doc.handlers import splitter as splitter_module
+
+    with ThreadPoolExecutor(max_workers=8) as threads:
+        pools = list(threads.map(lambda _: splitter_module._get_pool(3), range(8)))
+    assert all(pool is pools[0] for pool in pools)
+    assert pools[0]._mp_context.get_start_method() in ("forkserver", "spawn")
+
+
+def test_stream_split_file_handles_multibyte_window_edges(tmp_path):
+    """Test streamed chunks decode correctly and carry absolute offsets."""
+    text = "\n\n".join("héllo wörld 日本語 😀 " * (i % 7 + 1) for i in range(400))
+    path = tmp_path / "big.txt"
+    path.write_text(text, encoding="utf-8")
+    splitter = OffsetTextSplitter(200, 40)
+
+    # Window sizes that split multi-byte characters
+    for window_bytes in (1001, 4099):
+        chunks = list(stream_split_file(str(path), splitter, window_bytes=window_bytes))
+        assert chunks
+        for chunk in chunks:
+            start = chunk.metadata["start_index"]
+            assert text[start:start + len(chunk.page_content)] == chunk.page_content
+        assert chunks[-1].page_content == splitter.split_text(text)[-1]
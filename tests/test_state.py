@@ -0,0 +1,98 @@
+"""Shared state backend tests."""
+
+import pytest
+
+from src.chat_with_doc.services.state import MemoryStateBackend, SQLiteStateBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    """Create each state backend."""
+    if request.param == "memory":
+        return MemoryStateBackend()
+    return SQLiteStateBackend(str(tmp_path / "state.db"))
+
+
+def test_upload_queue_is_taken_once(backend):
+    """Test queued uploads are handed out exactly once."""
+    backend.add_upload({"filename": "a.txt"})
+    backend.add_upload({"filename": "b.txt"})
+    assert [u["filename"] for u in backend.list_uploads()] == ["a.txt", "b.txt"]
+    assert [u["filename"] for u in backend.take_uploads()] == ["a.txt", "b.txt"]
+    assert backend.take_uploads() == []
+
+
+def test_document_registry_bumps_corpus_version(backend):
+    """Test registering and clearing documents changes the corpus version."""
+    version = backend.corpus_version()
+    backend.add_document({"filename": "a.txt", "handler_type": "txt"})
+    assert backend.list_documents() == [{"filename": "a.txt", "handler_type": "txt"}]
+    assert backend.corpus_version() > version
+
+    version = backend.corpus_version()
+    backend.clear_documents()
+    assert backend.list_documents() == []
+    assert backend.corpus_version() > version
+
+
+def test_replace_document_keeps_one_record_per_file(backend):
+    """Test re-registering a file replaces its record instead of adding another."""
+    backend.replace_document({"file_path": "/docs/a.txt", "num_chunks": 3})
+    backend.replace_document({"file_path": "/docs/b.txt", "num_chunks": 1})
+    version = backend.corpus_version()
+    backend.replace_document({"file_path": "/docs/a.txt", "num_chunks": 5})
+    assert backend.list_documents() == [
+        {"file_path": "/docs/b.txt", "num_chunks": 1},
+        {"file_path": "/docs/a.txt", "num_chunks": 5},
+    ]
+    assert backend.corpus_version() > version
+
+
+def test_cache_expiry(backend):
+    """Test cached values expire after their TTL."""
+    backend.cache_set("fresh", {"ok": True})
+    backend.cache_set("stale", 1, ttl=-1)
+    assert backend.cache_get("fresh") == {"ok": True}
+    assert backend.cache_get("stale") is None
+    assert backend.cache_get("missing") is None
+
+
+def test_cache_compare_and_set(backend):
+    """Test a write only lands when the key still holds the value read earlier."""
+    assert backend.cache_compare_and_set("k", None, {"n": 1}, ttl=60)
+    assert not backend.cache_compare_and_set("k", None, {"n": 2})
+    assert not backend.cache_compare_and_set("k", {"n": 0}, {"n": 2})
+    assert backend.cache_compare_and_set("k", {"n": 1}, {"n": 2})
+    assert backend.cache_get("k") == {"n": 2}
+
+    # An expired value counts as missing
+    backend.cache_set("old", 1, ttl=-1)
+    assert backend.cache_compare_and_set("old", None, 2)
+
+
+def test_sqlite_state_is_shared_between_instances(tmp_path):
+    """Test two workers opening the same database see the same corpus."""
+    path = str(tmp_path / "state.db")
+    first, second = SQLiteStateBackend(path), SQLiteStateBackend(path)
+    first.add_document({"filename": "a.txt"})
+    assert second.list_documents() == [{"filename": "a.txt"}]
+    assert second.corpus_version() == first.corpus_version()
+
+
+def test_expired_cache_entries_are_purged_on_write(backend, monkeypatch):
+    """Test entries nobody reads again are deleted by a later write."""
+    from src.chat_with_doc.services import state
+
+    monkeypatch.setattr(state, "CACHE_PURGE_INTERVAL", 0)
+    backend.cache_set("stale", 1, ttl=-1)
+    backend.cache_set("kept", 2, ttl=60)
+    backend.cache_set("other", 3)
+
+    if isinstance(backend, SQLiteStateBackend):
+        import sqlite3
+
+        with sqlite3.connect(backend.path) as conn:
+            keys = {row[0] for row in conn.execute("SELECT key FROM cache")}
+    else:
+        keys = set(backend._cache)
+    assert keys == {"kept", "other"}
@@ -0,0 +1,178 @@
+"""Chunked upload tests."""
+
+import hashlib
+import os
+
+import pytest
+
+os.environ.setdefault("GOOGLE_API_KEY", "dummy")
+
+from src.chat_with_doc.services.state import MemoryStateBackend
+from src.chat_with_doc.services.uploads import ChunkedUploads, UploadError
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    return ChunkedUploads(MemoryStateBackend(), str(tmp_path), chunk_size=1000, max_size=0, ttl=60)
+
+
+def test_chunks_are_assembled_hashed_and_queued(uploads, tmp_path):
+    """Test in-order chunks produce the file, its digest and a queued upload."""
+    upload = uploads.create("notes.txt", len(DATA), "text/plain", hashlib.sha256(DATA).hexdigest())
+    while not upload["complete"]:
+        start = upload["offset"]
+        upload = uploads.append(upload["upload_id"], start, DATA[start:start + 1000])
+
+    assert upload["sha256"] == hashlib.sha256(DATA).hexdigest()
+    assert (tmp_path / "notes.txt").read_bytes() == DATA
+    assert uploads.state.take_uploads()[0]["file_location"] == str(tmp_path / "notes.txt")
+
+
+def test_resume_rejects_gaps_and_skips_repeated_bytes(uploads):
+    """Test a gap is refused with the resume offset and a retried chunk is idempotent."""
+    upload_id = uploads.create("a.txt", len(DATA), "text/plain")["upload_id"]
+    uploads.append(upload_id, 0, DATA[:1000])
+
+    with pytest.raises(UploadError) as gap:
+        uploads.append(upload_id, 2000, DATA[2000:3000])
+    assert gap.value.status_code == 409 and gap.value.offset == 1000
+
+    # A retried chunk overlapping received bytes only adds the new ones
+    assert uploads.append(upload_id, 500, DATA[500:1500])["offset"] == 1500
+    assert uploads.append(upload_id, 0, DATA[:1000])["offset"] == 1500
+
+    # Losing the in-memory hash state (e.g. another worker) re-hashes the partial file
+    uploads._hashers.clear()
+    upload = uploads.append(upload_id, 1500, DATA[1500:])
+    assert upload["complete"] and upload["sha256"] == hashlib.sha256(DATA).hexdigest()
+
+
+def test_digest_mismatch_discards_upload(uploads):
+    """Test an upload whose bytes do not match the expected digest is dropped."""
+    upload_id = uploads.create("a.txt", 3, "text/plain", "0" * 64)["upload_id"]
+    with pytest.raises(UploadError) as mismatch:
+        uploads.append(upload_id, 0, b"abc")
+    assert mismatch.value.status_code == 422
+    with pytest.raises(UploadError):
+        uploads.status(upload_id)
+    assert uploads.state.list_uploads() == []
+
+
+def test_workers_sharing_an_upload_do_not_interleave_chunks(tmp_path):
+    """Test the same chunks sent through two workers are written once each."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    state = MemoryStateBackend()
+    # Two instances stand in for two worker processes sharing the state and the disk
+    workers = [ChunkedUploads(state, str(tmp_path), chunk_size=1000, max_size=0, ttl=60) for _ in range(2)]
+    upload_id = workers[0].create("a.txt", len(DATA), "text/plain", hashlib.sha256(DATA).hexdigest())["upload_id"]
+
+    def send(worker):
+        for start in range(0, len(DATA), 1000):
+            worker.append(upload_id, start, DATA[start:start + 1000])
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(send, workers))
+
+    upload = workers[1].status(upload_id)
+    assert upload["complete"] and upload["sha256"] == hashlib.sha256(DATA).hexdigest()
+    assert (tmp_path / "a.txt").read_bytes() == DATA
+
+
+def test_sweep_removes_partial_files_of_expired_uploads(uploads):
+    """Test partial files outlive their session only until the next sweep."""
+    expired = uploads.create("old.txt", len(DATA), "text/plain")["upload_id"]
+    active = uploads.create("new.txt", len(DATA), "text/plain")["upload_id"]
+    uploads.append(expired, 0, DATA[:1000])
+    uploads.state.cache_set(uploads._key(expired), None, ttl=1)
+    stale = os.path.getmtime(uploads._part_path(expired)) - 120
+    os.utime(uploads._part_path(expired), (stale, stale))
+
+    assert uploads.sweep() == 1
+    assert not os.path.exists(uploads._part_path(expired))
+    assert uploads.status(active)["offset"] == 0
+
+
+def test_chunked_upload_api_round_trip():
+    """Test the upload endpoints resume from the server's offset."""
+    from fastapi.testclient import TestClient
+
+    from src.chat_with_doc.api.main import app
+    from src.chat_with_doc.api.routes import uploads
+
+    client = TestClient(app)
+    created = client.post("/api/uploads", json={"filename": "chunked.txt", "size": len(DATA)})
+    assert created.status_code == 201
+    upload_id = created.json()["upload_id"]
+
+    response = client.put(
+        f"/api/uploads/{upload_id}", content=DATA[:4000], headers={"Content-Range": f"bytes 0-3999/{len(DATA)}"}
+    )
+    assert response.json()["offset"] == 4000
+    gap = client.put(
+        f"/api/uploads/{upload_id}", content=DATA[8000:], headers={"Content-Range": f"bytes 8000-{len(DATA) - 1}/{len(DATA)}"}
+    )
+    assert gap.status_code == 409 and gap.json()["offset"] == 4000
+
+    offset = client.get(f"/api/uploads/{upload_id}").json()["offset"]
+    done = client.put(
+        f"/api/uploads/{upload_id}",
+        content=DATA[offset:],
+        headers={"Content-Range": f"bytes {offset}-{len(DATA) - 1}/{len(DATA)}"},
+    ).json()
+    assert done["complete"] and done["sha256"] == hashlib.sha256(DATA).hexdigest()
+
+    assert client.post("/api/uploads", json={"filename": "x.exe", "size": 1}).status_code == 400
+    assert client.put(f"/api/uploads/{upload_id}", content=b"x").status_code == 400
+    assert client.get("/api/uploads/unknown").status_code == 404
+
+    queued = uploads.state.take_uploads()
+    assert [u["filename"] for u in queued] == ["chunked.txt"]
+    os.remove(queued[0]["file_location"])
+
+
+def test_chunk_size_and_total_are_checked_before_the_body(monkeypatch):
+    """Test oversized chunks and a mismatched Content-Range total are refused."""
+    from fastapi.testclient import TestClient
+
+    from src.chat_with_doc.api.main import app
+    from src.chat_with_doc.api.routes import uploads
+
+    client = TestClient(app)
+    upload_id = client.post("/api/uploads", json={"filename": "limits.txt", "size": len(DATA)}).json()["upload_id"]
+    monkeypatch.setattr(uploads, "chunk_size", 1000)
+
+    too_big = client.put(
+        f"/api/uploads/{upload_id}", content=DATA[:2000], headers={"Content-Range": f"bytes 0-1999/{len(DATA)}"}
+    )
+    assert too_big.status_code == 413
+    # The range claims a small chunk but the body is larger
+    lying = client.put(
+        f"/api/uploads/{upload_id}", content=DATA[:2000], headers={"Content-Range": f"bytes 0-999/{len(DATA)}"}
+    )
+    assert lying.status_code == 413
+    wrong_total = client.put(
+        f"/api/uploads/{upload_id}", content=DATA[:1000], headers={"Content-Range": "bytes 0-999/99999"}
+    )
+    assert wrong_total.status_code == 400
+    assert client.get(f"/api/uploads/{upload_id}").json()["offset"] == 0
+    client.delete(f"/api/uploads/{upload_id}")
+
+
+def test_chunked_uploads_allow_files_over_the_single_request_limit(monkeypatch):
+    """Test the single-request limit refuses large files that chunked uploads accept."""
+    from fastapi.testclient import TestClient
+
+    from src.chat_with_doc.api.main import app
+    from src.chat_with_doc.api.routes import uploads
+    from src.chat_with_doc.core.config import settings
+
+    client = TestClient(app)
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1000)
+    single = client.post("/api/upload", files={"file": ("big.txt", DATA[:2000], "text/plain")})
+    assert single.status_code == 413
+    chunked = client.post("/api/uploads", json={"filename": "big.txt", "size": 2000})
+    assert chunked.status_code == 201
+    uploads.cancel(chunked.json()["upload_id"])
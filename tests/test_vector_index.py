@@ -0,0 +1,65 @@
+"""Shared Pinecone connection tests."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.chat_with_doc.core import vector_index
+from src.chat_with_doc.core.config import settings
+from src.chat_with_doc.services.state import MemoryStateBackend
+
+
+class FakePinecone:
+    """Pinecone client that counts control-plane calls."""
+
+    instances = 0
+
+    def __init__(self, **kwargs):
+        FakePinecone.instances += 1
+        self.describes = 0
+        self.dimension = settings.EMBEDDING_DIM
+
+    def has_index(self, name):
+        return True
+
+    def describe_index(self, name):
+        self.describes += 1
+        return SimpleNamespace(host=f"{name}.example", dimension=self.dimension, metric="cosine")
+
+    def Index(self, host, **kwargs):
+        return SimpleNamespace(host=host)
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    FakePinecone.instances = 0
+    monkeypatch.setattr(vector_index, "Pinecone", FakePinecone)
+    return vector_index.PineconeConnection()
+
+
+def test_client_and_index_are_created_once(connection):
+    """Test repeated index use reuses one client, handle and validation."""
+    first = connection.index
+    second = connection.index
+    assert first is second
+    assert FakePinecone.instances == 1
+    assert connection.client.describes == 1
+
+
+def test_validation_is_shared_through_cache(connection):
+    """Test a second process reads the index description from the shared cache."""
+    cache = MemoryStateBackend()
+    connection.use_cache(cache)
+    connection.validate()
+
+    other = vector_index.PineconeConnection()
+    other.use_cache(cache)
+    assert other.validate()["host"] == connection.validate()["host"]
+    assert other._client is None
+
+
+def test_dimension_mismatch_is_rejected(connection):
+    """Test an index with the wrong dimension fails validation."""
+    connection.client.dimension = settings.EMBEDDING_DIM + 1
+    with pytest.raises(ValueError, match="dimension"):
+        connection.validate()
@@ -0,0 +1,105 @@
+"""Startup warm-up and readiness tests."""
+
+import os
+
+os.environ.setdefault("GOOGLE_API_KEY", "dummy")
+
+from fastapi.testclient import TestClient
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.chat_with_doc.api import main
+from src.chat_with_doc.core import local_index
+from src.chat_with_doc.core.config import settings
+from src.chat_with_doc.services.engine import DocumentEngine
+from src.chat_with_doc.services.state import MemoryStateBackend
+from src.chat_with_doc.services.warmup import Warmup
+
+
+class FlakyEmbeddings(Embeddings):
+    """Fails the first ``failures`` calls, then returns a constant vector."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("provider unavailable")
+        return [1.0, 0.0, 0.0, 0.0]
+
+
+def _engine(monkeypatch, failures=0):
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(local_index, "_local_index", local_index.LocalVectorIndex(4))
+    engine = DocumentEngine(MemoryStateBackend())
+    embeddings = FlakyEmbeddings(failures)
+    llm = FakeListChatModel(responses=["OK"])
+    engine.query_embeddings.embeddings = embeddings
+    engine.llm = llm
+    for handler in engine.handlers.values():
+        handler.embedding_model.embeddings = embeddings
+        handler.llm = llm
+    return engine, embeddings
+
+
+def test_warmup_times_each_component_and_compiles_graphs(monkeypatch):
+    """Test a successful warm-up reports ready with per-component timings."""
+    monkeypatch.setattr(settings, "WARMUP_LLM", True)
+    engine, embeddings = _engine(monkeypatch)
+    warmup = Warmup(retry_interval=0)
+
+    assert warmup.report()["status"] == "warming"
+    assert warmup.run(engine, max_rounds=1)
+
+    report = warmup.report()
+    assert report["status"] == "ready"
+    assert set(report["components"]) == {"state", "vector_index", "embedding", "llm", "pipeline"}
+    assert all(c["status"] == "ready" and c["ms"] >= 0 for c in report["components"].values())
+    # Shared clients are warmed once, and the RAG graphs are compiled up front
+    assert embeddings.calls == 1
+    assert engine.pdf_handler._graph is not None
+
+
+def test_llm_warmup_is_off_by_default(monkeypatch):
+    """Test the warm-up spends no LLM call unless WARMUP_LLM is set."""
+    engine, _ = _engine(monkeypatch)
+    warmup = Warmup(retry_interval=0)
+    assert warmup.run(engine, max_rounds=1)
+    assert warmup.report()["components"]["llm"]["status"] == "skipped"
+
+
+def test_failed_components_are_retried(monkeypatch):
+    """Test a provider failing at boot is retried until the instance is ready."""
+    # Enough failures to outlast the provider call's own retries
+    engine, _ = _engine(monkeypatch, failures=1 + settings.PROVIDER_RETRIES)
+    warmup = Warmup(retry_interval=0)
+
+    assert not warmup.run(engine, max_rounds=1)
+    report = warmup.report()
+    assert report["status"] == "failed"
+    assert "provider unavailable" in report["components"]["embedding"]["detail"]
+
+    assert warmup.run(engine, max_rounds=2)
+    assert warmup.is_ready()
+
+
+def test_ready_endpoint_reflects_warmup(monkeypatch):
+    """Test /ready answers 503 until warm-up is done, while /health stays 200."""
+    warmup = Warmup()
+    monkeypatch.setattr(main, "warmup", warmup)
+    client = TestClient(main.app)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming"
+    assert client.get("/health").status_code == 200
+
+    warmup.disable()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"